@@ -4,6 +4,41 @@ export const explain = (topic,level) => {
   return api.post("/ai/explain", { topic,level });
 };
 
-export const quiz=(topic,level,num_questions)=>{
-  return api.post("ai/quiz",{topic,level,num_questions});
-};
\ No newline at end of file
+// With a token, questions the user has already answered are left out of bank quizzes.
+export const quiz=(topic,level,num_questions,token)=>{
+  const headers = token ? { Authorization: `Bearer ${token}` } : {};
+  return api.post("ai/quiz",{topic,level,num_questions},{ headers });
+};
+
+// Streams quiz questions as NDJSON events; onQuestion fires for each finished question.
+export const streamQuiz = async (topic, level, num_questions, onQuestion, token, signal) => {
+  const res = await fetch(`${api.defaults.baseURL}/ai/quiz?stream=ndjson`, {
+    method: "POST",
+    signal,
+    headers: {
+      "Content-Type": "application/json",
+      ...(token ? { Authorization: `Bearer ${token}` } : {}),
+    },
+    body: JSON.stringify({ topic, level, num_questions }),
+  });
+  if (!res.ok || !res.body) throw new Error("Failed to stream quiz");
+
+  const reader = res.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = "";
+  for (;;) {
+    const { value, done } = await reader.read();
+    if (done) break;
+    buffer += decoder.decode(value, { stream: true });
+    const lines = buffer.split("\n");
+    buffer = lines.pop();
+    for (const line of lines) {
+      if (!line.trim()) continue;
+      const event = JSON.parse(line);
+      if (event.type === "question") onQuestion(event.question);
+      if (event.type === "error") throw new Error(event.error);
+      if (event.type === "done") return event.quiz;
+    }
+  }
+  throw new Error("Quiz stream ended early");
+};
@@ -11,9 +11,10 @@ export async function getProgressData(token) {
     throw new Error(error.response?.data?.message || "Failed to fetch progress data");
   }
 }
-export async function getUserProgress(token, type = "all") {
+export async function getUserProgress(token, type = "all", { cursor, fields } = {}) {
   try {
-    const res = await api.get(`/dashboard/progress?type=${type}`, {
+    const res = await api.get("/dashboard/progress", {
+      params: { type, cursor, fields },
       headers: { Authorization: `Bearer ${token}` },
     });
     return res.data;
@@ -21,3 +22,13 @@ export async function getUserProgress(token, type = "all") {
     throw new Error(error.response?.data?.message || "Failed to load progress");
   }
 }
+export async function getExplanation(token, id) {
+  try {
+    const res = await api.get(`/dashboard/explanation/${id}`, {
+      headers: { Authorization: `Bearer ${token}` },
+    });
+    return res.data;
+  } catch (error) {
+    throw new Error(error.response?.data?.error || "Failed to load explanation");
+  }
+}
@@ -12,6 +12,20 @@ export async function saveQuizResult(token, quizData) {
   }
 }
 
+// results: [{ type: "quiz" | "explanation", ...same fields as the single saves }]
+// Resolves with { saved, results: [{ index, status, error? }] } even when some items fail.
+export async function saveResultsBatch(token, results) {
+  try {
+    const res = await api.post("/dashboard/save/batch", { results }, {
+      headers: { Authorization: `Bearer ${token}` },
+      validateStatus: (status) => status === 200 || status === 207,
+    });
+    return res.data;
+  } catch (error) {
+    throw new Error(error.response?.data?.error || "Failed to save results");
+  }
+}
+
 export async function getQuizResultByTopic(token, topic) {
   try {
     const res = await api.get(`/dashboard/quiz-result/${encodeURIComponent(topic)}`, {
@@ -25,6 +25,11 @@ export async function summarizePdf(formData) {
   }
 }
 
+// Server-rendered PDF of a finished summary (Unicode fonts, cached by content).
+export function summaryPdfUrl(summaryId) {
+  return `${api.defaults.baseURL}/summarize/${summaryId}/pdf`;
+}
+
 // export async function saveSummary(token, summaryData) {
 //   try {
 //     const res = await api.post("/api/summary/save", summaryData, {
@@ -16,6 +16,7 @@ import {
   Lightbulb
 } from "lucide-react";
 import { useToast } from "@/hooks/use-toast";
+import { streamQuiz } from "@/api/function";
 
 interface Question {
   id: number;
@@ -45,27 +46,52 @@ export default function Quiz() {
   const [isLoading, setIsLoading] = useState(true);
   const { toast } = useToast();
   const [questions, setQuestions] = useState<Question[]>([]);
-  // Load quiz data on component mount
+  const [streamDone, setStreamDone] = useState(false);
+  // Load quiz data on component mount; questions stream in while the first ones are answered
   useEffect(() => {
     const data = sessionStorage.getItem('quizData');
-    if (data) {
-      const parsed = JSON.parse(data);
-  setQuizData({
-    topic: parsed.topic,
-    level: parsed.level,
-    numQuestions: parsed.numQuestions
-  });
-  setQuestions(parsed.questions);
-    } else {
+    if (!data) {
       // If no quiz data, redirect to quiz setup
       navigate('/quiz-setup');
       return;
     }
-    
-    // Simulate loading time for questions
-    setTimeout(() => {
-      setIsLoading(false);
-    }, 1000);
+    const parsed = JSON.parse(data);
+    setQuizData({
+      topic: parsed.topic,
+      level: parsed.level,
+      numQuestions: parsed.numQuestions
+    });
+    setIsLoading(false);
+    if (parsed.questions) {
+      setQuestions(parsed.questions);
+      setStreamDone(true);
+      return;
+    }
+
+    const controller = new AbortController();
+    streamQuiz(
+      parsed.topic,
+      parsed.level,
+      parsed.numQuestions,
+      (question: Question) => setQuestions(prev => [...prev, question]),
+      localStorage.getItem("token"),
+      controller.signal
+    )
+      .then(quiz => {
+        setQuestions(quiz.quiz);
+        setStreamDone(true);
+        sessionStorage.setItem('quizData', JSON.stringify({ ...parsed, questions: quiz.quiz }));
+      })
+      .catch(() => {
+        if (controller.signal.aborted) return;
+        toast({
+          title: "Error",
+          description: "Failed to create quiz. Please try again.",
+          variant: "destructive"
+        });
+        navigate('/quiz-setup');
+      });
+    return () => controller.abort();
   }, [navigate]);
 
   // Timer effect
@@ -111,7 +137,7 @@ export default function Quiz() {
       setSelectedAnswer(null);
       setShowResult(false);
       setTimeLeft(30);
-    } else {
+    } else if (streamDone) {
       // Quiz complete - save results and redirect
       const quizResult = {
         score,
@@ -155,7 +181,10 @@ export default function Quiz() {
     );
   }
 
-  const progressPercentage = ((currentQuestion + 1) / questions.length) * 100;
+  // Until the stream finishes, count the questions that were asked for
+  const totalQuestions = streamDone ? questions.length : quizData.numQuestions;
+  const nextReady = currentQuestion < questions.length - 1;
+  const progressPercentage = ((currentQuestion + 1) / totalQuestions) * 100;
   const currentQ = questions[currentQuestion];
 
   if (quizComplete) {
@@ -253,7 +282,7 @@ export default function Quiz() {
                 {quizData.topic} Quiz
               </h1>
               <p className="text-muted-foreground">
-                Question {currentQuestion + 1} of {questions.length} • {quizData.level} level
+                Question {currentQuestion + 1} of {totalQuestions} • {quizData.level} level
               </p>
             </div>
             <Badge variant="outline" className="gap-2">
@@ -370,8 +399,8 @@ export default function Quiz() {
                       <ArrowRight className="w-4 h-4" />
                     </Button>
                   ) : (
-                    <Button onClick={handleNext} className="gap-2">
-                      {currentQuestion < questions.length - 1 ? "Next Question" : "Finish Quiz"}
+                    <Button onClick={handleNext} disabled={!nextReady && !streamDone} className="gap-2">
+                      {nextReady ? "Next Question" : streamDone ? "Finish Quiz" : "Loading next question..."}
                       <ArrowRight className="w-4 h-4" />
                     </Button>
                   )}
@@ -15,7 +15,6 @@ import {
   ArrowLeft 
 } from "lucide-react";
 import { useToast } from "@/hooks/use-toast";
-import {quiz} from"@/api/function";
 interface QuizSetupData {
   numQuestions: number;
   topic: string;
@@ -30,14 +29,13 @@ export default function QuizSetup() {
     topic: "",
     level: "medium"
   });
-  const [isLoading, setIsLoading] = useState(false);
 
   const popularTopics = [
     "JavaScript", "React", "Python", "Data Science", 
     "Machine Learning", "Web Development", "Algorithms", "Databases"
   ];
 
-  const handleSubmit = async (e: React.FormEvent) => {
+  const handleSubmit = (e: React.FormEvent) => {
     e.preventDefault();
     
     if (!formData.topic.trim()) {
@@ -58,32 +56,13 @@ export default function QuizSetup() {
       return;
     }
 
-    setIsLoading(true);
-
-    try {
-      const response= await quiz(formData.topic,formData.level,formData.numQuestions);
-      // Store quiz data in sessionStorage for now
-      sessionStorage.setItem("quizData", JSON.stringify({
-        topic: formData.topic,
-        level: formData.level,
-        numQuestions: formData.numQuestions,
-        questions: response.data.quiz
-      }));
-      toast({
-        title: "Quiz Created!",
-        description: `Generated ${formData.numQuestions} ${formData.level} questions about ${formData.topic}.`
-      });
-      
-      navigate('/quiz');
-    } catch (error) {
-      toast({
-        title: "Error",
-        description: "Failed to create quiz. Please try again.",
-        variant: "destructive"
-      });
-    } finally {
-      setIsLoading(false);
-    }
+    // The quiz page streams the questions, so the first one shows as soon as it is generated
+    sessionStorage.setItem("quizData", JSON.stringify({
+      topic: formData.topic,
+      level: formData.level,
+      numQuestions: formData.numQuestions
+    }));
+    navigate('/quiz');
   };
 
   return (
@@ -246,20 +225,10 @@ export default function QuizSetup() {
                 </Button>
                 <Button
                   type="submit"
-                  disabled={isLoading}
                   className="flex-1 gap-2"
                 >
-                  {isLoading ? (
-                    <>
-                      <div className="w-4 h-4 border-2 border-white border-t-transparent rounded-full animate-spin" />
-                      Creating Quiz...
-                    </>
-                  ) : (
-                    <>
-                      <Play className="w-4 h-4" />
-                      Start Quiz
-                    </>
-                  )}
+                  <Play className="w-4 h-4" />
+                  Start Quiz
                 </Button>
               </motion.div>
             </form>
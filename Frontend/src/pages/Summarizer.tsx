@@ -14,29 +14,18 @@ import {
   ClipboardCopy,
   Download
 } from "lucide-react";
-import {summarizeUrl,summarizePdf} from "@/api/summary"
-import jsPDF from "jspdf";
+import {summarizeUrl,summarizePdf,summaryPdfUrl} from "@/api/summary"
 export default function Summarizer() {
   const [url, setUrl] = useState("");
   const [file, setFile] = useState<File | null>(null);
   const [language, setLanguage] = useState("");
   const [summary, setSummary] = useState("");
+  const [summaryId, setSummaryId] = useState("");
   const [isLoading, setIsLoading] = useState(false);
   const [hasSummary, setHasSummary] = useState(false);
 const handleDownloadPdf = () => {
-  const doc = new jsPDF();
-  doc.setFont("helvetica", "normal");
-  doc.setFontSize(12);
-
-  // Add title
-  doc.text("AI Summary", 10, 10);
-
-  // Add summary text (auto-wraps if long)
-  const lines = doc.splitTextToSize(summary, 180);
-  doc.text(lines, 10, 20);
-
-  // Save PDF
-  doc.save("summary.pdf");
+  // The backend renders the PDF with Unicode fonts, so every language works.
+  window.location.href = summaryPdfUrl(summaryId);
 };
 
   const handleSummarize = async () => {
@@ -59,6 +48,7 @@ const handleDownloadPdf = () => {
     }
 
     setSummary(`${data.summary}`);
+    setSummaryId(data.summary_id || "");
     setHasSummary(true);
 
     // // --- Save to backend if logged in ---
@@ -149,7 +139,7 @@ const handleDownloadPdf = () => {
                 <Button variant="outline" onClick={()=>navigator.clipboard.writeText(summary)}>
                   <ClipboardCopy className="w-4 h-4 mr-2"/> Copy
                 </Button>
-                {language === "English" && (
+                {summaryId && (
                   <Button variant="secondary" onClick={handleDownloadPdf}>
                     <Download className="w-4 h-4 mr-2" /> Download PDF
                   </Button>
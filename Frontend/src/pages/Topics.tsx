@@ -6,7 +6,7 @@ import { Button } from "@/components/ui/button";
 import { Card } from "@/components/ui/card";
 import { Badge } from "@/components/ui/badge";
 import { Search, Filter, X } from "lucide-react";
-import { getUserProgress } from "@/api/progress";
+import { getExplanation, getUserProgress } from "@/api/progress";
 import { useAuth } from "@/contexts/AuthContext";
 import { Navigate, Link } from "react-router-dom";
 export default function MyProgress() {
@@ -16,6 +16,8 @@ export default function MyProgress() {
   const [selectedType, setSelectedType] = useState("All");
   const [progressList, setProgressList] = useState([]);
   const [loading, setLoading] = useState(true);
+  const [nextCursor, setNextCursor] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
 
   const [selectedExplanation, setSelectedExplanation] = useState(null);
 
@@ -30,8 +32,10 @@ export default function MyProgress() {
       try {
         setLoading(true);
         const token = localStorage.getItem("token");
+        // Summary fields only; an explanation's body is fetched when it is opened
         const data = await getUserProgress(token, selectedType.toLowerCase());
         setProgressList(data.items || []);
+        setNextCursor(data.next_cursor || null);
       } catch (err) {
         console.error("Error loading progress:", err);
       } finally {
@@ -40,6 +44,31 @@ export default function MyProgress() {
     }
     fetchData();
   }, [selectedType]);
+
+  async function loadMore() {
+    try {
+      setLoadingMore(true);
+      const token = localStorage.getItem("token");
+      const data = await getUserProgress(token, selectedType.toLowerCase(), { cursor: nextCursor });
+      setProgressList((items) => [...items, ...(data.items || [])]);
+      setNextCursor(data.next_cursor || null);
+    } catch (err) {
+      console.error("Error loading progress:", err);
+    } finally {
+      setLoadingMore(false);
+    }
+  }
+
+  async function openExplanation(item) {
+    setSelectedExplanation(item);
+    try {
+      const token = localStorage.getItem("token");
+      const full = await getExplanation(token, item._id);
+      setSelectedExplanation((current) => (current?._id === item._id ? full : current));
+    } catch (err) {
+      console.error("Error loading explanation:", err);
+    }
+  }
   if (authLoading) {
       return <div className="text-center mt-10">Checking login...</div>;
     }
@@ -115,7 +144,7 @@ export default function MyProgress() {
                   title={item.topic}
                   description={item.type === "quiz"
                     ? `Score: ${item.quiz_score}/${item.total_questions}`
-                    : `${item.explanation?.slice(0, 100)}...`}
+                    : "Saved explanation"}
                   difficulty={item.level}
                   completed={item.completed}
                   progress={item.type === "quiz"
@@ -125,7 +154,7 @@ export default function MyProgress() {
                     if (item.type === "quiz") {
                       navigate(`/quiz-review/${item.topic}`);
                     } else {
-                      setSelectedExplanation(item);
+                      openExplanation(item);
                     }
                   }}
                   duration=""
@@ -134,6 +163,13 @@ export default function MyProgress() {
             ))}
           </div>
         )}
+        {!loading && nextCursor && (
+          <div className="text-center">
+            <Button variant="outline" onClick={loadMore} disabled={loadingMore}>
+              {loadingMore ? "Loading..." : "Load more"}
+            </Button>
+          </div>
+        )}
         {/* Modal for Explanation */}
         {selectedExplanation && (
           <div className="fixed inset-0 bg-black/60 flex items-center justify-center z-50 p-4">
@@ -146,7 +182,7 @@ export default function MyProgress() {
               </button>
               <h2 className="text-xl font-bold mb-4">{selectedExplanation.topic}</h2>
               <p className="text-gray-700 dark:text-gray-300 whitespace-pre-line">
-                {selectedExplanation.explanation}
+                {selectedExplanation.explanation ?? "Loading..."}
               </p>
             </div>
           </div>
@@ -0,0 +1,221 @@
+import logging
+import os
+import threading
+from collections import defaultdict
+
+from pymongo import ASCENDING, DESCENDING, IndexModel, MongoClient, monitoring
+from pymongo.errors import PyMongoError
+
+from app.utils.metrics import SPAN_SECONDS, add_timing
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+
+# ==== Query timings ====
+class QueryTimer(monitoring.CommandListener):
+    """
+    Per-collection command timings collected from pymongo's command
+    monitoring. Commands slower than `slow_ms` are also printed.
+    """
+
+    def __init__(self, slow_ms=0):
+        self.slow_ms = slow_ms
+        self._lock = threading.Lock()
+        self._pending = {}
+        self._stats = defaultdict(lambda: {"count": 0, "failures": 0, "total_ms": 0.0, "max_ms": 0.0})
+
+    def started(self, event):
+        collection = event.command.get(event.command_name)
+        if not isinstance(collection, str):
+            collection = "$cmd"
+        with self._lock:
+            self._pending[(event.connection_id, event.request_id)] = collection
+
+    def succeeded(self, event):
+        self._record(event, failed=False)
+
+    def failed(self, event):
+        self._record(event, failed=True)
+
+    def _record(self, event, failed):
+        elapsed_ms = event.duration_micros / 1000.0
+        with self._lock:
+            collection = self._pending.pop((event.connection_id, event.request_id), "$cmd")
+            stats = self._stats[f"{collection}.{event.command_name}"]
+            stats["count"] += 1
+            stats["failures"] += failed
+            stats["total_ms"] += elapsed_ms
+            stats["max_ms"] = max(stats["max_ms"], elapsed_ms)
+        SPAN_SECONDS.observe(elapsed_ms / 1000.0, kind="mongo", name=f"{collection}.{event.command_name}",
+                             outcome="error" if failed else "ok")
+        add_timing("mongo", elapsed_ms / 1000.0)
+        if self.slow_ms and elapsed_ms >= self.slow_ms:
+            logger.warning("slow %s on %s: %.1fms", event.command_name, collection, elapsed_ms)
+
+    def snapshot(self):
+        with self._lock:
+            stats = {name: dict(values) for name, values in self._stats.items()}
+        for values in stats.values():
+            values["avg_ms"] = round(values["total_ms"] / values["count"], 3) if values["count"] else 0
+            values["total_ms"] = round(values["total_ms"], 3)
+            values["max_ms"] = round(values["max_ms"], 3)
+        return stats
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+
+
+query_timer = QueryTimer(slow_ms=Config.MONGO_SLOW_QUERY_MS)
+
+
+def query_timings():
+    """{"<collection>.<command>": {count, failures, total_ms, avg_ms, max_ms}} for this process."""
+    return query_timer.snapshot()
+
+
+# ==== Client ====
+_client = None
+_client_pid = None
+_client_lock = threading.Lock()
+
+
+def mongo_enabled():
+    return bool(Config.MONGO_URI or Config.MONGO_MOCK)
+
+
+def _create_client():
+    if Config.MONGO_MOCK:
+        import mongomock  # requirements-dev.txt
+        return mongomock.MongoClient()
+    return MongoClient(
+        Config.MONGO_URI,
+        maxPoolSize=Config.MONGO_MAX_POOL_SIZE,
+        minPoolSize=Config.MONGO_MIN_POOL_SIZE,
+        maxIdleTimeMS=Config.MONGO_MAX_IDLE_TIME_MS,
+        waitQueueTimeoutMS=Config.MONGO_WAIT_QUEUE_TIMEOUT_MS,
+        serverSelectionTimeoutMS=Config.MONGO_SERVER_SELECTION_TIMEOUT_MS,
+        connectTimeoutMS=Config.MONGO_CONNECT_TIMEOUT_MS,
+        socketTimeoutMS=Config.MONGO_SOCKET_TIMEOUT_MS,
+        readPreference=Config.MONGO_READ_PREFERENCE,
+        retryWrites=True,
+        appname="edugenie",
+        event_listeners=[query_timer],
+    )
+
+
+def get_client():
+    """
+    The process-wide MongoClient, created on first use.
+    A client inherited across fork() is never reused; the child builds its
+    own so gunicorn workers don't share sockets with the master.
+    """
+    global _client, _client_pid
+    pid = os.getpid()
+    if _client is None or _client_pid != pid:
+        with _client_lock:
+            if _client is None or _client_pid != pid:
+                _client = _create_client()
+                _client_pid = pid
+    return _client
+
+
+def get_db():
+    return get_client()[Config.MONGO_DB_NAME]
+
+
+def close_client():
+    global _client, _client_pid
+    with _client_lock:
+        if _client is not None and _client_pid == os.getpid():
+            _client.close()
+        _client = None
+        _client_pid = None
+
+
+class LazyCollection:
+    """
+    Stand-in for a collection that may be held for the life of the process
+    (module globals, caches, stores); every call goes to the client of the
+    process making it.
+    """
+
+    def __init__(self, name):
+        self.name = name
+
+    def __getattr__(self, attr):
+        if attr.startswith("_"):
+            raise AttributeError(attr)
+        return getattr(get_db()[self.name], attr)
+
+    def __repr__(self):
+        return f"LazyCollection({self.name!r})"
+
+
+class _LazyDatabase:
+    """`db.users` / `db["users"]` without touching the network until a query runs."""
+
+    def __getattr__(self, name):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return LazyCollection(name)
+
+    def __getitem__(self, name):
+        return LazyCollection(name)
+
+
+db = _LazyDatabase()
+
+
+def collection(name):
+    """A lazily bound collection, or None when MongoDB is not configured."""
+    return db[name] if mongo_enabled() else None
+
+
+# ==== Indexes ====
+INDEXES = {
+    "users": [
+        IndexModel([("email", ASCENDING)], unique=True),
+    ],
+    "quiz_result": [
+        IndexModel([("user_id", ASCENDING), ("topic", ASCENDING), ("type", ASCENDING)]),
+        IndexModel([("user_id", ASCENDING), ("updated_at", DESCENDING), ("_id", DESCENDING)]),
+    ],
+    "explanations": [
+        IndexModel([("user_id", ASCENDING), ("topic", ASCENDING), ("level", ASCENDING), ("type", ASCENDING)]),
+        IndexModel([("user_id", ASCENDING), ("updated_at", DESCENDING), ("_id", DESCENDING)]),
+        IndexModel([("topic_key", ASCENDING), ("level", ASCENDING), ("updated_at", DESCENDING)]),
+        IndexModel([("topic", ASCENDING), ("level", ASCENDING), ("updated_at", DESCENDING)]),
+    ],
+    "quiz_cache": [
+        IndexModel([("expires_at", ASCENDING)], expireAfterSeconds=0),
+    ],
+    "youtube_transcripts": [
+        IndexModel([("expires_at", ASCENDING)], expireAfterSeconds=0),
+    ],
+    "quiz_bank": [
+        IndexModel([("topic", ASCENDING), ("level", ASCENDING)]),
+    ],
+    "summary_jobs": [
+        IndexModel([("status", ASCENDING), ("lease_expires", ASCENDING)]),
+    ],
+}
+
+
+def ensure_indexes(database=None):
+    """
+    Creates every index the queries rely on. createIndexes is a no-op for
+    an index that already exists with the same spec, so this runs on every
+    startup. Failures are reported per collection and don't stop the rest.
+    Returns {collection: [index names] | error message}.
+    """
+    database = database if database is not None else get_db()
+    report = {}
+    for name, indexes in INDEXES.items():
+        try:
+            report[name] = database[name].create_indexes(indexes)
+        except PyMongoError as e:
+            logger.warning("index creation failed for %s: %s", name, e)
+            report[name] = str(e)
+    return report
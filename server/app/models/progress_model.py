@@ -1,60 +1,248 @@
-from pymongo import MongoClient
+import logging
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError, PyMongoError
 from datetime import datetime
-import os
+from collections import defaultdict
+from app.models.db import db
+from app.utils.explanation_store import normalize_topic
+from app.models.user_stats_model import quiz_percent, record_activity
+from app.services.write_coalescer import WriteCoalescer
+from config import Config
 
-mongo = MongoClient(os.getenv("MONGO_URI"))
-db = mongo["edugenie"]
+logger = logging.getLogger(__name__)
 
-def save_quiz(user_id, topic, quiz_score, total_questions, level, questions, time_spent):
-    """
-    Saves or updates quiz progress for a topic.
-    Stores all details including questions in one collection.
-    Adds a 'type' field for filtering.
-    """
-    db.quiz_result.update_one(
-        {"user_id": user_id, "topic": topic, "type": "quiz"},
+QUIZ, EXPLANATION = "quiz", "explanation"
+
+
+def _is_count(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool) and value >= 0
+
+
+def validate_quiz(data):
+    """Returns (fields, error) for one quiz result as posted by the client."""
+    topic = data.get("topic")
+    score = data.get("score")
+    total_questions = data.get("totalQuestions")
+    if not topic or score is None or total_questions is None:
+        return None, "Missing required quiz result fields"
+    if not isinstance(topic, str):
+        return None, "topic must be a string"
+    if not _is_count(score) or not _is_count(total_questions):
+        return None, "score and totalQuestions must be non-negative numbers"
+    if score > total_questions:
+        return None, "score cannot exceed totalQuestions"
+    questions = data.get("questions", [])
+    if not isinstance(questions, list):
+        return None, "questions must be a list"
+    return {
+        "topic": topic,
+        "quiz_score": score,
+        "total_questions": total_questions,
+        "level": data.get("level"),
+        "questions": questions,
+        "time_spent": data.get("timeSpent"),
+    }, None
+
+
+def validate_explanation(data):
+    """Returns (fields, error) for one explanation as posted by the client."""
+    topic = data.get("topic")
+    level = data.get("level")
+    explanation = data.get("explanation")
+    if not topic or not level or not explanation:
+        return None, "Missing required explanation fields"
+    if not all(isinstance(value, str) for value in (topic, level, explanation)):
+        return None, "topic, level and explanation must be strings"
+    return {"topic": topic, "level": level, "explanation": explanation}, None
+
+
+def _quiz_op(user_id, fields, now):
+    return UpdateOne(
+        {"user_id": user_id, "topic": fields["topic"], "type": QUIZ},
         {
             "$set": {
-                "quiz_score": quiz_score,
-                "total_questions": total_questions,
-                "level": level,
-                "questions": questions,
-                "time_spent": time_spent,
+                "quiz_score": fields["quiz_score"],
+                "total_questions": fields["total_questions"],
+                "level": fields["level"],
+                "questions": fields["questions"],
+                "time_spent": fields["time_spent"],
                 "completed": True,
-                "updated_at": datetime.utcnow(),
-                "type": "quiz"
+                "updated_at": now,
+                "type": QUIZ
+            },
+            "$max": {
+                "best_percent": quiz_percent(fields["quiz_score"], fields["total_questions"])
             },
             "$setOnInsert": {
-                "created_at": datetime.utcnow()
+                "created_at": now
             }
         },
         upsert=True
     )
-    return {"status": "success", "message": "Quiz saved successfully"}
 
 
-def save_explanation(user_id, topic, level, explanation):
-    """
-    Stores an explanation for a topic along with level and user ID.
-    Adds a 'type' field for filtering.
-    If the same user adds an explanation for the same topic & level,
-    it updates the existing record.
-    """
-    db.explanations.update_one(
-        {"user_id": user_id, "topic": topic, "level": level, "type": "explanation"},
+def _explanation_op(user_id, fields, now):
+    return UpdateOne(
+        {"user_id": user_id, "topic": fields["topic"], "level": fields["level"], "type": EXPLANATION},
         {
             "$set": {
-                "explanation": explanation,
-                "updated_at": datetime.utcnow(),
-                "type": "explanation"
+                "explanation": fields["explanation"],
+                "topic_key": normalize_topic(fields["topic"]),
+                "updated_at": now,
+                "type": EXPLANATION
             },
             "$setOnInsert": {
-                "created_at": datetime.utcnow()
+                "created_at": now
             }
         },
         upsert=True
     )
+
+
+def _entry_key(user_id, kind, fields):
+    if kind == QUIZ:
+        return (user_id, kind, fields["topic"])
+    return (user_id, kind, fields["topic"], fields["level"])
+
+
+def _existing(collection, kind, entries, key_fields, projection):
+    """
+    One read for the stored documents a batch will overwrite, keyed by
+    (user_id, *key_fields). Tells new results from updates before writing.
+    """
+    wanted = defaultdict(set)
+    for user_id, _, fields in entries:
+        wanted[user_id].add(fields["topic"])
+    cursor = collection.find(
+        {"type": kind, "$or": [{"user_id": u, "topic": {"$in": list(t)}} for u, t in wanted.items()]},
+        dict(projection, user_id=1, **{f: 1 for f in key_fields}),
+    )
+    return {(doc["user_id"], *(doc.get(f) for f in key_fields)): doc for doc in cursor}
+
+
+def _bulk_upsert(collection, ops):
+    """Unordered bulk upsert. Returns {op index: error} for the ops that failed."""
+    try:
+        collection.bulk_write(ops, ordered=False)
+    except BulkWriteError as e:
+        return {err["index"]: err.get("errmsg", "write failed") for err in e.details.get("writeErrors", [])}
+    except Exception as e:
+        return {i: str(e) for i in range(len(ops))}
+    return {}
+
+
+def save_results(entries):
+    """
+    Writes validated results with one read and one unordered bulk_write
+    per collection, then folds them into each user's stats with a single
+    update per user.
+    `entries` are (user_id, kind, fields) tuples; returns one error string
+    (or None on success) per entry, in order.
+    Repeats of the same quiz/explanation within a batch collapse to the
+    last one, which is what sequential saves would have left behind.
+    """
+    now = datetime.utcnow()
+    last = {}
+    for index, (user_id, kind, fields) in enumerate(entries):
+        last[_entry_key(user_id, kind, fields)] = index
+    unique = sorted(last.values())
+
+    quizzes = [i for i in unique if entries[i][1] == QUIZ]
+    explanations = [i for i in unique if entries[i][1] == EXPLANATION]
+    errors = {}
+    activity = defaultdict(lambda: ([], []))
+
+    batches = (
+        (QUIZ, quizzes, db.quiz_result, _quiz_op, ("topic",),
+         {"quiz_score": 1, "total_questions": 1, "level": 1}),
+        (EXPLANATION, explanations, db.explanations, _explanation_op, ("topic", "level"), {}),
+    )
+    for kind, indexes, collection, make_op, key_fields, projection in batches:
+        if not indexes:
+            continue
+        batch = [entries[i] for i in indexes]
+        try:
+            existing = _existing(collection, kind, batch, key_fields, projection)
+        except Exception as e:
+            errors.update({i: str(e) for i in indexes})
+            continue
+        failed = _bulk_upsert(collection, [make_op(user_id, fields, now) for user_id, _, fields in batch])
+        for n, (user_id, _, fields) in enumerate(batch):
+            if n in failed:
+                errors[indexes[n]] = failed[n]
+                continue
+            # Read just before the write; a concurrent save of the same item can skew one delta.
+            before = existing.get((user_id, *(fields[f] for f in key_fields)))
+            if kind == QUIZ:
+                activity[user_id][0].append((fields["topic"], fields["level"], fields["quiz_score"],
+                                             fields["total_questions"], before))
+            else:
+                activity[user_id][1].append((fields["topic"], fields["level"], before is None))
+
+    for user_id, (user_quizzes, user_explanations) in activity.items():
+        try:
+            record_activity(db, user_id, user_quizzes, user_explanations, now=now)
+        except Exception as e:
+            # The results are stored; `flask backfill-user-stats` can repair the counters.
+            logger.warning("stats update failed for %s: %s", user_id, e)
+
+    return [errors.get(last[_entry_key(*entry)]) for entry in entries]
+
+
+# Coalesces saves from concurrent requests into shared bulk writes
+result_writer = WriteCoalescer(
+    save_results,
+    window=Config.PROGRESS_WRITE_WINDOW_MS / 1000.0,
+    max_batch=Config.PROGRESS_WRITE_MAX_BATCH,
+)
+
+
+def save_quiz(user_id, topic, quiz_score, total_questions, level, questions, time_spent):
+    """
+    Saves or updates quiz progress for a topic.
+    Stores all details including questions in one collection.
+    Adds a 'type' field for filtering.
+    Keeps the user's pre-aggregated stats in step with the stored result.
+    """
+    fields = {
+        "topic": topic,
+        "quiz_score": quiz_score,
+        "total_questions": total_questions,
+        "level": level,
+        "questions": questions,
+        "time_spent": time_spent,
+    }
+    error, = result_writer.submit([(user_id, QUIZ, fields)])
+    if error:
+        raise RuntimeError(error)
+    return {"status": "success", "message": "Quiz saved successfully"}
+
+
+def save_explanation(user_id, topic, level, explanation):
+    """
+    Stores an explanation for a topic along with level and user ID.
+    Adds a 'type' field for filtering.
+    If the same user adds an explanation for the same topic & level,
+    it updates the existing record.
+    """
+    fields = {"topic": topic, "level": level, "explanation": explanation}
+    error, = result_writer.submit([(user_id, EXPLANATION, fields)])
+    if error:
+        raise RuntimeError(error)
     return {"status": "success", "message": "Explanation saved successfully"}
 
 def get_user_progress(user_id):
     return list(db.progress.find({"user_id": user_id}, {"_id": 0}))
+
+def get_answered_questions(user_id, topics):
+    """Question texts from the user's stored quiz results for any of `topics`."""
+    try:
+        docs = list(db.quiz_result.find(
+            {"user_id": user_id, "topic": {"$in": list(topics)}, "type": QUIZ},
+            {"questions.question": 1, "_id": 0},
+        ))
+    except PyMongoError as e:
+        logger.warning("answered questions lookup failed: %s", e)
+        return []
+    return [q["question"] for doc in docs for q in doc.get("questions", [])
+            if isinstance(q, dict) and q.get("question")]
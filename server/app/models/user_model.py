@@ -1,2 +1,73 @@
+import threading
+import time
+from collections import OrderedDict
+
+import bson
+
+from config import Config
+
+
 def get_user_collection(db):
     return db["users"]
+
+
+class ProfileCache:
+    """
+    Small TTL + LRU cache of public user profiles (no password hash).
+    Process-local, so the TTL bounds how stale another worker's copy can
+    be after `invalidate`.
+    """
+
+    def __init__(self, max_entries=1024, ttl=300):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user_id):
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None:
+                return None
+            expires_at, profile = entry
+            if expires_at <= time.time():
+                del self._entries[user_id]
+                return None
+            self._entries.move_to_end(user_id)
+            return dict(profile)
+
+    def put(self, user_id, profile):
+        with self._lock:
+            self._entries[user_id] = (time.time() + self.ttl, dict(profile))
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, user_id):
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+
+profile_cache = ProfileCache(Config.USER_PROFILE_CACHE_SIZE, Config.USER_PROFILE_CACHE_TTL)
+
+
+def get_user_profile(db, user_id):
+    """The user's document without the password hash, `_id` as a string; None if unknown."""
+    profile = profile_cache.get(user_id)
+    if profile is not None:
+        return profile
+    try:
+        object_id = bson.ObjectId(user_id)
+    except bson.errors.InvalidId:
+        return None
+    user = get_user_collection(db).find_one({"_id": object_id}, {"password": 0})
+    if not user:
+        return None
+    user["_id"] = str(user["_id"])
+    profile_cache.put(user_id, user)
+    return user
+
+
+def invalidate_user_profile(user_id):
+    """Call after any write to a user's document."""
+    profile_cache.invalidate(str(user_id))
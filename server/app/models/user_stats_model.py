@@ -0,0 +1,236 @@
+import re
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+from app.utils.explanation_store import normalize_topic
+
+
+def _field(name):
+    """Makes a user-supplied topic/level usable as a MongoDB field name."""
+    return re.sub(r"[.$]", "_", name) or "_"
+
+
+def _topic_field(topic):
+    return _field(normalize_topic(topic))
+
+
+def _level_field(level):
+    return _field(str(level or "unknown").strip().lower())
+
+
+def quiz_percent(score, total):
+    """Percent score of one quiz attempt; also kept per quiz document as its best (`best_percent`)."""
+    return (score / total) * 100 if total else 0
+
+
+def _quiz_contribution(score, total, level, topic):
+    """The counters one stored quiz result adds to a user's stats."""
+    graded = 1 if total else 0
+    percent = quiz_percent(score or 0, total or 0)
+    contribution = {
+        "graded_quiz_count": graded,
+        "percent_sum": percent,
+        "score_sum": score or 0,
+        "question_sum": total or 0,
+    }
+    for prefix in (f"levels.{_level_field(level)}", f"topics.{_topic_field(topic)}"):
+        contribution[f"{prefix}.graded_quiz_count"] = graded
+        contribution[f"{prefix}.percent_sum"] = percent
+    return contribution
+
+
+def _add_quiz(inc, best, topic, level, score, total, previous=None):
+    """
+    Adds one quiz save to the pending `$inc` / `$max` fields.
+    `previous` is the quiz document the upsert replaced (None for a new
+    quiz); its contribution is subtracted so retakes don't double count.
+    """
+    for field, value in _quiz_contribution(score, total, level, topic).items():
+        inc[field] += value
+    if previous is None:
+        inc["quiz_count"] += 1
+        inc[f"levels.{_level_field(level)}.quiz_count"] += 1
+        inc[f"topics.{_topic_field(topic)}.quiz_count"] += 1
+    else:
+        old = _quiz_contribution(previous.get("quiz_score"), previous.get("total_questions"),
+                                 previous.get("level"), topic)
+        for field, value in old.items():
+            inc[field] -= value
+        if _level_field(previous.get("level")) != _level_field(level):
+            inc[f"levels.{_level_field(previous.get('level'))}.quiz_count"] -= 1
+            inc[f"levels.{_level_field(level)}.quiz_count"] += 1
+    field = f"topics.{_topic_field(topic)}.best_percent"
+    best[field] = max(best.get(field, 0), quiz_percent(score or 0, total or 0))
+
+
+def _add_explanation(inc, topic, level, is_new):
+    if is_new:
+        inc["explanation_count"] += 1
+        inc[f"levels.{_level_field(level)}.explanation_count"] += 1
+        inc[f"topics.{_topic_field(topic)}.explanation_count"] += 1
+
+
+def record_activity(db, user_id, quizzes=(), explanations=(), now=None):
+    """
+    Applies any number of saves for one user with a single stats write
+    plus the streak update. Call it after the saves are stored: a user
+    whose stats were never built from their history (no `backfilled`
+    flag, e.g. the first save after deploy) gets a full rebuild instead,
+    which already includes them.
+    quizzes:      (topic, level, score, total, previous) tuples
+    explanations: (topic, level, is_new) tuples
+    """
+    now = now or datetime.utcnow()
+    inc = defaultdict(int)
+    best = {}
+    for topic, level, score, total, previous in quizzes:
+        _add_quiz(inc, best, topic, level, score, total, previous)
+    for topic, level, is_new in explanations:
+        _add_explanation(inc, topic, level, is_new)
+
+    update = {"$set": {"last_activity_at": now}}
+    if best:
+        update["$max"] = best
+    inc = {k: v for k, v in inc.items() if v}
+    if inc:
+        update["$inc"] = inc
+    result = db.user_stats.update_one({"_id": user_id, "backfilled": True}, update)
+    if not result.matched_count:
+        rebuild_user_stats(db, user_id)
+        return
+    _touch_streak(db, user_id, now)
+
+
+def record_quiz(db, user_id, topic, level, score, total, previous=None, now=None):
+    """Applies one quiz save to `user_stats`."""
+    record_activity(db, user_id, quizzes=[(topic, level, score, total, previous)], now=now)
+
+
+def record_explanation(db, user_id, topic, level, is_new, now=None):
+    record_activity(db, user_id, explanations=[(topic, level, is_new)], now=now)
+
+
+def _touch_streak(db, user_id, now):
+    """Extends or resets the daily activity streak atomically (aggregation-pipeline update)."""
+    today = datetime(now.year, now.month, now.day)
+    yesterday = today - timedelta(days=1)
+    db.user_stats.update_one(
+        {"_id": user_id},
+        [
+            {"$set": {
+                "current_streak": {"$switch": {
+                    "branches": [
+                        {"case": {"$eq": ["$last_active_day", today]},
+                         "then": "$current_streak"},
+                        {"case": {"$eq": ["$last_active_day", yesterday]},
+                         "then": {"$add": [{"$ifNull": ["$current_streak", 0]}, 1]}},
+                    ],
+                    "default": 1,
+                }},
+                "last_active_day": today,
+            }},
+            {"$set": {"longest_streak": {"$max": [{"$ifNull": ["$longest_streak", 0]}, "$current_streak"]}}},
+        ],
+        upsert=True,
+    )
+
+
+def get_user_stats(db, user_id):
+    """The user's stats document, rebuilt from history when it is missing or was never backfilled."""
+    stats = db.user_stats.find_one({"_id": user_id})
+    if stats is None or not stats.get("backfilled"):
+        stats = rebuild_user_stats(db, user_id)
+    return stats
+
+
+def summarize_stats(stats):
+    """The numbers the dashboard card shows."""
+    stats = stats or {}
+    graded = stats.get("graded_quiz_count", 0)
+    return {
+        "total_quiz_given": int(stats.get("quiz_count", 0)),
+        "total_topics_explained": int(stats.get("explanation_count", 0)),
+        "avg_quiz_percent": round(stats.get("percent_sum", 0) / graded, 2) if graded else 0,
+        "current_streak": stats.get("current_streak", 0),
+        "longest_streak": stats.get("longest_streak", 0),
+    }
+
+
+# ==== Backfill ====
+def _streaks(days, today):
+    """(current, longest) run of consecutive days, `current` counting back from the last active day."""
+    if not days:
+        return 0, 0
+    days = sorted(days)
+    longest = run = 1
+    for prev, day in zip(days, days[1:]):
+        run = run + 1 if day - prev == timedelta(days=1) else 1
+        longest = max(longest, run)
+    current = run if today - days[-1] <= timedelta(days=1) else 0
+    return current, longest
+
+
+def rebuild_user_stats(db, user_id):
+    """Recomputes one user's stats document from quiz_result and explanations."""
+    stats = defaultdict(int)
+    best = {}
+    days = set()
+    last_activity = None
+
+    quizzes = db.quiz_result.find(
+        {"user_id": user_id},
+        {"topic": 1, "level": 1, "quiz_score": 1, "total_questions": 1, "best_percent": 1, "updated_at": 1},
+    )
+    for quiz in quizzes:
+        topic, level = quiz.get("topic", ""), quiz.get("level")
+        score, total = quiz.get("quiz_score", 0), quiz.get("total_questions", 0)
+        stats["quiz_count"] += 1
+        stats[f"levels.{_level_field(level)}.quiz_count"] += 1
+        stats[f"topics.{_topic_field(topic)}.quiz_count"] += 1
+        for field, value in _quiz_contribution(score, total, level, topic).items():
+            stats[field] += value
+        # A retake replaces the document, so its best attempt is kept on it (older ones only have the latest).
+        field = f"topics.{_topic_field(topic)}.best_percent"
+        best[field] = max(best.get(field, 0), quiz.get("best_percent", 0), quiz_percent(score or 0, total or 0))
+        if quiz.get("updated_at"):
+            days.add(quiz["updated_at"].date())
+            last_activity = max(last_activity or quiz["updated_at"], quiz["updated_at"])
+
+    explanations = db.explanations.find({"user_id": user_id}, {"topic": 1, "level": 1, "updated_at": 1})
+    for explanation in explanations:
+        topic, level = explanation.get("topic", ""), explanation.get("level")
+        stats["explanation_count"] += 1
+        stats[f"levels.{_level_field(level)}.explanation_count"] += 1
+        stats[f"topics.{_topic_field(topic)}.explanation_count"] += 1
+        if explanation.get("updated_at"):
+            days.add(explanation["updated_at"].date())
+            last_activity = max(last_activity or explanation["updated_at"], explanation["updated_at"])
+
+    current, longest = _streaks(days, datetime.utcnow().date())
+    doc = {}
+    for path, value in list(stats.items()) + list(best.items()):
+        target = doc
+        *parents, leaf = path.split(".")
+        for parent in parents:
+            target = target.setdefault(parent, {})
+        target[leaf] = value
+    doc.update({
+        "current_streak": current,
+        "longest_streak": longest,
+        "last_activity_at": last_activity,
+        "last_active_day": datetime.combine(max(days), datetime.min.time()) if days else None,
+        "backfilled": True,
+    })
+    db.user_stats.replace_one({"_id": user_id}, doc, upsert=True)
+    return doc
+
+
+def backfill_user_stats(db, user_id=None):
+    """Rebuilds stats for one user, or for every user with quiz or explanation history."""
+    if user_id:
+        user_ids = [user_id]
+    else:
+        user_ids = set(db.quiz_result.distinct("user_id")) | set(db.explanations.distinct("user_id"))
+    for uid in user_ids:
+        rebuild_user_stats(db, uid)
+    return len(user_ids)
@@ -1,13 +1,40 @@
-from flask import Blueprint
-from app.routes.quiz import generate_quiz
-from app.routes.explain import explain_topic
+from flask import Blueprint, jsonify
+from app.utils.quiz_cache import quiz_cache
+from app.services.quiz_bank import quiz_bank
+from app.utils.startup import lazy, load
 ai_bp = Blueprint("ai", __name__)
 
+# Imported on first use: the quiz and explanation handlers pull in LangChain
+generate_quiz = lazy("app.routes.quiz:generate_quiz")
+explain_topic = lazy("app.routes.explain:explain_topic")
+
 
 @ai_bp.route("/quiz", methods=["POST"])
 def quiz():
     return generate_quiz()
 
+@ai_bp.route("/quiz/cache/stats", methods=["GET"])
+def quiz_cache_stats():
+    return jsonify(quiz_cache.get_stats())
+
+@ai_bp.route("/quiz/bank/stats", methods=["GET"])
+def quiz_bank_stats():
+    if quiz_bank is None:
+        return jsonify({"enabled": False})
+    return jsonify({"enabled": True, **quiz_bank.get_stats()})
+
+@ai_bp.route("/topics/stats", methods=["GET"])
+def topic_index_stats():
+    topic_resolver = load("app.services.topic_index").topic_resolver
+    if topic_resolver is None:
+        return jsonify({"enabled": False})
+    return jsonify({"enabled": True, **topic_resolver.get_stats()})
+
+@ai_bp.route("/models/stats", methods=["GET"])
+def model_stats():
+    registry = load("app.services.llm_registry").registry
+    return jsonify(registry.stats())
+
 @ai_bp.route("/explain", methods=["POST"])
 def explain():
-    return explain_topic()
\ No newline at end of file
+    return explain_topic()
@@ -0,0 +1,265 @@
+"""
+Async versions of the LLM-bound endpoints, routed by asgi.py (which
+imports this module on the first request or during the warm-up).
+
+They share validation, prompts and caches with the Flask views but await
+the model (`ainvoke` / `astream`) instead of blocking a worker thread, so a
+single process can hold hundreds of model calls open. Blocking pieces
+(MongoDB lookups, page and transcript fetching) run on the threadpool.
+"""
+import asyncio
+import json
+
+from starlette.concurrency import run_in_threadpool
+from starlette.responses import JSONResponse, StreamingResponse
+
+from app.routes.quiz import (
+    abuild_quiz, accept_streamed, bank_quiz, banked_quiz, canonical_quiz_input, finish_quiz_stream, is_cacheable_quiz,
+    parse_quiz_request, quiz_chain, replay_quiz,
+)
+from app.routes.summarize import (
+    SourceError, engine, summary_cache, url_final_step,
+)
+from app.services.llm_registry import get_chat_model
+from app.utils.langchain_model import explanation_prompt, explanation_store
+from app.utils.jwt_utils import decode_jwt
+from app.utils.metrics import report_error
+from app.utils.quiz_cache import quiz_cache
+from app.utils.quiz_parser import QuizStreamParser
+from app.utils.streaming import STREAM_FORMATS, format_event, parse_stream_format
+from app.utils.summary_cache import url_source
+
+
+# ==== Request / response helpers ====
+async def _json_body(request):
+    try:
+        body = await request.json()
+    except (json.JSONDecodeError, UnicodeDecodeError):
+        return {}
+    return body if isinstance(body, dict) else {}
+
+
+def _stream_format(request, body):
+    value = request.query_params.get("stream")
+    return parse_stream_format(value if value is not None else body.get("stream"))
+
+
+def _user_id(request):
+    """The bearer token's user id, or None; these routes work without signing in."""
+    scheme, _, token = request.headers.get("Authorization", "").partition(" ")
+    if scheme.lower() != "bearer" or not token.strip():
+        return None
+    claims = decode_jwt(token.strip())
+    return str(claims["sub"]) if claims.get("sub") and "error" not in claims else None
+
+
+def _stream_response(events, fmt):
+    """Async counterpart of streaming.stream_events: errors become a final `error` event."""
+    async def generate():
+        try:
+            async for event in events:
+                yield format_event(event, fmt)
+        except Exception as e:
+            report_error("stream", e)
+            yield format_event({"type": "error", "error": str(e)}, fmt)
+
+    return StreamingResponse(
+        generate(),
+        media_type=STREAM_FORMATS[fmt],
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+async def _aiter(events):
+    for event in events:
+        yield event
+
+
+async def _astream_tokens(chunks, parts):
+    """Async stream_tokens: collects the text into `parts` as it yields token events."""
+    async for chunk in chunks:
+        text = getattr(chunk, "content", chunk)
+        if not text:
+            continue
+        parts.append(text)
+        yield {"type": "token", "content": text}
+
+
+# ==== Quiz ====
+async def quiz(request):
+    body = await _json_body(request)
+    prompt_input, error = parse_quiz_request(body)
+    if error:
+        return JSONResponse({"error": error}, status_code=400)
+    prompt_input = await run_in_threadpool(canonical_quiz_input, prompt_input)
+    topic, level, num_questions = prompt_input["canonical_topic"], prompt_input["level"], prompt_input["num_questions"]
+
+    stream_format = _stream_format(request, body)
+    banked = await run_in_threadpool(banked_quiz, prompt_input, _user_id(request))
+    if banked is not None:
+        if stream_format:
+            return _stream_response(_aiter(replay_quiz(banked)), stream_format)
+        return JSONResponse(banked)
+
+    cached = await run_in_threadpool(quiz_cache.get, topic, level, num_questions)
+    if cached is not None:
+        if stream_format:
+            return _stream_response(_aiter(replay_quiz(cached)), stream_format)
+        return JSONResponse(cached)
+
+    chain = quiz_chain()
+    if stream_format:
+        return _stream_response(_astream_quiz(chain, prompt_input), stream_format)
+    try:
+        result = await chain.ainvoke(prompt_input)
+        quiz_data, status = await abuild_quiz(prompt_input, result.content)
+        if is_cacheable_quiz(quiz_data):
+            await run_in_threadpool(quiz_cache.put, topic, level, num_questions, quiz_data)
+            await run_in_threadpool(bank_quiz, prompt_input, quiz_data)
+        return JSONResponse(quiz_data, status_code=status)
+    except Exception as e:
+        report_error("quiz", e)
+        return JSONResponse({"error": str(e)}, status_code=500)
+
+
+async def _astream_quiz(chain, prompt_input):
+    parser = QuizStreamParser()
+    questions = []
+    async for chunk in chain.astream(prompt_input):
+        for question in accept_streamed(parser, chunk.content, questions, prompt_input["num_questions"]):
+            yield {"type": "question", "question": question}
+    for event in await run_in_threadpool(list, finish_quiz_stream(prompt_input, questions)):
+        yield event
+
+
+# ==== Explanation ====
+async def explain(request):
+    body = await _json_body(request)
+    topic = body.get("topic")
+    level = body.get("level", "intermediate")
+    if not topic:
+        return JSONResponse({"error": "Topic is required"}, status_code=400)
+
+    stream_format = _stream_format(request, body)
+    if stream_format:
+        return _stream_response(_astream_explanation(topic, level), stream_format)
+    try:
+        explanation = await run_in_threadpool(explanation_store.lookup, topic, level)
+        if explanation is None:
+            response = await get_chat_model("explain").ainvoke(explanation_prompt(topic, level))
+            explanation = response.content
+            await run_in_threadpool(explanation_store.put, topic, level, explanation)
+        return JSONResponse({"explanation": explanation})
+    except Exception as e:
+        return JSONResponse({"error": str(e)}, status_code=500)
+
+
+async def _astream_explanation(topic, level):
+    explanation = await run_in_threadpool(explanation_store.lookup, topic, level)
+    if explanation is not None:
+        yield {"type": "token", "content": explanation}
+        yield {"type": "done", "explanation": explanation, "cached": True}
+        return
+    parts = []
+    async for event in _astream_tokens(get_chat_model("explain").astream(explanation_prompt(topic, level)), parts):
+        yield event
+    explanation = "".join(parts)
+    await run_in_threadpool(explanation_store.put, topic, level, explanation)
+    yield {"type": "done", "explanation": explanation, "cached": False}
+
+
+# ==== URL summary ====
+async def _asummarize_url(url, ln):
+    # Fetching, planning and any map/refine calls run on a thread; the final call is awaited.
+    chain, prompt_input = await run_in_threadpool(url_final_step, url, ln)
+    await run_in_threadpool(engine.acquire, prompt_input)
+    return (await chain.ainvoke(prompt_input)).content
+
+
+async def _summary_or_compute(source, ln, compute):
+    """
+    Async get_or_compute: concurrent requests for one source in this process
+    share a single run, and workers share it through the cache's lease.
+    """
+    key = summary_cache.key(source, ln)
+    summary = await run_in_threadpool(summary_cache.get, key)
+    if summary is not None:
+        return key, summary, True
+    flight, leader = summary_cache.async_flights.begin(key)
+    if not leader:
+        return key, await asyncio.shield(flight), True
+    try:
+        summary = await run_in_threadpool(summary_cache.acquire_lease, key)
+        cached = summary is not None
+        if not cached:
+            with summary_cache.holding_lease(key):
+                summary = await compute()
+            await run_in_threadpool(summary_cache.put, key, source, ln, summary)
+    except BaseException as e:
+        try:
+            await run_in_threadpool(summary_cache.release_lease, key)
+        finally:
+            summary_cache.async_flights.end(key, error=e if isinstance(e, Exception) else RuntimeError("Summary cancelled"))
+        raise
+    summary_cache.async_flights.end(key, result=summary)
+    return key, summary, cached
+
+
+async def _astream_url_summary(source, url, ln):
+    key = summary_cache.key(source, ln)
+    summary = await run_in_threadpool(summary_cache.get, key)
+    if summary is None:
+        flight, leader = summary_cache.async_flights.begin(key)
+        if not leader:
+            summary = await asyncio.shield(flight)
+        else:
+            cached = True
+            try:
+                summary = await run_in_threadpool(summary_cache.acquire_lease, key)
+                if summary is None:
+                    cached = False
+                    with summary_cache.holding_lease(key):
+                        chain, prompt_input = await run_in_threadpool(url_final_step, url, ln)
+                        await run_in_threadpool(engine.acquire, prompt_input)
+                        parts = []
+                        async for event in _astream_tokens(chain.astream(prompt_input), parts):
+                            yield event
+                        summary = "".join(parts)
+                    await run_in_threadpool(summary_cache.put, key, source, ln, summary)
+            except BaseException as e:
+                # Also covers a client disconnect; followers must not hang.
+                try:
+                    await run_in_threadpool(summary_cache.release_lease, key)
+                finally:
+                    summary_cache.async_flights.end(
+                        key, error=e if isinstance(e, Exception) else RuntimeError("Summary stream cancelled"))
+                raise
+            summary_cache.async_flights.end(key, result=summary)
+            if not cached:
+                yield {"type": "done", "summary": summary, "summary_id": key, "cached": False}
+                return
+    yield {"type": "token", "content": summary}
+    yield {"type": "done", "summary": summary, "summary_id": key, "cached": True}
+
+
+async def summarize_url(request):
+    body = await _json_body(request)
+    url = body.get("url")
+    ln = body.get("language", "English")
+    if not url:
+        return JSONResponse({"error": "URL is required"}, status_code=400)
+    source = url_source(url)
+
+    stream_format = _stream_format(request, body)
+    if stream_format:
+        return _stream_response(_astream_url_summary(source, url, ln), stream_format)
+    try:
+        summary_id, summary, cached = await _summary_or_compute(source, ln, lambda: _asummarize_url(url, ln))
+        return JSONResponse({"summary": summary, "summary_id": summary_id, "cached": cached})
+    except SourceError as e:
+        report_error("summarize_url", e)
+        return JSONResponse({"error": str(e)}, status_code=400)
+    except Exception as e:
+        report_error("summarize_url", e)
+        return JSONResponse({"error": str(e)}, status_code=500)
+
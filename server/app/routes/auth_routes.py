@@ -1,16 +1,20 @@
 from flask import Blueprint, request, jsonify
-from flask_jwt_extended import create_access_token, jwt_required, get_jwt_identity
-from app.models.user_model import get_user_collection
-from app.services.auth_service import hash_password, verify_password
-from config import Config
-from pymongo import MongoClient
-import bson
+from flask_jwt_extended import create_access_token
+from app.models.user_model import get_user_collection, get_user_profile
+from app.services.auth_service import HasherBusy, hash_password, needs_rehash, verify_password
+from app.models.db import db
+from app.utils.jwt_utils import auth_error_response, current_user_id
+from pymongo.errors import DuplicateKeyError
 
 auth_bp = Blueprint("auth", __name__)
-mongo = MongoClient(Config.MONGO_URI)
-db = mongo["edugenie"]
 users = get_user_collection(db)
 
+@auth_bp.errorhandler(HasherBusy)
+def hasher_busy(e):
+    response = jsonify({"error": "Server is busy, please retry"})
+    response.headers["Retry-After"] = "1"
+    return response, 503
+
 @auth_bp.route("/signup", methods=["POST"])
 def register():
     data = request.json
@@ -22,11 +26,14 @@ def register():
         return jsonify({"error": "User already exists"}), 409
 
     hashed_pw = hash_password(password)
-    users.insert_one({
-        "name": name,
-        "email": email,
-        "password": hashed_pw
-    })
+    try:
+        users.insert_one({
+            "name": name,
+            "email": email,
+            "password": hashed_pw
+        })
+    except DuplicateKeyError:
+        return jsonify({"error": "User already exists"}), 409
 
     return jsonify({"message": "User registered successfully"}), 201
 
@@ -40,13 +47,25 @@ def login():
     if not user or not verify_password(password, user["password"]):
         return jsonify({"error": "Invalid credentials"}), 401
 
+    # Upgrade hashes made with an older work factor while we have the password
+    if needs_rehash(user["password"]):
+        try:
+            users.update_one(
+                {"_id": user["_id"], "password": user["password"]},
+                {"$set": {"password": hash_password(password)}}
+            )
+        except HasherBusy:
+            pass  # upgrade on a later login
+
     token = create_access_token(identity=str(user["_id"]))
     return jsonify({"access_token": token}), 200
 
 @auth_bp.route("/me", methods=["GET"])
-@jwt_required()
 def me():
-    user_id = get_jwt_identity()
-    user = users.find_one({"_id": bson.ObjectId(user_id)}, {"password": 0})
-    user["_id"] = str(user["_id"])
+    user_id = current_user_id()
+    if not user_id:
+        return auth_error_response()
+    user = get_user_profile(db, user_id)
+    if not user:
+        return jsonify({"error": "User not found"}), 404
     return jsonify(user)
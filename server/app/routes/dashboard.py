@@ -1,12 +1,10 @@
 from flask import jsonify, request
-from app.utils.jwt_utils import decode_jwt
+from app.utils.jwt_utils import auth_error_response, current_user_id
 from app.models.progress_model import get_user_progress
-from pymongo import MongoClient
+from app.models.user_stats_model import get_user_stats, summarize_stats
+from app.models.db import db
 from datetime import datetime
-import os
 
-mongo = MongoClient(os.getenv("MONGO_URI"))
-db = mongo["edugenie"]
 # def get_dashboard_data():
 #     auth_header = request.headers.get("Authorization")
 #     if not auth_header:
@@ -49,40 +47,13 @@ db = mongo["edugenie"]
 #         "recent_topics": recent_topics
 #     })
 def get_dashboard_data():
-    auth_header = request.headers.get("Authorization")
-    if not auth_header:
-        return jsonify({"error": "Missing token"}), 401
-
-    token = auth_header.split(" ")[1]
-    try:
-        decoded = decode_jwt(token)
-        user_id = decoded["sub"]
-    except Exception as e:
-        return jsonify({"error": "Invalid token"}), 401
+    user_id = current_user_id()
+    if not user_id:
+        return auth_error_response()
     try:
-        # 1️⃣ Total quiz given
-        quiz_count = db.quiz_result.count_documents({"user_id": user_id})
-        print(quiz_count)
-        # 2️⃣ Total topics explained
-        topics_count = db.explanations.count_documents({"user_id": user_id})
-
-        # 3️⃣ Average quiz percentage
-        quiz_results = db.quiz_result.find({"user_id": user_id})
-        scores = []
-        for q in quiz_results:
-            total_q = q.get("total_questions", 0)
-            score = q.get("quiz_score", 0)
-            if total_q > 0:
-                scores.append((score / total_q) * 100)  # percentage for each quiz
-
-        avg_percent = round(sum(scores) / len(scores), 2) if scores else 0
-
-
-        return jsonify({
-            "total_quiz_given": quiz_count,
-            "total_topics_explained": topics_count,
-            "avg_quiz_percent": avg_percent
-        }), 200
+        # Single point read of the incrementally maintained stats document
+        stats = get_user_stats(db, user_id)
+        return jsonify(summarize_stats(stats)), 200
 
     except Exception as e:
-        return jsonify({"message": str(e)}), 500
\ No newline at end of file
+        return jsonify({"message": str(e)}), 500
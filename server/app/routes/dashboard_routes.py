@@ -1,6 +1,6 @@
 from flask import Blueprint, jsonify, request
 from app.routes.dashboard import get_dashboard_data
-from app.routes.progress import save_quiz_result,get_progress,save_explanation_result,get_quiz_result
+from app.routes.progress import save_quiz_result,get_progress,save_explanation_result,get_quiz_result,save_results_batch,get_explanation_result
 dashboard_bp = Blueprint("dashboard", __name__)
 
 @dashboard_bp.route("/", methods=["GET"])
@@ -19,6 +19,14 @@ def save_quiz_route():
 def save_explanation_route():
     return save_explanation_result()
 
+@dashboard_bp.route('/save/batch',methods=['POST'])
+def save_batch_route():
+    return save_results_batch()
+
 @dashboard_bp.route('/quiz-result/<string:topic>',methods=['GET'])
 def getquizresult(topic):
-    return get_quiz_result(topic)
\ No newline at end of file
+    return get_quiz_result(topic)
+
+@dashboard_bp.route('/explanation/<string:explanation_id>',methods=['GET'])
+def getexplanation(explanation_id):
+    return get_explanation_result(explanation_id)
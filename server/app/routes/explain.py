@@ -1,5 +1,6 @@
 from flask import request, jsonify
-from app.utils.langchain_model import get_topic_explanation
+from app.utils.langchain_model import get_topic_explanation, stream_topic_explanation
+from app.utils.streaming import get_stream_format, stream_events
 
 def explain_topic():
     data = request.json
@@ -9,8 +10,12 @@ def explain_topic():
     if not topic:
         return jsonify({'error': 'Topic is required'}), 400
 
+    stream_format = get_stream_format()
+    if stream_format:
+        return stream_events(stream_topic_explanation(topic, student_level), stream_format)
+
     try:
         explanation = get_topic_explanation(topic, student_level)
-        return jsonify({'explanation': explanation.content})
+        return jsonify({'explanation': explanation})
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -1,130 +1,176 @@
 from flask import request, jsonify
-from app.utils.jwt_utils import decode_jwt
-from app.models.progress_model import save_quiz, get_user_progress,save_explanation
-from pymongo import MongoClient
+from app.utils.jwt_utils import auth_error_response, current_user_id
+from app.models.progress_model import EXPLANATION, QUIZ, result_writer, validate_explanation, validate_quiz
+from app.models.db import db
+from config import Config
 from datetime import datetime
-import os
+from itertools import islice
+from bson import ObjectId
+from bson.errors import InvalidId
+import base64
+import heapq
+import json
+
+def _save_one(kind, validate, success_message):
+    """Single-item save: the same validation and write path as the batch endpoint."""
+    data = request.json
+    if not data:
+        return jsonify({"error": f"{kind.capitalize()} result data is required"}), 400
 
-mongo = MongoClient(os.getenv("MONGO_URI"))
-db = mongo["edugenie"]
+    user_id = current_user_id()
+    if not user_id:
+        return auth_error_response()
 
-def save_quiz_result():
-    token = request.headers.get("Authorization", "").replace("Bearer ", "")
-    data = request.json
+    fields, error = validate(data)
+    if error:
+        return jsonify({"error": error}), 400
 
-    if not data:
-        return jsonify({"error": "Quiz result data is required"}), 400
+    error, = result_writer.submit([(user_id, kind, fields)])
+    if error:
+        return jsonify({"error": error}), 500
+    return jsonify({"message": success_message}), 200
 
-    try:
-        # Decode JWT token to get user_id
-        payload = decode_jwt(token)
-        user_id = payload.get("sub")
-        if not user_id:
-            return jsonify({"error": "Invalid token"}), 401
-
-        # Extract quiz fields from request
-        topic = data.get("topic")
-        score = data.get("score")
-        total_questions = data.get("totalQuestions")
-        level = data.get("level")
-        questions = data.get("questions", [])
-        time_spent = data.get("timeSpent")
-
-        if not topic or score is None or total_questions is None:
-            return jsonify({"error": "Missing required quiz result fields"}), 400
-
-        # Save both summary progress and full quiz details
-        save_quiz(
-            user_id=user_id,
-            topic=topic,
-            quiz_score=score,
-            total_questions=total_questions,
-            level=level,
-            questions=questions,
-            time_spent=time_spent
-        )
-
-        return jsonify({"message": "Quiz result saved successfully"})
-
-    except Exception as e:
-        return jsonify({"error": str(e)}), 401
+def save_quiz_result():
+    return _save_one(QUIZ, validate_quiz, "Quiz result saved successfully")
 
 def save_explanation_result():
-    token = request.headers.get("Authorization", "").replace("Bearer ", "")
-    data = request.json
+    return _save_one(EXPLANATION, validate_explanation, "Explanation saved successfully")
 
-    if not data:
-        return jsonify({"error": "Quiz result data is required"}), 400
+RESULT_VALIDATORS = {QUIZ: validate_quiz, EXPLANATION: validate_explanation}
 
-    try:
-        # Decode JWT token to get user_id
-        payload = decode_jwt(token)
-        user_id = payload.get("sub")
-        if not user_id:
-            return jsonify({"error": "Invalid token"}), 401
-        # Extract fields
-        topic = data.get("topic")
-        level = data.get("level")
-        explanation = data.get("explanation")
-
-        # Validate required fields
-        if not topic or not level or not explanation:
-            return jsonify({"error": "Missing required explanation fields"}), 400
-
-        # Save/update explanation
-        save_explanation(
-            user_id=user_id,
-            topic=topic,
-            level=level,
-            explanation=explanation
-        )
-
-        return jsonify({"message": "Explanation saved successfully"}), 200
-
-    except Exception as e:
-        return jsonify({"error": str(e)}), 500
+def save_results_batch():
+    """
+    Saves many quiz/explanation results in one request, e.g. a queue
+    replayed by an offline client. Body: {"results": [{"type": "quiz", ...}, ...]}
+    with the same fields as the single-item routes. Every item is validated
+    on its own; the response has one status per item, in request order.
+    """
+    data = request.json
+    items = data.get("results") if isinstance(data, dict) else None
+    if not isinstance(items, list) or not items:
+        return jsonify({"error": "results must be a non-empty list"}), 400
+    if len(items) > Config.PROGRESS_BATCH_MAX_ITEMS:
+        return jsonify({"error": f"At most {Config.PROGRESS_BATCH_MAX_ITEMS} results per request"}), 413
+
+    user_id = current_user_id()
+    if not user_id:
+        return auth_error_response()
+
+    statuses = [None] * len(items)
+    entries, positions = [], []
+    for index, item in enumerate(items):
+        validate = RESULT_VALIDATORS.get(item.get("type")) if isinstance(item, dict) else None
+        if validate is None:
+            statuses[index] = {"index": index, "status": "invalid", "error": "type must be quiz or explanation"}
+            continue
+        fields, error = validate(item)
+        if error:
+            statuses[index] = {"index": index, "status": "invalid", "error": error}
+            continue
+        entries.append((user_id, item["type"], fields))
+        positions.append(index)
+
+    for index, error in zip(positions, result_writer.submit(entries)):
+        statuses[index] = {"index": index, "status": "failed", "error": error} if error else {"index": index, "status": "saved"}
+
+    saved = sum(1 for status in statuses if status["status"] == "saved")
+    if saved == len(items):
+        code = 200
+    elif saved:
+        code = 207
+    else:
+        code = 400 if not entries else 500
+    return jsonify({"saved": saved, "results": statuses}), code
+
+# Heavy per-item fields, only returned when requested with ?fields=
+PROGRESS_HEAVY_FIELDS = {
+    "quiz": ("questions",),
+    "explanation": ("explanation",),
+}
+PROGRESS_PAGE_SIZE = 20
+PROGRESS_MAX_PAGE_SIZE = 100
+
+def _encode_cursor(item):
+    raw = json.dumps({"t": item["updated_at"].isoformat(), "id": str(item["_id"])})
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+def _decode_cursor(cursor):
+    raw = json.loads(base64.urlsafe_b64decode(cursor.encode()).decode())
+    return datetime.fromisoformat(raw["t"]), ObjectId(raw["id"])
+
+def _progress_cursor(collection, item_type, user_id, fields, after, limit):
+    """Newest-first cursor over one collection; heavy fields are projected out unless asked for."""
+    query = {"user_id": user_id}
+    if after:
+        updated_at, last_id = after
+        query["$or"] = [
+            {"updated_at": {"$lt": updated_at}},
+            {"updated_at": updated_at, "_id": {"$lt": last_id}},
+        ]
+    projection = {field: 0 for field in PROGRESS_HEAVY_FIELDS[item_type] if field not in fields}
+    cursor = collection.find(query, projection or None).sort([("updated_at", -1), ("_id", -1)]).limit(limit)
+    for item in cursor:
+        item["type"] = item_type
+        yield item
 
 def get_progress():
-    token = request.headers.get("Authorization", "").replace("Bearer ", "")
-    if not token:
-        return jsonify({"error": "Missing token"}), 401
+    user_id = current_user_id()
+    if not user_id:
+        return auth_error_response()
 
+    type_filter = request.args.get("type", "all").lower()
+    fields = {f.strip() for f in request.args.get("fields", "").split(",") if f.strip()}
     try:
-        payload = decode_jwt(token)
-        user_id = payload.get("sub")
-        type_filter = request.args.get("type", "all").lower()
-
-        quiz_data = list(db.quiz_result.find({"user_id": user_id}, {"_id": 0}))
-        explanation_data = list(db.explanations.find({"user_id": user_id}, {"_id": 0}))
-
-        for q in quiz_data:
-            q["type"] = "quiz"
-        for e in explanation_data:
-            e["type"] = "explanation"
-
-        if type_filter == "quiz":
-            data = quiz_data
-        elif type_filter == "explanation":
-            data = explanation_data
-        else:
-            data = quiz_data + explanation_data
-
-        return jsonify({"items": data})
-
-    except Exception as e:
-        return jsonify({"error": str(e)}), 401
+        limit = min(max(int(request.args.get("limit", PROGRESS_PAGE_SIZE)), 1), PROGRESS_MAX_PAGE_SIZE)
+        after = _decode_cursor(request.args["cursor"]) if request.args.get("cursor") else None
+    except (ValueError, KeyError, TypeError):
+        return jsonify({"error": "Invalid limit or cursor"}), 400
+
+    # Filter pushed into the query: only the requested collections are read.
+    sources = []
+    if type_filter in ("all", "quiz"):
+        sources.append(_progress_cursor(db.quiz_result, "quiz", user_id, fields, after, limit + 1))
+    if type_filter in ("all", "explanation"):
+        sources.append(_progress_cursor(db.explanations, "explanation", user_id, fields, after, limit + 1))
+
+    merged = heapq.merge(*sources, key=lambda item: (item["updated_at"], item["_id"]), reverse=True)
+    items = list(islice(merged, limit + 1))
+
+    next_cursor = None
+    if len(items) > limit:
+        items = items[:limit]
+        next_cursor = _encode_cursor(items[-1])
+    for item in items:
+        item["_id"] = str(item["_id"])
+
+    return jsonify({"items": items, "next_cursor": next_cursor})
 
 def get_quiz_result(topic):
-    token = request.headers.get("Authorization", "").replace("Bearer ", "")
-    payload = decode_jwt(token)
-    user_id = payload.get("sub")
+    user_id = current_user_id()
+    if not user_id:
+        return auth_error_response()
 
     # Find quiz result for this user and topic
     result = db.quiz_result.find_one({"user_id": user_id, "topic": topic})
-    # print(result)
     if not result:
         return jsonify({"error": "Result not found"}), 404
     # Convert Mongo result to dict (if it's a pymongo object)
     result["_id"] = str(result["_id"])  # Convert ObjectId to string
-    print("after converting ",result)
-    return jsonify(result), 200
\ No newline at end of file
+    return jsonify(result), 200
+
+def get_explanation_result(explanation_id):
+    """One saved explanation with its body; the progress list leaves the body out."""
+    user_id = current_user_id()
+    if not user_id:
+        return auth_error_response()
+    try:
+        query = {"_id": ObjectId(explanation_id), "user_id": user_id}
+    except (InvalidId, TypeError):
+        return jsonify({"error": "Result not found"}), 404
+
+    result = db.explanations.find_one(query)
+    if not result:
+        return jsonify({"error": "Result not found"}), 404
+    result["_id"] = str(result["_id"])
+    result["type"] = "explanation"
+    return jsonify(result), 200
@@ -1,53 +1,208 @@
 from flask import request, jsonify
-import json,re
-from app.utils.groq_client import get_groq_model
-from app.utils.prompt_templates import quiz_prompt
+from app.models.progress_model import get_answered_questions
+from app.services.llm_registry import get_chat_model
+from app.services.quiz_bank import quiz_bank
+from app.services.topic_index import register_topic, resolve_topic
+from app.utils.prompt_templates import quiz_prompt, quiz_repair_prompt
+from app.utils.quiz_cache import quiz_cache
+from app.utils.quiz_parser import QuizStreamParser, number_questions, parse_quiz, validate_question
+from config import Config
+from app.utils.jwt_utils import current_user_id
+from app.utils.metrics import report_error
+from app.utils.streaming import get_stream_format, stream_events
 from langchain_core.runnables import RunnableSequence
 
-def extract_json(content: str):
-    # Try to capture JSON inside triple backticks
-    match = re.search(r"```(?:json)?\s*(\{.*?\})\s*```", content, re.DOTALL)
-    if match:
-        return match.group(1)
-
-    # Fallback: try to find first {...} block
-    match = re.search(r"(\{.*\})", content, re.DOTALL)
-    if match:
-        return match.group(1)
-
-    return None
-
-def generate_quiz():
-    data = request.json
+def parse_quiz_request(data):
+    """Returns (prompt_input, error) for a quiz request body."""
+    data = data or {}
     topic = data.get("topic")
     level = data.get("level", "high school")
     num_questions = data.get("num_questions", 5)
 
     if not topic:
-        return jsonify({"error": "Topic is required"}), 400
+        return None, "Topic is required"
+    try:
+        num_questions = int(num_questions)
+    except (TypeError, ValueError):
+        return None, "num_questions must be an integer"
+    return {"topic": topic, "level": level, "num_questions": num_questions}, None
+
+def canonical_quiz_input(prompt_input):
+    """
+    Adds the canonical topic of a near-duplicate, so both share the quiz bank
+    and cache. It is only a key: the prompts keep the requested topic.
+    """
+    return dict(prompt_input, canonical_topic=resolve_topic(prompt_input["topic"]))
+
+def quiz_chain():
+    llm = get_chat_model("quiz")
+    return RunnableSequence(quiz_prompt | llm)
+
+def repair_chain():
+    return RunnableSequence(quiz_repair_prompt | get_chat_model("quiz"))
+
+def repair_input(prompt_input, questions, count):
+    """Prompt input asking for `count` replacements that differ from the questions we kept."""
+    avoid = "\n".join(f"- {q['question']}" for q in questions if q) or "- (none)"
+    return {"topic": prompt_input["topic"], "level": prompt_input["level"], "num_questions": count,
+            "num_options": Config.QUIZ_OPTION_COUNT, "avoid": avoid}
+
+def fill_slots(slots, replacements):
+    """Puts the replacement questions into the empty slots, in order."""
+    fresh = iter([q for q in replacements or [] if q is not None])
+    return [slot if slot is not None else next(fresh, None) for slot in slots]
+
+def quiz_response(slots):
+    """Returns (payload, status) for the final question slots."""
+    questions = [q for q in slots if q is not None]
+    if not questions:
+        return {"error": "The model did not return a usable quiz"}, 502
+    payload = {"quiz": number_questions(questions)}
+    if len(questions) < len(slots):
+        payload["missing"] = len(slots) - len(questions)
+    return payload, 200
+
+def build_quiz(prompt_input, content):
+    """
+    Parses the model's reply and regenerates only the questions that were
+    broken or missing, instead of the whole quiz.
+    """
+    num_questions = prompt_input["num_questions"]
+    slots = parse_quiz(content, num_questions) or [None] * num_questions
+    for _ in range(Config.QUIZ_REPAIR_ATTEMPTS):
+        missing = slots.count(None)
+        if not missing:
+            break
+        try:
+            reply = repair_chain().invoke(repair_input(prompt_input, slots, missing))
+        except Exception as e:
+            report_error("quiz_repair", e)
+            break
+        slots = fill_slots(slots, parse_quiz(reply.content, missing))
+    return quiz_response(slots)
 
-    llm = get_groq_model()
-    chain = RunnableSequence(quiz_prompt | llm)
+async def abuild_quiz(prompt_input, content):
+    num_questions = prompt_input["num_questions"]
+    slots = parse_quiz(content, num_questions) or [None] * num_questions
+    for _ in range(Config.QUIZ_REPAIR_ATTEMPTS):
+        missing = slots.count(None)
+        if not missing:
+            break
+        try:
+            reply = await repair_chain().ainvoke(repair_input(prompt_input, slots, missing))
+        except Exception as e:
+            report_error("quiz_repair", e)
+            break
+        slots = fill_slots(slots, parse_quiz(reply.content, missing))
+    return quiz_response(slots)
+
+def banked_quiz(prompt_input, user_id=None):
+    """A quiz sampled from the quiz bank, skipping questions the user has already answered."""
+    if quiz_bank is None:
+        return None
+    topic = prompt_input.get("canonical_topic", prompt_input["topic"])
+    topics = {topic, prompt_input["topic"]}
+    exclude = get_answered_questions(user_id, topics) if user_id else []
+    return quiz_bank.assemble(topic, prompt_input["level"], prompt_input["num_questions"], exclude)
+
+def bank_quiz(prompt_input, quiz_data):
+    """Keeps freshly generated questions so later requests can be served from the bank."""
+    topic = prompt_input.get("canonical_topic", prompt_input["topic"])
+    if is_cacheable_quiz(quiz_data):
+        register_topic(topic)
+    if quiz_bank is not None and is_cacheable_quiz(quiz_data):
+        quiz_bank.add(topic, prompt_input["level"], quiz_data["quiz"])
+
+def is_cacheable_quiz(quiz_data):
+    """Only complete quizzes are cached; a partial one gets another chance next time."""
+    return isinstance(quiz_data, dict) and bool(quiz_data.get("quiz")) and not quiz_data.get("missing")
+
+def generate_quiz():
+    prompt_input, error = parse_quiz_request(request.json)
+    if error:
+        return jsonify({"error": error}), 400
+    prompt_input = canonical_quiz_input(prompt_input)
+    topic, level, num_questions = prompt_input["canonical_topic"], prompt_input["level"], prompt_input["num_questions"]
+
+    stream_format = get_stream_format()
+    banked = banked_quiz(prompt_input, current_user_id())
+    if banked is not None:
+        if stream_format:
+            return stream_events(replay_quiz(banked), stream_format)
+        return jsonify(banked)
 
-    prompt_input = {
-        "topic": topic,
-        "level": level,
-        "num_questions": num_questions
-    }
+    cached = quiz_cache.get(topic, level, num_questions)
+    if cached is not None:
+        if stream_format:
+            return stream_events(replay_quiz(cached), stream_format)
+        return jsonify(cached)
+
+    chain = quiz_chain()
+    if stream_format:
+        return stream_events(_stream_quiz(chain, prompt_input), stream_format)
     try:
         result = chain.invoke(prompt_input)
-        content = result.content
-        json_str = extract_json(content)
+        quiz_data, status = build_quiz(prompt_input, result.content)
+        if is_cacheable_quiz(quiz_data):
+            quiz_cache.put(topic, level, num_questions, quiz_data)
+            bank_quiz(prompt_input, quiz_data)
+        return jsonify(quiz_data), status
+
+    except Exception as e:
+        report_error("quiz", e)
+        return jsonify({"error": str(e)}), 500
 
-        if not json_str:
-            return jsonify({"error": "No JSON found", "raw": content})
+def replay_quiz(quiz_data):
+    for question in quiz_data.get("quiz", []):
+        yield {"type": "question", "question": question}
+    yield {"type": "done", "quiz": quiz_data, "cached": True}
 
+def accept_streamed(parser, text, questions, limit):
+    """Validated questions completed by `text`, numbered in arrival order."""
+    accepted = []
+    for item in parser.feed(text or ""):
+        question, _ = validate_question(item)
+        if question is not None and len(questions) < limit:
+            question["id"] = len(questions) + 1
+            questions.append(question)
+            accepted.append(question)
+    return accepted
+
+def _stream_quiz(chain, prompt_input):
+    """Emits each question as soon as its closing brace has been generated."""
+    parser = QuizStreamParser()
+    questions = []
+    for chunk in chain.stream(prompt_input):
+        for question in accept_streamed(parser, chunk.content, questions, prompt_input["num_questions"]):
+            yield {"type": "question", "question": question}
+    yield from finish_quiz_stream(prompt_input, questions)
+
+def finish_quiz_stream(prompt_input, questions):
+    """Streams replacements for broken or missing questions, then the `done` event."""
+    num_questions = prompt_input["num_questions"]
+    for _ in range(Config.QUIZ_REPAIR_ATTEMPTS):
+        missing = num_questions - len(questions)
+        if not missing:
+            break
         try:
-                quiz_data = json.loads(json_str)
-                return jsonify(quiz_data)
-        except json.JSONDecodeError as e:
-            return jsonify({"error": "Invalid JSON from LLM", "raw": json_str, "details": str(e)})
+            reply = repair_chain().invoke(repair_input(prompt_input, questions, missing))
+        except Exception as e:
+            report_error("quiz_repair", e)
+            break
+        for question in (parse_quiz(reply.content, missing) or []):
+            if question is not None:
+                question["id"] = len(questions) + 1
+                questions.append(question)
+                yield {"type": "question", "question": question}
 
-    except Exception as e:
-        print(e)
-        return jsonify({"error": str(e)}), 500
\ No newline at end of file
+    if not questions:
+        yield {"type": "error", "error": "The model did not return a usable quiz"}
+        return
+    quiz_data = {"quiz": questions}
+    if len(questions) < num_questions:
+        quiz_data["missing"] = num_questions - len(questions)
+    if is_cacheable_quiz(quiz_data):
+        quiz_cache.put(prompt_input.get("canonical_topic", prompt_input["topic"]), prompt_input["level"],
+                       num_questions, quiz_data)
+        bank_quiz(prompt_input, quiz_data)
+    yield {"type": "done", "quiz": quiz_data, "cached": False}
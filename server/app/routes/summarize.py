@@ -0,0 +1,404 @@
+# app/routes/summarize.py: the summarizer's handlers, imported on first use by summarizer_routes
+import datetime
+from flask import Response, request, jsonify, send_file
+
+import re
+# Langchain imports
+from langchain.prompts import PromptTemplate
+from langchain.schema import Document
+from app.utils.streaming import get_stream_format, stream_events, stream_tokens
+from app.services.rate_limits import groq_limiter
+from app.services.summarization_engine import ChunkSummaryCache, SummarizationEngine, estimate_tokens
+from app.services.summary_planner import SummaryPlanner, TokenCounter
+from app.utils.pdf_ingest import SpooledPdf, get_pool, iter_pages
+from app.utils.pdf_export import MissingGlyphs, PdfExportCache, export_key
+from app.utils.http_fetch import fetch_article_text
+from app.utils.metrics import report_error, timed_iter
+from app.utils.summary_cache import SummaryCache, pdf_source, url_source, youtube_video_id
+from app.utils.youtube_transcripts import TranscriptUnavailable, transcript_store
+from app.services.job_queue import (
+    InlineJobExecutor, JobQueue, MemoryJobStore, MongoJobStore, ThreadPoolJobExecutor, serialize_job
+)
+from app.models.db import collection, mongo_enabled
+from app.services.llm_registry import get_chat_model
+from config import Config
+import os
+import shutil
+import sys
+import asyncio
+
+# ==== Fix for Windows Event Loop ====
+if sys.platform.startswith('win'):
+    asyncio.set_event_loop_policy(asyncio.WindowsProactorEventLoopPolicy())
+
+# ==== Load LLM ====
+llm = get_chat_model("summarize")
+
+# ==== Helper Functions ====
+def plan_pdf(spooled):
+    """Streams page text from the spooled upload into the planner; returns (plan, chunks)."""
+    pages = timed_iter("pdf", "extract", iter_pages(
+        spooled,
+        parallel_min_pages=Config.PDF_PARALLEL_MIN_PAGES,
+        workers=Config.PDF_EXTRACT_WORKERS,
+        pages_per_task=Config.PDF_PAGES_PER_TASK,
+    ))
+    plan, chunks = planner.plan_pages(pages)
+    if plan is None:
+        raise SourceError("No text could be extracted from this PDF")
+    return plan, chunks
+
+def get_youtube_transcript(url):
+    """Transcript of a YouTube video as a Document, from the shared transcript store."""
+    video_id = youtube_video_id(url)
+    if not video_id:
+        raise Exception("Could not find a video ID in this YouTube URL")
+    try:
+        transcript = transcript_store.get(video_id)
+    except TranscriptUnavailable:
+        raise Exception("This YouTube video doesn't have transcripts/subtitles available. Please try a different video with subtitles enabled.")
+    except Exception as e:
+        raise Exception(f"Could not retrieve transcript: {e}")
+    return Document(page_content=transcript["text"], metadata=transcript["metadata"])
+        
+def scrape_regular_url(url):
+    """Fetch non-YouTube URLs through the pooled, cached fetcher"""
+    try:
+        text = fetch_article_text(url)
+        if len(text.strip()) < 100:
+            raise Exception("Could not extract sufficient content from this URL")
+            
+        return [Document(page_content=text)]
+        
+    except Exception as e:
+        raise Exception(f"Failed to scrape URL: {str(e)}")
+
+# ==== Prompt Templates ====
+# Bump when any summarizer prompt changes so cached summaries are regenerated.
+SUMMARY_PROMPT_VERSION = "1"
+
+basic_prompt_template = PromptTemplate(
+    input_variables=["text","ln"],
+    template="""
+You are a helpful assistant. Summarize the following content in {ln} language.
+Keep the summary clear, concise, and ~300 words.
+Content:
+{text}
+"""
+)
+
+map_prompt_template = PromptTemplate(
+    input_variables=["text"],
+    template="Please summarize the below text:\n\n{text}\n\nSummary:\n"
+)
+
+collapse_prompt_template = PromptTemplate(
+    input_variables=["text"],
+    template="Combine the following partial summaries into one concise summary, keeping every important point:\n\n{text}\n\nSummary:\n"
+)
+
+combine_prompt_template = PromptTemplate(
+    input_variables=["text","ln"],
+    template="""
+Provide the final summary with important points.
+Add a Title, intro, and present the summary as numbered points in {ln}.
+Content:
+{text}
+"""
+)
+
+refine_prompt_template = PromptTemplate(
+    input_variables=["existing","text","ln"],
+    template="""
+Here is a summary of the first part of a document:
+{existing}
+
+Rewrite it so it also covers the next part below. Keep the Title, intro and
+numbered points format, stay in {ln}, and keep every important point.
+Next part:
+{text}
+"""
+)
+
+# ==== Summary Planner ====
+planner = SummaryPlanner(
+    TokenCounter(Config.SUMMARY_TOKENIZER),
+    context_tokens=Config.LLM_CONTEXT_TOKENS,
+    output_tokens=Config.SUMMARY_OUTPUT_TOKENS,
+    prompt_tokens=max(estimate_tokens(prompt.template) for prompt in (
+        basic_prompt_template, map_prompt_template, collapse_prompt_template,
+        combine_prompt_template, refine_prompt_template,
+    )),
+    tpm=Config.GROQ_TPM,
+    overlap_tokens=Config.SUMMARY_CHUNK_OVERLAP_TOKENS,
+    refine_max_chunks=Config.SUMMARY_REFINE_MAX_CHUNKS,
+)
+
+# ==== Summarization Engine ====
+engine = SummarizationEngine(
+    llm=llm,
+    map_prompt=map_prompt_template,
+    collapse_prompt=collapse_prompt_template,
+    combine_prompt=combine_prompt_template,
+    refine_prompt=refine_prompt_template,
+    max_workers=Config.SUMMARY_MAP_CONCURRENCY,
+    limiter=groq_limiter,
+    cache=ChunkSummaryCache(
+        max_entries=Config.SUMMARY_CHUNK_CACHE_SIZE,
+        collection=collection("chunk_summaries"),
+        namespace=map_prompt_template.template,
+    ),
+    max_reduce_tokens=Config.SUMMARY_REDUCE_MAX_TOKENS or planner.input_budget,
+)
+
+# ==== Summary Cache ====
+summary_cache = SummaryCache(
+    prompt_version=SUMMARY_PROMPT_VERSION,
+    collection=collection("summaries"),
+    max_entries=Config.SUMMARY_CACHE_SIZE,
+)
+
+# ==== PDF Export ====
+pdf_exports = PdfExportCache(
+    directory=Config.PDF_EXPORT_CACHE_DIR,
+    fonts=[path.strip() for path in Config.PDF_EXPORT_FONTS.split(",") if path.strip()],
+    max_files=Config.PDF_EXPORT_CACHE_MAX_FILES,
+    inline_chars=Config.PDF_EXPORT_INLINE_CHARS,
+    pool=lambda: get_pool(Config.PDF_EXTRACT_WORKERS),
+)
+
+class SourceError(Exception):
+    """The submitted source cannot be summarized (reported as 400)."""
+
+def _load_url_documents(url):
+    if "youtube.com" in url or "youtu.be" in url:
+        try:
+            return [get_youtube_transcript(url)]
+        except Exception as e:
+            raise SourceError(str(e))
+    return scrape_regular_url(url)
+
+def plan_url(url):
+    """
+    Returns (plan, chunks) for a page or transcript. Short sources are one
+    stuffed call as before; long lectures and articles are chunked instead
+    of being truncated.
+    """
+    text = "\n\n".join(doc.page_content for doc in _load_url_documents(url))
+    return planner.plan_text(text)
+
+def url_final_step(url, ln):
+    """Runs all but the last call for a URL summary; returns (chain, input) for the last one."""
+    plan, chunks = plan_url(url)
+    return engine.final_step(plan, chunks, ln, stuff_prompt=basic_prompt_template)
+
+def _summarize_url(url, ln, on_progress=None):
+    plan, chunks = plan_url(url)
+    return engine.run(plan, chunks, ln, stuff_prompt=basic_prompt_template, on_progress=on_progress)
+
+def _summarize_pdf(spooled, ln, on_progress=None):
+    plan, chunks = plan_pdf(spooled)
+    return engine.run(plan, chunks, ln, on_progress=on_progress)
+
+# ==== Background Jobs ====
+def _job_store():
+    if not mongo_enabled():
+        return MemoryJobStore()
+    return MongoJobStore(collection("summary_jobs"))
+
+job_queue = JobQueue(
+    store=_job_store(),
+    executor=InlineJobExecutor() if Config.JOB_EXECUTOR == "inline" else ThreadPoolJobExecutor(Config.JOB_WORKERS),
+    lease_seconds=Config.JOB_LEASE_SECONDS,
+)
+
+def _url_job(payload, progress):
+    url, ln = payload["url"], payload["language"]
+    summary_id, summary, cached = summary_cache.get_or_compute(
+        url_source(url), ln, lambda: _summarize_url(url, ln, on_progress=progress)
+    )
+    return {"summary": summary, "summary_id": summary_id, "cached": cached}
+
+def _pdf_job(payload, progress):
+    ln = payload["language"]
+    with SpooledPdf.from_path(payload["path"], payload["sha256"]) as spooled:
+        summary_id, summary, cached = summary_cache.get_or_compute(
+            pdf_source(spooled.sha256), ln, lambda: _summarize_pdf(spooled, ln, on_progress=progress)
+        )
+    return {"summary": summary, "summary_id": summary_id, "cached": cached}
+
+job_queue.register("summarize_url", _url_job)
+job_queue.register("summarize_pdf", _pdf_job)
+
+def _job_accepted(job_id):
+    return jsonify({"job_id": job_id, "status_url": f"/summarize/jobs/{job_id}"}), 202
+
+# ==== Streaming ====
+def _stream_with_cache(source, ln, produce):
+    """
+    Streams a summary through the cache: a hit, or a request that joins a
+    job in flight in this worker or another one, is replayed as one token;
+    otherwise `produce()` streams the events of a fresh run under the
+    cross-worker lease and returns the finished text.
+    """
+    key = summary_cache.key(source, ln)
+    summary = summary_cache.get(key)
+    if summary is None:
+        flight, leader = summary_cache.flights.begin(key)
+        if leader:
+            cached = True
+            try:
+                summary = summary_cache.acquire_lease(key)
+                if summary is None:
+                    cached = False
+                    with summary_cache.holding_lease(key):
+                        summary = yield from produce()
+                    summary_cache.put(key, source, ln, summary)
+            except BaseException as e:
+                # Also covers a client disconnect (GeneratorExit); followers must not hang.
+                summary_cache.release_lease(key)
+                summary_cache.flights.end(key, error=e if isinstance(e, Exception) else RuntimeError("Summary stream cancelled"))
+                raise
+            summary_cache.flights.end(key, result=summary)
+            if not cached:
+                yield {"type": "done", "summary": summary, "summary_id": key, "cached": False}
+                return
+        else:
+            summary = flight.wait()
+    yield {"type": "token", "content": summary}
+    yield {"type": "done", "summary": summary, "summary_id": key, "cached": True}
+
+def _stream_url_summary(url, ln):
+    plan, chunks = plan_url(url)
+    yield {"type": "progress", "stage": "plan", **plan.as_dict()}
+    return (yield from stream_tokens(engine.stream(plan, chunks, ln, stuff_prompt=basic_prompt_template)))
+
+def _stream_pdf_summary(spooled, ln):
+    """Runs every call but the last, then streams the final one token by token."""
+    plan, chunks = plan_pdf(spooled)
+    yield {"type": "progress", "stage": "plan", **plan.as_dict()}
+    return (yield from stream_tokens(engine.stream(plan, chunks, ln)))
+
+def _stream_pdf(spooled, source, ln):
+    with spooled:
+        yield from _stream_with_cache(source, ln, lambda: _stream_pdf_summary(spooled, ln))
+
+# ==== Handlers (routed by summarizer_routes) ====
+def summarize_url():
+    try:
+        data = request.json
+        url = data.get("url")
+        ln = data.get("language", "English")
+        
+        if not url:
+            return jsonify({"error": "URL is required"}), 400
+        source = url_source(url)
+        
+        stream_format = get_stream_format()
+        if stream_format:
+            return stream_events(_stream_with_cache(
+                source, ln, lambda: _stream_url_summary(url, ln)
+            ), stream_format)
+
+        summary_id, summary, cached = summary_cache.get_or_compute(
+            source, ln, lambda: _summarize_url(url, ln)
+        )
+        return jsonify({"summary": summary, "summary_id": summary_id, "cached": cached})
+    except SourceError as e:
+        report_error("summarize_url", e)
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        report_error("summarize_url", e)
+        return jsonify({"error": str(e)}), 500
+
+# PDF Summarizer
+def summarize_pdf():
+    try:
+        if "file" not in request.files:
+            return jsonify({"error": "PDF file is required"}), 400
+        file = request.files["file"]
+        ln = request.form.get("language", "English")
+        
+        spooled = SpooledPdf(file.stream, threshold=Config.PDF_SPOOL_THRESHOLD)
+        source = pdf_source(spooled.sha256)
+        
+        stream_format = get_stream_format()
+        if stream_format:
+            return stream_events(_stream_pdf(spooled, source, ln), stream_format)
+
+        with spooled:
+            summary_id, summary, cached = summary_cache.get_or_compute(
+                source, ln, lambda: _summarize_pdf(spooled, ln)
+            )
+        return jsonify({"summary": summary, "summary_id": summary_id, "cached": cached})
+    except SourceError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+def export_summary_pdf(summary_id):
+    summary = summary_cache.get(summary_id) if re.fullmatch(r"[0-9a-f]{64}", summary_id) else None
+    if summary is None:
+        return jsonify({"error": "Summary not found"}), 404
+
+    etag = export_key(summary)
+    if etag in request.if_none_match:
+        # Known export: answer without the renderer; only its mtime is refreshed.
+        pdf_exports.touch(etag)
+        response = Response(status=304)
+        response.set_etag(etag)
+        return response
+    try:
+        etag, path = pdf_exports.get_or_render(summary)
+    except MissingGlyphs as e:
+        report_error("summary_pdf", e)
+        return jsonify({"error": f"Could not render PDF: {e}"}), 500
+    except Exception as e:
+        report_error("summary_pdf", e)
+        return jsonify({"error": "Could not render PDF"}), 500
+    return send_file(
+        path,
+        mimetype="application/pdf",
+        as_attachment=True,
+        download_name=f"summary-{summary_id[:8]}.pdf",
+        etag=etag,
+        conditional=True,  # If-None-Match / If-Range / Range
+        max_age=Config.PDF_EXPORT_MAX_AGE,
+    )
+
+# ==== Job Handlers ====
+def submit_url_job():
+    data = request.json or {}
+    url = data.get("url")
+    if not url:
+        return jsonify({"error": "URL is required"}), 400
+    job_id = job_queue.submit("summarize_url", {"url": url, "language": data.get("language", "English")})
+    return _job_accepted(job_id)
+
+def submit_pdf_job():
+    if "file" not in request.files:
+        return jsonify({"error": "PDF file is required"}), 400
+    ln = request.form.get("language", "English")
+
+    # Keep the upload on disk so a restarted worker can pick the job up again.
+    spooled = SpooledPdf(request.files["file"].stream, threshold=0)
+    if not spooled.size:
+        spooled.close()
+        return jsonify({"error": "PDF file is empty"}), 400
+    path = os.path.join(Config.JOB_SPOOL_DIR, f"{spooled.sha256}-{os.urandom(4).hex()}.pdf")
+    try:
+        os.makedirs(Config.JOB_SPOOL_DIR, exist_ok=True)
+        shutil.move(spooled.path, path)
+    except OSError as e:
+        spooled.close()
+        report_error("summarize_pdf_job", e)
+        return jsonify({"error": "Could not store the uploaded PDF"}), 500
+
+    job_id = job_queue.submit("summarize_pdf", {"path": path, "sha256": spooled.sha256, "language": ln})
+    return _job_accepted(job_id)
+
+def get_job(job_id):
+    job = job_queue.get(job_id)
+    if not job:
+        return jsonify({"error": "Job not found"}), 404
+    return jsonify(serialize_job(job)), 200
@@ -1,7 +1,100 @@
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
 import bcrypt
 
+from app.utils.metrics import span
+from config import Config
+
+
+class HasherBusy(Exception):
+    """Every hashing slot is taken; the route answers 503 instead of queueing."""
+
+
+def _to_bytes(value):
+    return value.encode("utf-8") if isinstance(value, str) else bytes(value)
+
+
+def _hash(password, rounds):
+    return bcrypt.hashpw(password, bcrypt.gensalt(rounds))
+
+
+def _verify(password, hashed):
+    try:
+        return bcrypt.checkpw(password, hashed)
+    except ValueError:
+        # Not a bcrypt hash
+        return False
+
+
+def hash_rounds(hashed):
+    """Work factor encoded in a `$2b$12$...` hash, or None if it can't be read."""
+    try:
+        return int(_to_bytes(hashed).split(b"$")[2])
+    except (IndexError, ValueError):
+        return None
+
+
+class PasswordHasher:
+    """
+    bcrypt off the request threads.
+    Hashes run on a small spawn-context process pool. At most `max_pending`
+    calls may be queued or running; a caller that can't get a slot within
+    `acquire_timeout` seconds gets HasherBusy, so a login storm sheds load
+    instead of occupying every worker. `workers=0` hashes inline.
+    """
+
+    def __init__(self, rounds=12, workers=2, max_pending=8, acquire_timeout=2.0):
+        self.rounds = rounds
+        self.workers = workers
+        self.acquire_timeout = acquire_timeout
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._pool = None
+        self._pool_lock = threading.Lock()
+
+    def hash(self, password):
+        return self._run(_hash, _to_bytes(password), self.rounds)
+
+    def verify(self, password, hashed):
+        return self._run(_verify, _to_bytes(password), _to_bytes(hashed))
+
+    def needs_rehash(self, hashed):
+        return hash_rounds(hashed) != self.rounds
+
+    def _run(self, fn, *args):
+        if not self._slots.acquire(timeout=self.acquire_timeout):
+            raise HasherBusy("Too many concurrent password operations")
+        try:
+            with span("bcrypt", fn.__name__.lstrip("_")):
+                if self.workers <= 0:
+                    return fn(*args)
+                return self._get_pool().submit(fn, *args).result()
+        finally:
+            self._slots.release()
+
+    def _get_pool(self):
+        with self._pool_lock:
+            if self._pool is None:
+                # spawn: forking a threaded gunicorn worker is not safe.
+                self._pool = ProcessPoolExecutor(max_workers=self.workers,
+                                                 mp_context=multiprocessing.get_context("spawn"))
+            return self._pool
+
+
+password_hasher = PasswordHasher(
+    rounds=Config.BCRYPT_ROUNDS,
+    workers=Config.BCRYPT_WORKERS,
+    max_pending=Config.BCRYPT_MAX_PENDING,
+    acquire_timeout=Config.BCRYPT_ACQUIRE_TIMEOUT,
+)
+
+
 def hash_password(password):
-    return bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt())
+    return password_hasher.hash(password)
 
 def verify_password(password, hashed):
-    return bcrypt.checkpw(password.encode("utf-8"), hashed)
+    return password_hasher.verify(password, hashed)
+
+def needs_rehash(hashed):
+    return password_hasher.needs_rehash(hashed)
@@ -0,0 +1,84 @@
+import json
+import re
+import time
+from typing import Any, Iterator, List, Optional
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+
+def fake_reply(prompt):
+    """A plausible answer without a model: quiz JSON for quiz prompts, prose otherwise."""
+    if "quiz" in prompt.lower() and "json" in prompt.lower():
+        match = re.search(r"Generate (\d+)", prompt)
+        count = int(match.group(1)) if match else 5
+        quiz = [{
+            "id": i + 1,
+            "question": f"Sample question {i + 1}?",
+            "options": ["A", "B", "C", "D"],
+            "correctAnswer": i % 4,
+            "explanation": "Because it is the sample answer.",
+        } for i in range(count)]
+        return json.dumps({"quiz": quiz})
+    return "Summary: " + " ".join(f"point {i}." for i in range(60))
+
+
+class FakeChatModel(BaseChatModel):
+    """
+    Offline chat backend (LLM_BACKEND=fake). Answers with `fake_reply`
+    after `latency` seconds (time to first token), then spends
+    1/`tokens_per_second` per output token (0 = instant); streams the same
+    text in `chunks` pieces. Token usage is reported like a real provider.
+    """
+
+    model_name: str = "fake"
+    latency: float = 0.0
+    tokens_per_second: float = 0.0
+    chunks: int = 8
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-chat"
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        prompt = _prompt_text(messages)
+        text = fake_reply(prompt)
+        self._wait(self.latency + self._generation_seconds(text))
+        message = AIMessage(content=text, usage_metadata=_usage(prompt, text))
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _stream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                run_manager: Any = None, **kwargs: Any) -> Iterator[ChatGenerationChunk]:
+        prompt = _prompt_text(messages)
+        text = fake_reply(prompt)
+        size = max(1, len(text) // self.chunks)
+        self._wait(self.latency)
+        for start in range(0, len(text), size):
+            piece = text[start:start + size]
+            self._wait(self._generation_seconds(piece))
+            last = start + size >= len(text)
+            yield ChatGenerationChunk(message=AIMessageChunk(
+                content=piece, usage_metadata=_usage(prompt, text) if last else None))
+
+    def _generation_seconds(self, text):
+        return _tokens(text) / self.tokens_per_second if self.tokens_per_second else 0.0
+
+    @staticmethod
+    def _wait(seconds):
+        if seconds:
+            time.sleep(seconds)
+
+
+def _tokens(text):
+    return len(text) // 4 + 1
+
+
+def _usage(prompt, text):
+    return {"input_tokens": _tokens(prompt), "output_tokens": _tokens(text),
+            "total_tokens": _tokens(prompt) + _tokens(text)}
+
+
+def _prompt_text(messages):
+    return "\n".join(str(message.content) for message in messages)
@@ -0,0 +1,204 @@
+import logging
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from pymongo import ReturnDocument
+
+logger = logging.getLogger(__name__)
+
+QUEUED, RUNNING, DONE, FAILED = "queued", "running", "done", "failed"
+
+
+# ==== Stores ====
+class MongoJobStore:
+    """
+    Jobs persisted in MongoDB so they survive restarts.
+    A running job holds a lease that is extended on every progress update;
+    when its worker dies the lease runs out and `claim` hands it to another.
+    """
+
+    def __init__(self, collection):
+        self.collection = collection
+
+    def create(self, job):
+        self.collection.insert_one(job)
+
+    def get(self, job_id):
+        return self.collection.find_one({"_id": job_id})
+
+    def update(self, job_id, fields):
+        self.collection.update_one({"_id": job_id}, {"$set": fields})
+
+    def claim(self, job_id, lease_until):
+        now = datetime.utcnow()
+        return self.collection.find_one_and_update(
+            {"_id": job_id, "$or": [
+                {"status": QUEUED},
+                {"status": RUNNING, "lease_expires": {"$lt": now}},
+            ]},
+            {"$set": {"status": RUNNING, "lease_expires": lease_until, "updated_at": now},
+             "$inc": {"attempts": 1}},
+            return_document=ReturnDocument.AFTER,
+        )
+
+    def recoverable(self):
+        now = datetime.utcnow()
+        cursor = self.collection.find(
+            {"$or": [{"status": QUEUED}, {"status": RUNNING, "lease_expires": {"$lt": now}}]},
+            {"_id": 1},
+        )
+        return [doc["_id"] for doc in cursor]
+
+
+class MemoryJobStore:
+    """Process-local store for tests and for running without MongoDB."""
+
+    def __init__(self):
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def create(self, job):
+        with self._lock:
+            self._jobs[job["_id"]] = dict(job)
+
+    def get(self, job_id):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job else None
+
+    def update(self, job_id, fields):
+        with self._lock:
+            self._jobs[job_id].update(fields)
+
+    def claim(self, job_id, lease_until):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if not job or job["status"] != QUEUED:
+                return None
+            job.update(status=RUNNING, lease_expires=lease_until, attempts=job.get("attempts", 0) + 1)
+            return dict(job)
+
+    def recoverable(self):
+        with self._lock:
+            return [job_id for job_id, job in self._jobs.items() if job["status"] == QUEUED]
+
+
+# ==== Executors ====
+class ThreadPoolJobExecutor:
+    """Runs jobs on a dedicated pool, separate from the request workers."""
+
+    def __init__(self, max_workers):
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="jobs")
+
+    def submit(self, fn, *args):
+        self._pool.submit(fn, *args)
+
+
+class InlineJobExecutor:
+    """Runs the job before `submit` returns; lets tests assert on the final state."""
+
+    def submit(self, fn, *args):
+        fn(*args)
+
+
+# ==== Queue ====
+class JobQueue:
+    """
+    Minimal background job runner.
+    Handlers are registered per job kind and called as
+    `handler(payload, progress)`, where `progress(done, total)` reports
+    partial completion. Whatever the handler returns becomes the job result.
+    """
+
+    # Progress is written at most this often (seconds) except for the last update.
+    PROGRESS_INTERVAL = 1.0
+
+    def __init__(self, store, executor, lease_seconds=600):
+        self.store = store
+        self.executor = executor
+        self.lease_seconds = lease_seconds
+        self.handlers = {}
+
+    def register(self, kind, handler):
+        self.handlers[kind] = handler
+
+    def submit(self, kind, payload):
+        if kind not in self.handlers:
+            raise ValueError(f"Unknown job kind: {kind}")
+        now = datetime.utcnow()
+        job_id = uuid.uuid4().hex
+        self.store.create({
+            "_id": job_id,
+            "kind": kind,
+            "status": QUEUED,
+            "payload": payload,
+            "progress": {"done": 0, "total": None},
+            "result": None,
+            "error": None,
+            "attempts": 0,
+            "created_at": now,
+            "updated_at": now,
+        })
+        self.executor.submit(self._run, job_id)
+        return job_id
+
+    def get(self, job_id):
+        return self.store.get(job_id)
+
+    def recover(self):
+        """Re-queues jobs left queued, or running with an expired lease, by a previous process."""
+        try:
+            job_ids = self.store.recoverable()
+        except Exception as e:
+            logger.warning("recovery skipped: %s", e)
+            return 0
+        for job_id in job_ids:
+            self.executor.submit(self._run, job_id)
+        return len(job_ids)
+
+    def _lease(self):
+        return datetime.utcnow() + timedelta(seconds=self.lease_seconds)
+
+    def _run(self, job_id):
+        job = self.store.claim(job_id, self._lease())
+        if job is None:
+            # Finished already, or another worker holds it.
+            return
+
+        last_write = [0.0]
+
+        def progress(done, total):
+            now = time.monotonic()
+            if done != total and now - last_write[0] < self.PROGRESS_INTERVAL:
+                return
+            last_write[0] = now
+            self.store.update(job_id, {
+                "progress": {"done": done, "total": total},
+                "lease_expires": self._lease(),
+                "updated_at": datetime.utcnow(),
+            })
+
+        try:
+            result = self.handlers[job["kind"]](job["payload"], progress)
+        except Exception as e:
+            logger.exception("job %s (%s) failed", job_id, job["kind"])
+            self.store.update(job_id, {"status": FAILED, "error": str(e), "updated_at": datetime.utcnow()})
+            return
+        self.store.update(job_id, {"status": DONE, "result": result, "updated_at": datetime.utcnow()})
+
+
+def serialize_job(job):
+    """Public view of a job document for the status endpoint."""
+    return {
+        "job_id": job["_id"],
+        "kind": job["kind"],
+        "status": job["status"],
+        "progress": job.get("progress"),
+        "result": job.get("result"),
+        "error": job.get("error"),
+        "created_at": job.get("created_at"),
+        "updated_at": job.get("updated_at"),
+    }
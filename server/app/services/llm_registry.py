@@ -0,0 +1,413 @@
+import asyncio
+import os
+import random
+import threading
+import time
+from typing import Any, AsyncIterator, Iterator, List, Optional
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+from app.utils.metrics import LLM_RETRIES, LLM_SECONDS, add_timing, record_llm_usage
+from config import Config
+
+
+class ModelUnavailable(Exception):
+    """Every model configured for a route is failing or has its circuit open."""
+
+
+def is_retryable(error):
+    """429, 408/409, 5xx and transport failures are worth another attempt; other 4xx are not."""
+    status = getattr(error, "status_code", None)
+    if status is None:
+        status = getattr(getattr(error, "response", None), "status_code", None)
+    if status is not None:
+        return status in (408, 409, 429) or status >= 500
+    return (isinstance(error, (TimeoutError, ConnectionError))
+            or type(error).__name__ in ("APIConnectionError", "APITimeoutError"))
+
+
+def should_fall_back(error):
+    """Errors that say nothing about the request itself: try the next model."""
+    status = getattr(error, "status_code", None)
+    return is_retryable(error) or status == 404
+
+
+def backoff_delay(attempt, base, cap):
+    """Exponential backoff with full jitter."""
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+
+# ==== Health tracking ====
+class CircuitBreaker:
+    """
+    Opens after `failure_threshold` consecutive failures; while open the
+    model is skipped. After `reset_seconds` it lets calls through again
+    (half-open): one success closes it, one failure re-opens it.
+    """
+
+    def __init__(self, failure_threshold=5, reset_seconds=30):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.failures = 0
+        self.opened_at = None
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return "closed"
+        return "half_open" if time.monotonic() - self.opened_at >= self.reset_seconds else "open"
+
+    def allow(self):
+        return self.state != "open"
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == "half_open" or self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+
+
+class LatencyTracker:
+    """EWMA of call latency (time to first token for streams)."""
+
+    ALPHA = 0.3
+
+    def __init__(self):
+        self.ewma = None
+        self.slow_until = 0.0
+
+    def record(self, seconds):
+        self.ewma = seconds if self.ewma is None else self.ALPHA * seconds + (1 - self.ALPHA) * self.ewma
+
+    def is_slow(self):
+        if self.slow_until and time.monotonic() >= self.slow_until:
+            # Cool-down over: judge the model on fresh samples.
+            self.slow_until = 0.0
+            self.ewma = None
+        return bool(self.slow_until)
+
+    def check_slo(self, slo_seconds, cooldown):
+        if slo_seconds and self.ewma is not None and self.ewma > slo_seconds:
+            self.slow_until = time.monotonic() + cooldown
+
+
+# ==== Backends ====
+def _groq_backend(model_name):
+    from langchain_groq import ChatGroq
+    return ChatGroq(
+        api_key=os.getenv("GROQ_API_KEY"),
+        model=model_name,
+        max_retries=0,  # retries happen in the registry, with jitter and fallback
+        request_timeout=Config.LLM_TIMEOUT_SECONDS,
+    )
+
+
+def _fake_backend(model_name):
+    from app.services.fake_llm import FakeChatModel
+    return FakeChatModel(model_name=model_name, latency=Config.LLM_FAKE_LATENCY_MS / 1000.0,
+                         tokens_per_second=Config.LLM_FAKE_TOKENS_PER_SECOND)
+
+
+BACKENDS = {
+    "groq": _groq_backend,
+    "fake": _fake_backend,
+}
+
+
+def _parse_mapping(value):
+    """"quiz=a,explain=b" -> {"quiz": "a", "explain": "b"}"""
+    mapping = {}
+    for item in (value or "").split(","):
+        name, sep, setting = item.partition("=")
+        if sep and name.strip() and setting.strip():
+            mapping[name.strip()] = setting.strip()
+    return mapping
+
+
+# ==== Registry ====
+class ModelRegistry:
+    """
+    Process-wide source of chat models.
+
+    `client(name)` returns one long-lived backend client per model name, so
+    HTTP connections are pooled across requests. Clients are per process:
+    a forked worker builds its own instead of sharing the parent's sockets. `for_route(route)` returns
+    a RoutedChatModel that tries the route's primary model and then its
+    fallbacks, with jittered retries on retryable errors, a circuit breaker
+    per model, and a detour to the next model while one is over the route's
+    latency SLO.
+    """
+
+    def __init__(self, backend="groq", default_model="gemma2-9b-it", fallbacks=(), route_models=None,
+                 route_slos=None, max_retries=2, retry_base=0.5, retry_cap=8.0,
+                 breaker_failures=5, breaker_reset=30, slo_cooldown=60):
+        self.backend = backend
+        self.default_model = default_model
+        self.fallbacks = list(fallbacks)
+        self.route_models = dict(route_models or {})
+        self.route_slos = dict(route_slos or {})
+        self.max_retries = max_retries
+        self.retry_base = retry_base
+        self.retry_cap = retry_cap
+        self.breaker_failures = breaker_failures
+        self.breaker_reset = breaker_reset
+        self.slo_cooldown = slo_cooldown
+        self._clients = {}
+        self._breakers = {}
+        self._latency = {}
+        self._routes = {}
+        self._pid = os.getpid()
+        self._lock = threading.Lock()
+
+    def client(self, model_name):
+        with self._lock:
+            if self._pid != os.getpid():
+                self._clients.clear()
+                self._pid = os.getpid()
+            client = self._clients.get(model_name)
+            if client is None:
+                client = self._clients[model_name] = BACKENDS[self.backend](model_name)
+                self._breakers[model_name] = CircuitBreaker(self.breaker_failures, self.breaker_reset)
+                self._latency[model_name] = LatencyTracker()
+            return client
+
+    def set_client(self, model_name, client):
+        """Installs a ready-made client (tests, custom backends)."""
+        with self._lock:
+            self._clients[model_name] = client
+            self._breakers[model_name] = CircuitBreaker(self.breaker_failures, self.breaker_reset)
+            self._latency[model_name] = LatencyTracker()
+
+    def for_route(self, route):
+        with self._lock:
+            model = self._routes.get(route)
+            if model is None:
+                model = self._routes[route] = RoutedChatModel(route=route, registry=self)
+            return model
+
+    def candidates(self, route):
+        """Models to try for `route`, in order: healthy and within SLO first."""
+        primary = self.route_models.get(route, self.default_model)
+        names = [primary] + [name for name in self.fallbacks if name != primary]
+        for name in names:
+            self.client(name)
+        healthy = [name for name in names if self._breakers[name].allow()]
+        fast = [name for name in healthy if not self._latency[name].is_slow()]
+        # A slow model still beats none at all.
+        return fast + [name for name in healthy if name not in fast]
+
+    def record(self, route, model_name, seconds=None, error=None):
+        if error is not None:
+            self._breakers[model_name].record_failure()
+            return
+        self._breakers[model_name].record_success()
+        tracker = self._latency[model_name]
+        tracker.record(seconds)
+        slo_ms = self.route_slos.get(route)
+        tracker.check_slo(float(slo_ms) / 1000.0 if slo_ms else None, self.slo_cooldown)
+
+    def stats(self):
+        with self._lock:
+            names = list(self._clients)
+        return {
+            "backend": self.backend,
+            "routes": {route: self.route_models.get(route, self.default_model) for route in self._routes},
+            "models": {
+                name: {
+                    "circuit": self._breakers[name].state,
+                    "consecutive_failures": self._breakers[name].failures,
+                    "latency_ewma_ms": round(self._latency[name].ewma * 1000, 1)
+                    if self._latency[name].ewma is not None else None,
+                    "over_slo": bool(self._latency[name].slow_until),
+                }
+                for name in names
+            },
+        }
+
+    # ==== Calls ====
+    def _observe(self, route, name, started, outcome, message=None):
+        """Metrics for one attempt: latency (also into the request's Server-Timing) and tokens."""
+        seconds = time.monotonic() - started
+        LLM_SECONDS.observe(seconds, route=route, model=name, outcome=outcome)
+        add_timing("llm", seconds)
+        if message is not None:
+            record_llm_usage(route, name, message)
+
+    def _after_error(self, route, name, error, attempt, started):
+        """Returns the backoff before retrying `name`, None to move to the next model, or raises."""
+        self._observe(route, name, started, "error")
+        if is_retryable(error) and attempt < self.max_retries:
+            LLM_RETRIES.inc(route=route, model=name)
+            return backoff_delay(attempt, self.retry_base, self.retry_cap)
+        if not should_fall_back(error):
+            raise error
+        self.record(route, name, error=error)
+        return None
+
+    def call(self, route, fn):
+        """Runs `fn(client)` against the route's models until one succeeds."""
+        last_error = None
+        for name in self.candidates(route):
+            client = self.client(name)
+            for attempt in range(self.max_retries + 1):
+                started = time.monotonic()
+                try:
+                    result = fn(client)
+                except Exception as e:
+                    last_error = e
+                    delay = self._after_error(route, name, e, attempt, started)
+                    if delay is None:
+                        break
+                    time.sleep(delay)
+                    continue
+                self.record(route, name, time.monotonic() - started)
+                self._observe(route, name, started, "ok", result)
+                return result
+        raise ModelUnavailable(f"No model available for {route}: {last_error}") from last_error
+
+    async def acall(self, route, fn):
+        last_error = None
+        for name in self.candidates(route):
+            client = self.client(name)
+            for attempt in range(self.max_retries + 1):
+                started = time.monotonic()
+                try:
+                    result = await fn(client)
+                except Exception as e:
+                    last_error = e
+                    delay = self._after_error(route, name, e, attempt, started)
+                    if delay is None:
+                        break
+                    await asyncio.sleep(delay)
+                    continue
+                self.record(route, name, time.monotonic() - started)
+                self._observe(route, name, started, "ok", result)
+                return result
+        raise ModelUnavailable(f"No model available for {route}: {last_error}") from last_error
+
+    def stream(self, route, make_stream):
+        """
+        Streams from the first model that produces a chunk. Retries and
+        fallback only happen before the first chunk; after that an error
+        propagates, since the caller has already seen output.
+        """
+        last_error = None
+        for name in self.candidates(route):
+            client = self.client(name)
+            for attempt in range(self.max_retries + 1):
+                started = time.monotonic()
+                chunks = make_stream(client)
+                try:
+                    first = next(chunks)
+                except StopIteration:
+                    self.record(route, name, time.monotonic() - started)
+                    self._observe(route, name, started, "ok")
+                    return
+                except Exception as e:
+                    last_error = e
+                    delay = self._after_error(route, name, e, attempt, started)
+                    if delay is None:
+                        break
+                    time.sleep(delay)
+                    continue
+                self.record(route, name, time.monotonic() - started)
+                self._observe(route, name, started, "ok", first)
+                yield first
+                for chunk in chunks:
+                    record_llm_usage(route, name, chunk)  # usage arrives on the last chunk
+                    yield chunk
+                return
+        raise ModelUnavailable(f"No model available for {route}: {last_error}") from last_error
+
+    async def astream(self, route, make_stream):
+        last_error = None
+        for name in self.candidates(route):
+            client = self.client(name)
+            for attempt in range(self.max_retries + 1):
+                started = time.monotonic()
+                chunks = make_stream(client).__aiter__()
+                try:
+                    first = await chunks.__anext__()
+                except StopAsyncIteration:
+                    self.record(route, name, time.monotonic() - started)
+                    self._observe(route, name, started, "ok")
+                    return
+                except Exception as e:
+                    last_error = e
+                    delay = self._after_error(route, name, e, attempt, started)
+                    if delay is None:
+                        break
+                    await asyncio.sleep(delay)
+                    continue
+                self.record(route, name, time.monotonic() - started)
+                self._observe(route, name, started, "ok", first)
+                yield first
+                async for chunk in chunks:
+                    record_llm_usage(route, name, chunk)
+                    yield chunk
+                return
+        raise ModelUnavailable(f"No model available for {route}: {last_error}") from last_error
+
+
+class RoutedChatModel(BaseChatModel):
+    """
+    Chat model facade for one route. Works anywhere a LangChain chat model
+    does (`prompt | llm`, invoke/stream/ainvoke/astream, summarize chains);
+    each call is dispatched through the registry.
+    """
+
+    route: str
+    registry: Any
+
+    @property
+    def _llm_type(self) -> str:
+        return "routed-chat"
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        message = self.registry.call(self.route, lambda client: client.invoke(messages, stop=stop, **kwargs))
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                         run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        message = await self.registry.acall(self.route, lambda client: client.ainvoke(messages, stop=stop, **kwargs))
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _stream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                run_manager: Any = None, **kwargs: Any) -> Iterator[ChatGenerationChunk]:
+        for chunk in self.registry.stream(self.route, lambda client: client.stream(messages, stop=stop, **kwargs)):
+            yield ChatGenerationChunk(message=chunk)
+
+    async def _astream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                       run_manager: Any = None, **kwargs: Any) -> AsyncIterator[ChatGenerationChunk]:
+        async for chunk in self.registry.astream(self.route,
+                                                 lambda client: client.astream(messages, stop=stop, **kwargs)):
+            yield ChatGenerationChunk(message=chunk)
+
+
+registry = ModelRegistry(
+    backend=Config.LLM_BACKEND,
+    default_model=Config.LLM_DEFAULT_MODEL,
+    fallbacks=[name.strip() for name in Config.LLM_FALLBACK_MODELS.split(",") if name.strip()],
+    route_models=_parse_mapping(Config.LLM_ROUTE_MODELS),
+    route_slos=_parse_mapping(Config.LLM_ROUTE_SLO_MS),
+    max_retries=Config.LLM_MAX_RETRIES,
+    retry_base=Config.LLM_RETRY_BASE_SECONDS,
+    retry_cap=Config.LLM_RETRY_MAX_SECONDS,
+    breaker_failures=Config.LLM_BREAKER_FAILURES,
+    breaker_reset=Config.LLM_BREAKER_RESET_SECONDS,
+    slo_cooldown=Config.LLM_SLO_COOLDOWN_SECONDS,
+)
+
+
+def get_chat_model(route="default"):
+    """The long-lived chat model for a route ("quiz", "explain", "summarize", ...)."""
+    return registry.for_route(route)
@@ -0,0 +1,309 @@
+import hashlib
+import logging
+import os
+import random
+import threading
+import time
+from datetime import datetime, timedelta
+
+from pymongo import UpdateOne
+from pymongo.errors import DuplicateKeyError, PyMongoError
+
+from app.utils.quiz_cache import normalize_topic
+from app.utils.quiz_parser import number_questions
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+QUESTION_FIELDS = ("question", "options", "correctAnswer", "explanation")
+
+# Rough output size of one generated question, for the rate limiter.
+QUESTION_TOKENS = 120
+
+
+def question_key(text):
+    return normalize_topic(text)
+
+
+def _question_id(topic, level, text):
+    raw = f"{normalize_topic(topic)}|{normalize_topic(level)}|{question_key(text)}"
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class QuizBank:
+    """
+    Validated questions stored per (topic, level) bucket in the `quiz_bank`
+    collection, one document per question.
+
+    `assemble` builds a quiz of any size by sampling a bucket, skipping the
+    questions a user has already answered. Buckets are read from MongoDB
+    once and then served from memory for `snapshot_seconds`, so assembling a
+    quiz is a dictionary lookup plus a sample. Buckets that fall under
+    `low_water` are topped up to `target` by a background refill thread.
+    One process at a time runs the periodic sweep (a lease per interval),
+    and a sweep makes at most `sweep_max_calls` model calls, emptiest
+    buckets first.
+    """
+
+    def __init__(self, collection, leases=None, generate=None, catalogue=(), levels=(),
+                 low_water=40, target=100, batch_size=10, snapshot_seconds=60,
+                 refill_interval=600, lease_seconds=300, sweep_max_calls=0):
+        self.collection = collection
+        self.leases = leases
+        self.generate = generate
+        self.catalogue = list(catalogue)
+        self.levels = list(levels)
+        self.low_water = low_water
+        self.target = target
+        self.batch_size = batch_size
+        self.snapshot_seconds = snapshot_seconds
+        self.refill_interval = refill_interval
+        self.lease_seconds = lease_seconds
+        self.sweep_max_calls = sweep_max_calls
+        self._snapshots = {}
+        self._pending = {}
+        self._wake = threading.Event()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+        self.stats = {"served": 0, "short": 0, "generated": 0, "refills": 0}
+
+    @staticmethod
+    def bucket(topic, level):
+        return normalize_topic(topic), normalize_topic(level)
+
+    def is_hot(self, topic, level):
+        """Catalogue buckets are kept stocked; other topics are only banked as they get generated."""
+        return (normalize_topic(topic) in {normalize_topic(t) for t in self.catalogue}
+                and normalize_topic(level) in {normalize_topic(l) for l in self.levels})
+
+    # ==== Reads ====
+    def questions(self, topic, level):
+        """The bucket's questions, from the in-memory snapshot when it is fresh."""
+        key = self.bucket(topic, level)
+        with self._lock:
+            snapshot = self._snapshots.get(key)
+        if snapshot and snapshot[0] > time.monotonic():
+            return snapshot[1]
+        try:
+            docs = list(self.collection.find({"topic": key[0], "level": key[1]},
+                                             {field: 1 for field in QUESTION_FIELDS}))
+        except PyMongoError as e:
+            logger.warning("read failed: %s", e)
+            return snapshot[1] if snapshot else []
+        questions = [{field: doc.get(field) for field in QUESTION_FIELDS} for doc in docs]
+        with self._lock:
+            self._snapshots[key] = (time.monotonic() + self.snapshot_seconds, questions)
+        return questions
+
+    def assemble(self, topic, level, num_questions, exclude=()):
+        """
+        Returns `{"quiz": [...]}` with `num_questions` questions the user has
+        not seen, or None when the bucket cannot supply that many yet.
+        """
+        stock = self.questions(topic, level)
+        if len(stock) < self.low_water and self.is_hot(topic, level):
+            self.request_refill(topic, level)
+        seen = {question_key(text) for text in exclude}
+        fresh = [q for q in stock if question_key(q["question"]) not in seen]
+        if len(fresh) < num_questions:
+            self._count("short")
+            return None
+        self._count("served")
+        return {"quiz": number_questions([dict(q) for q in random.sample(fresh, num_questions)])}
+
+    # ==== Writes ====
+    def add(self, topic, level, questions):
+        """Stores validated questions; ones already in the bucket are ignored. Returns how many were new."""
+        key = self.bucket(topic, level)
+        now = datetime.utcnow()
+        ops = [
+            UpdateOne(
+                {"_id": _question_id(topic, level, q["question"])},
+                {"$setOnInsert": {"topic": key[0], "level": key[1], "created_at": now,
+                                  **{field: q.get(field) for field in QUESTION_FIELDS}}},
+                upsert=True,
+            )
+            for q in questions if q
+        ]
+        if not ops:
+            return 0
+        try:
+            result = self.collection.bulk_write(ops, ordered=False)
+        except PyMongoError as e:
+            logger.warning("write failed: %s", e)
+            return 0
+        with self._lock:
+            self._snapshots.pop(key, None)
+        return result.upserted_count
+
+    def count(self, topic, level):
+        key = self.bucket(topic, level)
+        return self.collection.count_documents({"topic": key[0], "level": key[1]})
+
+    # ==== Refill ====
+    def refill(self, topic, level, max_calls=0):
+        """
+        Generates questions until the bucket reaches `target`, in at most
+        `max_calls` model calls (0 = no cap). Returns how many were added.
+        """
+        return self._refill(topic, level, max_calls)[0]
+
+    def _refill(self, topic, level, max_calls=0):
+        """Returns (questions added, model calls made)."""
+        if self.generate is None or not self._acquire_lease(self._bucket_lease(topic, level), self.lease_seconds):
+            return 0, 0
+        added = calls = 0
+        try:
+            while not max_calls or calls < max_calls:
+                have = self.count(topic, level)
+                if have >= self.target:
+                    break
+                avoid = [q["question"] for q in self.questions(topic, level)]
+                calls += 1
+                new = self.add(topic, level, self.generate(topic, level, min(self.batch_size, self.target - have), avoid))
+                if not new:
+                    break  # the model only repeats itself; try again next sweep
+                added += new
+        except Exception as e:
+            logger.warning("refill of %s/%s failed: %s", topic, level, e)
+        finally:
+            self._release_lease(self._bucket_lease(topic, level))
+        self._count("refills")
+        self._count("generated", added)
+        return added, calls
+
+    def sweep(self):
+        """
+        Tops up the catalogue buckets that are under the low-water mark,
+        emptiest first, until `sweep_max_calls` model calls have been made.
+        """
+        low = []
+        for topic in self.catalogue:
+            for level in self.levels:
+                have = self.count(topic, level)
+                if have < self.low_water:
+                    low.append((have, topic, level))
+        report = {}
+        calls_left = self.sweep_max_calls
+        for _, topic, level in sorted(low, key=lambda bucket: bucket[0]):
+            added, calls = self._refill(topic, level, calls_left)
+            report[f"{topic}/{level}"] = added
+            if self.sweep_max_calls:
+                calls_left -= calls
+                if calls_left <= 0:
+                    break
+        return report
+
+    def request_refill(self, topic, level):
+        """Queues a bucket for the background thread (started on first use in each process)."""
+        with self._lock:
+            self._pending.setdefault(self.bucket(topic, level), (topic, level))
+        self.start()
+        self._wake.set()
+
+    def start(self):
+        with self._lock:
+            if self._pid == os.getpid() and self._thread and self._thread.is_alive():
+                return
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name="quiz-bank-refill", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        next_sweep = time.monotonic()
+        while True:
+            try:
+                if self.refill_interval and time.monotonic() >= next_sweep:
+                    next_sweep = time.monotonic() + self.refill_interval
+                    # The lease is left to expire, so no other worker sweeps in this interval.
+                    if self._acquire_lease("sweep", self.refill_interval):
+                        self.sweep()
+                with self._lock:
+                    pending = list(self._pending.values())
+                    self._pending.clear()
+                for topic, level in pending:
+                    self.refill(topic, level)
+            except Exception as e:
+                logger.exception("refill worker error: %s", e)
+            self._wake.wait(timeout=self.refill_interval or None)
+            self._wake.clear()
+
+    def _bucket_lease(self, topic, level):
+        return "|".join(self.bucket(topic, level))
+
+    def _acquire_lease(self, lease_id, seconds):
+        """Only one process holds a lease (a bucket refill, or the periodic sweep) at a time."""
+        if self.leases is None:
+            return True
+        now = datetime.utcnow()
+        try:
+            self.leases.find_one_and_update(
+                {"_id": lease_id, "lease_expires": {"$lt": now}},
+                {"$set": {"lease_expires": now + timedelta(seconds=seconds)}},
+                upsert=True,
+            )
+        except DuplicateKeyError:
+            return False  # the lease document exists and has not expired
+        return True
+
+    def _release_lease(self, lease_id):
+        if self.leases is not None:
+            self.leases.update_one({"_id": lease_id}, {"$set": {"lease_expires": datetime.utcnow()}})
+
+    def get_stats(self):
+        with self._lock:
+            stats = dict(self.stats)
+            stats["buckets_in_memory"] = len(self._snapshots)
+            stats["pending_refills"] = len(self._pending)
+        return stats
+
+    def _count(self, name, amount=1):
+        with self._lock:
+            self.stats[name] += amount
+
+
+# ==== Generation ====
+def generate_questions(topic, level, count, avoid):
+    """Asks the quiz model for `count` new validated questions that differ from `avoid`."""
+    from app.services.llm_registry import get_chat_model
+    from app.services.rate_limits import acquire_background
+    from app.services.summarization_engine import estimate_tokens
+    from app.utils.prompt_templates import quiz_repair_prompt
+    from app.utils.quiz_parser import parse_quiz
+
+    # A sample of the existing questions keeps the prompt short while steering away from repeats.
+    avoid = random.sample(avoid, min(len(avoid), 30))
+    prompt_input = {
+        "topic": topic, "level": level, "num_questions": count, "num_options": Config.QUIZ_OPTION_COUNT,
+        "avoid": "\n".join(f"- {text}" for text in avoid) or "- (none)",
+    }
+    # Refills spend the background share of the quota, never live traffic's.
+    acquire_background(estimate_tokens(quiz_repair_prompt.format(**prompt_input)) + count * QUESTION_TOKENS)
+    reply = (quiz_repair_prompt | get_chat_model("quiz")).invoke(prompt_input)
+    return [q for q in (parse_quiz(reply.content, count) or []) if q is not None]
+
+
+def _create_bank():
+    if not Config.QUIZ_BANK_ENABLED:
+        return None
+    from app.models.db import collection
+    bank_collection = collection("quiz_bank")
+    if bank_collection is None:
+        return None
+    return QuizBank(
+        bank_collection,
+        leases=collection("quiz_bank_leases"),
+        generate=generate_questions,
+        catalogue=[topic.strip() for topic in Config.QUIZ_BANK_TOPICS.split(",") if topic.strip()],
+        levels=[level.strip() for level in Config.QUIZ_BANK_LEVELS.split(",") if level.strip()],
+        low_water=Config.QUIZ_BANK_LOW_WATER,
+        target=Config.QUIZ_BANK_TARGET,
+        batch_size=Config.QUIZ_BANK_BATCH_SIZE,
+        snapshot_seconds=Config.QUIZ_BANK_SNAPSHOT_SECONDS,
+        refill_interval=Config.QUIZ_BANK_REFILL_INTERVAL,
+        sweep_max_calls=Config.QUIZ_BANK_SWEEP_MAX_CALLS,
+    )
+
+
+quiz_bank = _create_bank()
@@ -0,0 +1,23 @@
+"""
+Process-wide budgets for the Groq quota (limits are per worker process).
+
+Summaries draw from `groq_limiter`. Background work such as quiz bank
+refills draws from `background_limiter` first, a small share of the same
+quota, and then from `groq_limiter`, so it never takes more than its share
+and always counts against what live requests have left.
+"""
+from app.services.summarization_engine import RateLimiter
+from config import Config
+
+groq_limiter = RateLimiter(rpm=Config.GROQ_RPM, tpm=Config.GROQ_TPM)
+
+background_limiter = RateLimiter(
+    rpm=max(1, int(Config.GROQ_RPM * Config.BACKGROUND_QUOTA_SHARE)) if Config.GROQ_RPM else 0,
+    tpm=max(1, int(Config.GROQ_TPM * Config.BACKGROUND_QUOTA_SHARE)) if Config.GROQ_TPM else 0,
+)
+
+
+def acquire_background(tokens):
+    """Blocks until a background call of about `tokens` tokens fits both budgets."""
+    background_limiter.acquire(tokens)
+    groq_limiter.acquire(tokens)
@@ -0,0 +1,265 @@
+import hashlib
+import logging
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+
+def estimate_tokens(text):
+    """Rough token count (~4 characters per token) used for budgeting."""
+    return len(text) // 4 + 1
+
+
+class TokenBucket:
+    """Classic token bucket refilled continuously at `per_minute` tokens per minute."""
+
+    def __init__(self, per_minute, capacity=None):
+        self.rate = per_minute / 60.0
+        self.capacity = capacity or per_minute
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self, amount=1):
+        # A single request larger than the bucket would otherwise wait forever.
+        amount = min(amount, self.capacity)
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return
+                delay = (amount - self.tokens) / self.rate
+            time.sleep(delay)
+
+
+class RateLimiter:
+    """
+    Keeps LLM traffic under the provider's requests-per-minute and
+    tokens-per-minute limits. A limit of 0 disables that bucket.
+    """
+
+    def __init__(self, rpm=0, tpm=0):
+        self.requests = TokenBucket(rpm) if rpm else None
+        self.tokens = TokenBucket(tpm) if tpm else None
+
+    def acquire(self, tokens):
+        if self.requests:
+            self.requests.acquire(1)
+        if self.tokens:
+            self.tokens.acquire(tokens)
+
+
+class ChunkSummaryCache:
+    """
+    Chunk summaries keyed by a hash of the chunk text and the map prompt,
+    so re-uploading a document (or an edited copy) only re-summarizes the
+    chunks whose text changed. In-process LRU in front of an optional
+    MongoDB collection.
+    """
+
+    def __init__(self, max_entries=2048, collection=None, namespace=""):
+        self.max_entries = max_entries
+        self.collection = collection
+        self.namespace = namespace
+        self._local = OrderedDict()
+        self._lock = threading.Lock()
+
+    def key(self, text):
+        return hashlib.sha256(f"{self.namespace}\x00{text}".encode("utf-8")).hexdigest()
+
+    def get(self, text, local_only=False):
+        key = self.key(text)
+        with self._lock:
+            if key in self._local:
+                self._local.move_to_end(key)
+                return self._local[key]
+        if local_only or self.collection is None:
+            return None
+        try:
+            doc = self.collection.find_one({"_id": key}, {"summary": 1})
+        except Exception as e:
+            logger.warning("chunk cache lookup failed: %s", e)
+            return None
+        if doc:
+            self._put_local(key, doc["summary"])
+            return doc["summary"]
+        return None
+
+    def put(self, text, summary):
+        key = self.key(text)
+        self._put_local(key, summary)
+        if self.collection is None:
+            return
+        try:
+            self.collection.update_one(
+                {"_id": key},
+                {"$set": {"summary": summary, "created_at": datetime.utcnow()}},
+                upsert=True,
+            )
+        except Exception as e:
+            logger.warning("chunk cache write failed: %s", e)
+
+    def _put_local(self, key, summary):
+        with self._lock:
+            self._local[key] = summary
+            self._local.move_to_end(key)
+            while len(self._local) > self.max_entries:
+                self._local.popitem(last=False)
+
+
+class SummarizationEngine:
+    """
+    Map/reduce summarizer with bounded, rate-limited fan-out.
+
+    map:    every chunk is summarized on a shared thread pool; at most
+            `max_in_flight` chunks of one request are queued at a time so
+            a generator of chunks is consumed lazily.
+    reduce: partial summaries are grouped into batches that fit
+            `max_reduce_tokens` and collapsed level by level until the
+            final combine prompt fits in the model's context.
+
+    `run`/`stream` execute a SummaryPlan, which may also choose a single
+    stuffed call or a sequential refine over a few large chunks.
+    """
+
+    # Completion budget assumed per call when charging the TPM bucket.
+    OUTPUT_TOKENS = 512
+    MAX_REDUCE_LEVELS = 6
+
+    def __init__(self, llm, map_prompt, collapse_prompt, combine_prompt, refine_prompt=None,
+                 max_workers=4, limiter=None, cache=None, max_reduce_tokens=4000):
+        self.llm = llm
+        self.map_chain = map_prompt | llm
+        self.collapse_chain = collapse_prompt | llm
+        self.combine_chain = combine_prompt | llm
+        self.refine_chain = refine_prompt | llm if refine_prompt is not None else None
+        self.max_workers = max_workers
+        self.max_in_flight = max_workers * 2
+        self.limiter = limiter or RateLimiter()
+        self.cache = cache or ChunkSummaryCache()
+        self.max_reduce_tokens = max_reduce_tokens
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="summarize")
+
+    def summarize(self, chunks, ln, on_progress=None):
+        return self.combine(self.map(chunks, on_progress=on_progress), ln)
+
+    def combine(self, summaries, ln):
+        return self._call(self.combine_chain, {"text": self.reduce(summaries), "ln": ln})
+
+    # ==== Planned runs ====
+    def run(self, plan, chunks, ln, stuff_prompt=None, on_progress=None):
+        chain, prompt_input = self.final_step(plan, chunks, ln, stuff_prompt, on_progress)
+        return self._call(chain, prompt_input)
+
+    def stream(self, plan, chunks, ln, stuff_prompt=None, on_progress=None):
+        """Same as run() but yields the final call's message chunks."""
+        chain, prompt_input = self.final_step(plan, chunks, ln, stuff_prompt, on_progress)
+        self.acquire(prompt_input)
+        yield from chain.stream(prompt_input)
+
+    def final_step(self, plan, chunks, ln, stuff_prompt=None, on_progress=None):
+        """
+        Makes every call of the plan except the last and returns
+        (chain, input) for that one, so callers can invoke or stream it.
+        Callers that do must `acquire(input)` first.
+        """
+        if plan.strategy == "stuff":
+            chain = stuff_prompt | self.llm if stuff_prompt is not None else self.combine_chain
+            return chain, {"text": "\n".join(chunks), "ln": ln}
+
+        if plan.strategy == "refine" and self.refine_chain is not None:
+            chunks = list(chunks)
+            summary = None
+            for index, chunk in enumerate(chunks[:-1]):
+                summary = self._call(*self._refine_input(summary, chunk, ln))
+                if on_progress:
+                    on_progress(index + 1, len(chunks))
+            return self._refine_input(summary, chunks[-1], ln)
+
+        summaries = self.map(chunks, on_progress=on_progress)
+        return self.combine_chain, {"text": self.reduce(summaries), "ln": ln}
+
+    def _refine_input(self, summary, chunk, ln):
+        if summary is None:
+            return self.combine_chain, {"text": chunk, "ln": ln}
+        return self.refine_chain, {"existing": summary, "text": chunk, "ln": ln}
+
+    # ==== Map ====
+    def map(self, chunks, on_progress=None):
+        results = {}
+        in_flight = {}
+        total = 0
+        for index, chunk in enumerate(chunks):
+            total += 1
+            cached = self.cache.get(chunk, local_only=True)
+            if cached is not None:
+                results[index] = cached
+                continue
+            in_flight[self._pool.submit(self._summarize_chunk, chunk)] = index
+            if len(in_flight) >= self.max_in_flight:
+                self._collect(in_flight, results, FIRST_COMPLETED)
+                if on_progress:
+                    on_progress(len(results), total)
+
+        while in_flight:
+            self._collect(in_flight, results, FIRST_COMPLETED)
+            if on_progress and in_flight:
+                on_progress(len(results), total)
+        if on_progress:
+            on_progress(len(results), total)
+        return [results[i] for i in range(total)]
+
+    def _collect(self, in_flight, results, return_when):
+        done, _ = wait(list(in_flight), return_when=return_when)
+        for future in done:
+            results[in_flight.pop(future)] = future.result()
+
+    def _summarize_chunk(self, chunk):
+        summary = self.cache.get(chunk)
+        if summary is None:
+            summary = self._call(self.map_chain, {"text": chunk})
+            self.cache.put(chunk, summary)
+        return summary
+
+    # ==== Reduce ====
+    def reduce(self, summaries):
+        """Collapses partial summaries until they fit one combine prompt."""
+        texts = list(summaries)
+        for _ in range(self.MAX_REDUCE_LEVELS):
+            if len(texts) <= 1 or sum(estimate_tokens(t) for t in texts) <= self.max_reduce_tokens:
+                break
+            groups = self._group(texts)
+            texts = list(self._pool.map(
+                lambda group: self._call(self.collapse_chain, {"text": "\n\n".join(group)}),
+                groups,
+            ))
+        return "\n\n".join(texts)
+
+    def _group(self, texts):
+        groups, current, size = [], [], 0
+        for text in texts:
+            tokens = estimate_tokens(text)
+            if current and size + tokens > self.max_reduce_tokens:
+                groups.append(current)
+                current, size = [], 0
+            current.append(text)
+            size += tokens
+        if current:
+            groups.append(current)
+        return groups
+
+    def acquire(self, prompt_input):
+        """Blocks until a call with `prompt_input` fits the rate limits."""
+        text = prompt_input["text"] + prompt_input.get("existing", "")
+        self.limiter.acquire(estimate_tokens(text) + self.OUTPUT_TOKENS)
+
+    def _call(self, chain, prompt_input):
+        self.acquire(prompt_input)
+        return chain.invoke(prompt_input).content
@@ -0,0 +1,178 @@
+import logging
+import math
+import threading
+from itertools import chain
+
+from app.services.summarization_engine import estimate_tokens
+from app.utils.pdf_ingest import iter_chunks
+
+logger = logging.getLogger(__name__)
+
+STUFF, MAP_REDUCE, REFINE = "stuff", "map_reduce", "refine"
+
+# Characters of the document used to measure its characters-per-token ratio.
+CALIBRATION_CHARS = 20000
+
+
+# ==== Token counting ====
+class TokenCounter:
+    """
+    Counts tokens with a Hugging Face tokenizer when one can be loaded
+    (`name`: a local tokenizer directory, or a Hub name already in the local
+    cache; the Hub is never contacted) and with the ~4 characters per token
+    estimate otherwise. The tokenizer is loaded once, by the worker's
+    warm-up or on first use.
+    """
+
+    def __init__(self, name=""):
+        self.name = name
+        self._tokenizer = None
+        self._loaded = False
+        self._lock = threading.Lock()
+
+    def _load(self):
+        with self._lock:
+            if self._loaded:
+                return self._tokenizer
+            self._loaded = True
+            if not self.name:
+                return None
+            try:
+                from transformers import AutoTokenizer
+                self._tokenizer = AutoTokenizer.from_pretrained(self.name, local_files_only=True)
+            except Exception as e:
+                logger.warning("tokenizer %r unavailable, estimating instead: %s", self.name, e)
+            return self._tokenizer
+
+    @property
+    def exact(self):
+        return self._load() is not None
+
+    def count(self, text):
+        tokenizer = self._load()
+        if tokenizer is None:
+            return estimate_tokens(text)
+        return len(tokenizer.encode(text, add_special_tokens=False))
+
+    def chars_per_token(self, text):
+        sample = text[:CALIBRATION_CHARS]
+        if not sample.strip():
+            return 4.0
+        return max(1.0, len(sample) / max(1, self.count(sample)))
+
+
+# ==== Plans ====
+class SummaryPlan:
+    """How one document gets summarized: the strategy, its chunk size and the LLM calls it takes."""
+
+    def __init__(self, strategy, total_tokens, chunk_tokens, overlap_tokens, calls, chars_per_token):
+        self.strategy = strategy
+        self.total_tokens = total_tokens
+        self.chunk_tokens = chunk_tokens
+        self.overlap_tokens = overlap_tokens
+        self.calls = calls
+        self.chars_per_token = chars_per_token
+
+    @property
+    def chunk_chars(self):
+        return int(self.chunk_tokens * self.chars_per_token)
+
+    @property
+    def overlap_chars(self):
+        return int(self.overlap_tokens * self.chars_per_token)
+
+    def as_dict(self):
+        return {
+            "strategy": self.strategy,
+            "total_tokens": self.total_tokens,
+            "chunk_tokens": self.chunk_tokens,
+            "calls": self.calls,
+        }
+
+
+class SummaryPlanner:
+    """
+    Picks the summarization strategy that needs the fewest LLM calls:
+
+    stuff       the document fits one prompt: a single call.
+    refine      a few chunks: each call rewrites the running summary with
+                the next chunk, so n chunks cost n calls and no combine step.
+    map_reduce  anything longer: chunks are summarized in parallel, then
+                combined (plus a collapse level for very long inputs).
+
+    Chunks are as large as the model's context allows after the prompt, the
+    completion and a safety margin, and never larger than one minute of the
+    tokens-per-minute budget, so every call can go through on its own.
+    """
+
+    def __init__(self, counter, context_tokens=8192, output_tokens=1024, prompt_tokens=200,
+                 tpm=0, overlap_tokens=50, refine_max_chunks=3, safety=0.9):
+        self.counter = counter
+        self.context_tokens = context_tokens
+        self.output_tokens = output_tokens
+        self.prompt_tokens = prompt_tokens
+        self.tpm = tpm
+        self.overlap_tokens = overlap_tokens
+        self.refine_max_chunks = refine_max_chunks
+        self.safety = safety
+
+    @property
+    def input_budget(self):
+        """Largest input one call may carry."""
+        window = self.context_tokens if not self.tpm else min(self.context_tokens, self.tpm)
+        return max(256, int(window * self.safety) - self.prompt_tokens - self.output_tokens)
+
+    def plan(self, total_tokens, chars_per_token=4.0):
+        """Plans a document of known length."""
+        budget = self.input_budget
+        if total_tokens <= budget:
+            return SummaryPlan(STUFF, total_tokens, budget, 0, 1, chars_per_token)
+
+        map_chunks = self._chunk_count(total_tokens, budget)
+        # Refine carries the running summary alongside each chunk.
+        refine_budget = budget - self.output_tokens
+        refine_chunks = self._chunk_count(total_tokens, refine_budget)
+        if refine_chunks <= min(self.refine_max_chunks, map_chunks + 1):
+            return SummaryPlan(REFINE, total_tokens, self._balanced(total_tokens, refine_chunks, refine_budget),
+                               self.overlap_tokens, refine_chunks, chars_per_token)
+        return SummaryPlan(MAP_REDUCE, total_tokens, self._balanced(total_tokens, map_chunks, budget),
+                           self.overlap_tokens, map_chunks + 1, chars_per_token)
+
+    def plan_text(self, text):
+        """Returns (plan, chunks) for a document that is already in memory."""
+        plan = self.plan(self.counter.count(text), self.counter.chars_per_token(text))
+        if plan.strategy == STUFF:
+            return plan, [text]
+        return plan, list(iter_chunks([text], chunk_size=plan.chunk_chars, chunk_overlap=plan.overlap_chars))
+
+    def plan_pages(self, pages):
+        """
+        Returns (plan, chunks) for a stream of page texts. Pages are buffered
+        only until the document is known to need map_reduce (a few context
+        windows at most); the rest is chunked as it streams in.
+        """
+        pages = iter(pages)
+        buffered, tokens = [], 0
+        limit = self.input_budget * max(1, self.refine_max_chunks)
+        for page in pages:
+            buffered.append(page)
+            tokens += self.counter.count(page)
+            if tokens > limit:
+                break
+        else:
+            text = "\n".join(buffered)
+            return self.plan_text(text) if text.strip() else (None, [])
+
+        ratio = self.counter.chars_per_token("\n".join(buffered))
+        budget = self.input_budget
+        plan = SummaryPlan(MAP_REDUCE, None, budget, self.overlap_tokens, None, ratio)
+        return plan, iter_chunks(chain(buffered, pages), chunk_size=plan.chunk_chars,
+                                 chunk_overlap=plan.overlap_chars)
+
+    def _chunk_count(self, total, budget):
+        return math.ceil(max(1, total - self.overlap_tokens) / max(1, budget - self.overlap_tokens))
+
+    def _balanced(self, total, count, budget):
+        """Even chunk sizes, so the last chunk is not a tiny leftover call."""
+        # 5% slack: the splitter cuts at separators, a little short of the limit.
+        return min(budget, math.ceil(total / count * 1.05) + self.overlap_tokens)
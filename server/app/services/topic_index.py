@@ -0,0 +1,480 @@
+import json
+import logging
+import math
+import os
+import re
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows: the index is only shared between threads there
+    fcntl = None
+
+from app.utils.explanation_store import normalize_topic
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+VECTORS_FILE = "vectors.f32"
+TOPICS_FILE = "topics.jsonl"
+LOCK_FILE = "index.lock"
+
+# Rows scored per matrix product, so a brute-force search never holds more
+# than one block of scores in memory.
+SEARCH_BLOCK_ROWS = 65536
+
+
+# ==== Embeddings ====
+class SentenceEmbedder:
+    """
+    Mean-pooled, unit-length sentence embeddings from a small Hugging Face
+    encoder run on CPU. The model is loaded on first use; when transformers,
+    torch or the model itself is unavailable, `available` is False and the
+    topic index falls back to exact keys. Recent topics are kept in an LRU.
+    """
+
+    def __init__(self, name, max_length=32, batch_size=64, cache_size=4096):
+        self.name = name
+        self.max_length = max_length
+        self.batch_size = batch_size
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+        self._model = None
+        self._tokenizer = None
+        self._torch = None
+        self._loaded = False
+        self._lock = threading.Lock()
+
+    def _load(self):
+        with self._lock:
+            if self._loaded:
+                return self._model
+            self._loaded = True
+            try:
+                import torch
+                from transformers import AutoModel, AutoTokenizer
+                self._tokenizer = AutoTokenizer.from_pretrained(self.name)
+                model = AutoModel.from_pretrained(self.name)
+                model.eval()
+                self._torch, self._model = torch, model
+            except Exception as e:
+                logger.warning("embedding model %r unavailable, matching exact keys only: %s", self.name, e)
+            return self._model
+
+    @property
+    def available(self):
+        return self._load() is not None
+
+    @property
+    def dim(self):
+        model = self._load()
+        return model.config.hidden_size if model is not None else None
+
+    def encode(self, texts):
+        """Returns a (len(texts), dim) float32 matrix of unit vectors."""
+        self._load()
+        found = {}
+        with self._lock:
+            for text in texts:
+                if text in self._cache:
+                    self._cache.move_to_end(text)
+                    found[text] = self._cache[text]
+        missing = [text for text in dict.fromkeys(texts) if text not in found]
+        for start in range(0, len(missing), self.batch_size):
+            batch = missing[start:start + self.batch_size]
+            found.update(zip(batch, self._embed(batch)))
+            with self._lock:
+                for text in batch:
+                    self._cache[text] = found[text]
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+        return np.stack([found[text] for text in texts]) if texts else np.empty((0, self.dim), np.float32)
+
+    def _embed(self, texts):
+        torch = self._torch
+        batch = self._tokenizer(texts, padding=True, truncation=True, max_length=self.max_length,
+                                return_tensors="pt")
+        with torch.inference_mode():
+            hidden = self._model(**batch).last_hidden_state
+        mask = batch["attention_mask"].unsqueeze(-1).to(hidden.dtype)
+        pooled = (hidden * mask).sum(dim=1) / mask.sum(dim=1).clamp(min=1e-9)
+        return torch.nn.functional.normalize(pooled, dim=1).numpy().astype(np.float32)
+
+
+# ==== Index ====
+def _top_k(scores, rows, k):
+    """Best `k` (rows, scores) per query row of `scores`, highest first."""
+    k = min(k, scores.shape[1])
+    if k == 1:
+        part = np.argmax(scores, axis=1)[:, None]
+        return rows[part], np.take_along_axis(scores, part, axis=1)
+    part = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    part_scores = np.take_along_axis(scores, part, axis=1)
+    order = np.argsort(-part_scores, axis=1)
+    return rows[np.take_along_axis(part, order, axis=1)], np.take_along_axis(part_scores, order, axis=1)
+
+
+class TopicIndex:
+    """
+    Canonical topics and their unit embeddings, persisted in `directory`:
+
+    vectors.f32   float32 rows, memory-mapped; the file doubles in size when full.
+    topics.jsonl  one canonical topic and its normalised key per row; its
+                  line count is the row count.
+
+    Rows are written before their topic line, so a reader never sees a topic
+    without its vector. Every worker on the host maps the same files and
+    picks up rows added by the others on `refresh`; writers serialise on a
+    file lock. Searches are batched cosine (dot products of unit vectors)
+    over the whole matrix until it holds `ivf_min_size` rows; from then on an
+    inverted-file index (k-means cells, `nprobe` cells searched) is built in
+    the background and used once ready.
+    """
+
+    def __init__(self, directory, dim, ivf_min_size=50000, nprobe=8, initial_capacity=1024):
+        self.directory = directory
+        self.dim = dim
+        self.ivf_min_size = ivf_min_size
+        self.nprobe = nprobe
+        self.initial_capacity = initial_capacity
+        self._topics = []
+        self._keys = {}
+        self._offset = 0
+        self._vectors = None
+        self._capacity = 0
+        self._ivf = None
+        self._ivf_rows = 0
+        self._ivf_building = False
+        self._lock = threading.RLock()
+        os.makedirs(directory, exist_ok=True)
+        self.refresh()
+
+    def _path(self, name):
+        return os.path.join(self.directory, name)
+
+    def __len__(self):
+        return len(self._topics)
+
+    def topic(self, row):
+        return self._topics[row]
+
+    def find_key(self, topic):
+        """Row of a canonical topic with the same normalised key, or None."""
+        return self._keys.get(normalize_topic(topic))
+
+    # ==== Disk ====
+    def refresh(self):
+        """Loads rows other processes have appended since the last call."""
+        with self._lock:
+            try:
+                size = os.path.getsize(self._path(TOPICS_FILE))
+            except FileNotFoundError:
+                size = 0
+            if size <= self._offset:
+                return
+            with open(self._path(TOPICS_FILE), "rb") as f:
+                f.seek(self._offset)
+                data = f.read(size - self._offset)
+            end = data.rfind(b"\n") + 1  # a line still being written is read next time
+            start = len(self._topics)
+            lines = data[:end].decode("utf-8").splitlines()
+            for record in json.loads("[" + ",".join(lines) + "]"):  # one parse for the whole tail
+                self._keys.setdefault(record["key"], len(self._topics))
+                self._topics.append(record["topic"])
+            self._offset += end
+            self._map(len(self._topics))
+            self._index_new_rows(start)
+
+    def _map(self, rows):
+        if self._vectors is not None and rows <= self._capacity:
+            return
+        path = self._path(VECTORS_FILE)
+        capacity = os.path.getsize(path) // (self.dim * 4) if os.path.exists(path) else 0
+        if capacity:
+            self._vectors = np.memmap(path, dtype=np.float32, mode="r+", shape=(capacity, self.dim))
+        self._capacity = capacity
+
+    def _reserve(self, rows):
+        if rows <= self._capacity:
+            return
+        capacity = max(self.initial_capacity, self._capacity)
+        while capacity < rows:
+            capacity *= 2
+        with open(self._path(VECTORS_FILE), "ab") as f:
+            f.truncate(capacity * self.dim * 4)
+        self._map(rows)
+
+    @contextmanager
+    def _file_lock(self):
+        with open(self._path(LOCK_FILE), "a") as f:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+
+    # ==== Writes ====
+    def add(self, topics, vectors):
+        """
+        Appends canonical topics with their (n, dim) unit vectors. Topics
+        whose normalised key is already indexed are skipped. Returns the rows
+        of every given topic.
+        """
+        vectors = np.asarray(vectors, dtype=np.float32).reshape(len(topics), self.dim)
+        with self._lock, self._file_lock():
+            self.refresh()
+            new, seen = [], set()
+            for i, topic in enumerate(topics):
+                key = normalize_topic(topic)
+                if key not in self._keys and key not in seen:
+                    seen.add(key)
+                    new.append(i)
+            if new:
+                start = len(self._topics)
+                self._reserve(start + len(new))
+                self._vectors[start:start + len(new)] = vectors[new]
+                self._vectors.flush()
+                lines = "".join(json.dumps({"topic": topics[i], "key": normalize_topic(topics[i])}) + "\n"
+                                for i in new)
+                with open(self._path(TOPICS_FILE), "ab") as f:
+                    f.write(lines.encode("utf-8"))
+                self.refresh()
+            return [self._keys[normalize_topic(topic)] for topic in topics]
+
+    # ==== Search ====
+    def search(self, queries, k=1):
+        """
+        Returns (rows, scores), each (len(queries), k), for a batch of unit
+        query vectors; rows are -1 where the index has fewer than k topics.
+        """
+        queries = np.asarray(queries, dtype=np.float32).reshape(-1, self.dim)
+        with self._lock:
+            count, vectors, ivf = len(self._topics), self._vectors, self._ivf
+        rows = np.full((len(queries), k), -1, dtype=np.int64)
+        scores = np.full((len(queries), k), -np.inf, dtype=np.float32)
+        if not count or not len(queries):
+            return rows, scores
+        if ivf is not None:
+            return self._search_ivf(queries, k, vectors, ivf, rows, scores)
+
+        for start in range(0, count, SEARCH_BLOCK_ROWS):
+            stop = min(count, start + SEARCH_BLOCK_ROWS)
+            block_rows, block_scores = _top_k(queries @ np.asarray(vectors[start:stop]).T, np.arange(start, stop), k)
+            merged_rows = np.concatenate([rows, block_rows], axis=1)
+            picked, scores = _top_k(np.concatenate([scores, block_scores], axis=1),
+                                    np.arange(merged_rows.shape[1]), k)
+            rows = np.take_along_axis(merged_rows, picked, axis=1)
+        return rows, scores
+
+    def _search_ivf(self, queries, k, vectors, ivf, rows, scores):
+        centroids, cells = ivf
+        nprobe = min(self.nprobe, len(centroids))
+        probes = np.argpartition(-(queries @ centroids.T), nprobe - 1, axis=1)[:, :nprobe]
+        for i, query in enumerate(queries):
+            candidates = np.sort(np.concatenate([cells[c] for c in probes[i]]))
+            if not len(candidates):
+                continue
+            candidate_scores = (np.asarray(vectors[candidates]) @ query)[None, :]
+            best_rows, best_scores = _top_k(candidate_scores, candidates, k)
+            rows[i, :best_rows.shape[1]] = best_rows[0]
+            scores[i, :best_scores.shape[1]] = best_scores[0]
+        return rows, scores
+
+    # ==== Approximate index ====
+    def build_ivf(self, cells=None, iterations=8, sample_size=20000, seed=0):
+        """
+        Trains k-means cells (about sqrt(n) of them) on a sample of the rows
+        and assigns every row to its nearest cell. Rows added later are
+        assigned as they arrive; the cells are retrained once the index has
+        doubled since the last build.
+        """
+        with self._lock:
+            count, vectors = len(self._topics), self._vectors
+        if not count:
+            return
+        rng = np.random.default_rng(seed)
+        cells = min(count, cells or max(1, int(math.sqrt(count))))
+        sample = np.asarray(vectors[np.sort(rng.choice(count, min(count, sample_size), replace=False))])
+        centroids = sample[rng.choice(len(sample), cells, replace=False)].copy()
+        for _ in range(iterations):
+            assignment = np.argmax(sample @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assignment, sample)
+            filled = np.bincount(assignment, minlength=cells) > 0
+            norms = np.linalg.norm(sums[filled], axis=1, keepdims=True)
+            centroids[filled] = sums[filled] / np.maximum(norms, 1e-9)
+
+        assignment = self._assign(centroids, vectors, 0, count)
+        order = np.argsort(assignment, kind="stable")
+        bounds = np.searchsorted(assignment[order], np.arange(cells + 1))
+        lists = [order[bounds[c]:bounds[c + 1]] for c in range(cells)]
+        with self._lock:
+            self._ivf = (centroids, lists)
+            self._ivf_rows = count
+            # Rows that arrived while training.
+            self._index_new_rows(count)
+
+    @staticmethod
+    def _assign(centroids, vectors, start, stop):
+        return np.concatenate([
+            np.argmax(np.asarray(vectors[block:min(stop, block + SEARCH_BLOCK_ROWS)]) @ centroids.T, axis=1)
+            for block in range(start, stop, SEARCH_BLOCK_ROWS)
+        ] or [np.empty(0, dtype=np.int64)])
+
+    def _index_new_rows(self, start):
+        """Puts rows from `start` on into their IVF cells; schedules a (re)build when due."""
+        count = len(self._topics)
+        if self._ivf is not None and start < count:
+            centroids, lists = self._ivf
+            lists = list(lists)
+            for row, cell in zip(range(start, count), self._assign(centroids, self._vectors, start, count)):
+                lists[cell] = np.append(lists[cell], row)
+            self._ivf = (centroids, lists)
+        due = count >= self.ivf_min_size and (self._ivf is None or count >= 2 * self._ivf_rows)
+        if due and not self._ivf_building:
+            self._ivf_building = True
+            threading.Thread(target=self._build_in_background, name="topic-index-ivf", daemon=True).start()
+
+    def _build_in_background(self):
+        try:
+            self.build_ivf()
+        except Exception as e:
+            logger.warning("IVF build failed: %s", e)
+        finally:
+            with self._lock:
+                self._ivf_building = False
+
+    def get_stats(self):
+        with self._lock:
+            return {
+                "topics": len(self._topics),
+                "capacity": self._capacity,
+                "ivf_cells": len(self._ivf[0]) if self._ivf is not None else 0,
+                "ivf_building": self._ivf_building,
+            }
+
+
+# ==== Canonical topics ====
+class TopicResolver:
+    """
+    Maps free-text topics onto canonical ones, so "Photosynthesis",
+    "photosynthesis process" and "how plants make food" share one stored
+    explanation and one quiz bank.
+
+    `resolve` returns the canonical topic whose embedding is at least
+    `threshold` cosine-similar to the query (or has the same normalised
+    key), and the query itself otherwise. `register` makes a topic
+    canonical once content has been generated for it. The index lives in a
+    subdirectory per embedding model, since vectors from different models
+    are not comparable.
+    """
+
+    def __init__(self, embedder, directory, threshold=0.8, seed_topics=(), ivf_min_size=50000, nprobe=8):
+        self.embedder = embedder
+        self.directory = directory
+        self.threshold = threshold
+        self.seed_topics = list(seed_topics)
+        self.ivf_min_size = ivf_min_size
+        self.nprobe = nprobe
+        self._index = None
+        self._loaded = False
+        self._lock = threading.Lock()
+        self.stats = {"exact": 0, "semantic": 0, "new": 0, "registered": 0}
+
+    @property
+    def index(self):
+        with self._lock:
+            if self._loaded:
+                return self._index
+            self._loaded = True
+            if not self.embedder.available:
+                return None
+            slug = re.sub(r"[^\w.-]+", "_", self.embedder.name)
+            try:
+                self._index = TopicIndex(os.path.join(self.directory, slug), self.embedder.dim,
+                                         ivf_min_size=self.ivf_min_size, nprobe=self.nprobe)
+            except OSError as e:
+                logger.warning("cannot open %r: %s", self.directory, e)
+                return None
+        if self.seed_topics:
+            self._index.add(self.seed_topics, self.embedder.encode(self.seed_topics))
+        return self._index
+
+    def match(self, topic):
+        """Returns (canonical_topic, score) of the nearest canonical topic, or (None, score)."""
+        index = self.index
+        if index is None:
+            return None, 0.0
+        index.refresh()
+        row = index.find_key(topic)
+        if row is not None:
+            return index.topic(row), 1.0
+        rows, scores = index.search(self.embedder.encode([topic]))
+        row, score = int(rows[0, 0]), float(scores[0, 0])
+        if row >= 0 and score >= self.threshold:
+            return index.topic(row), score
+        return None, max(score, 0.0)
+
+    def resolve(self, topic):
+        try:
+            canonical, score = self.match(topic)
+        except Exception as e:
+            logger.warning("lookup of %r failed: %s", topic, e)
+            return topic
+        self._count("new" if canonical is None else "exact" if score >= 1.0 else "semantic")
+        return canonical or topic
+
+    def register(self, topic):
+        """Adds `topic` as a canonical topic unless it already resolves to one."""
+        try:
+            canonical, _ = self.match(topic)
+            if canonical is None and self.index is not None:
+                self.index.add([topic], self.embedder.encode([topic]))
+                self._count("registered")
+        except Exception as e:
+            logger.warning("registering %r failed: %s", topic, e)
+
+    def get_stats(self):
+        with self._lock:
+            stats = dict(self.stats)
+        index = self._index
+        stats["model"] = self.embedder.name
+        stats["threshold"] = self.threshold
+        stats.update(index.get_stats() if index is not None else {"topics": 0})
+        return stats
+
+    def _count(self, name):
+        with self._lock:
+            self.stats[name] += 1
+
+
+def _create_resolver():
+    if not Config.TOPIC_INDEX_ENABLED:
+        return None
+    return TopicResolver(
+        SentenceEmbedder(Config.TOPIC_INDEX_MODEL),
+        Config.TOPIC_INDEX_DIR,
+        threshold=Config.TOPIC_INDEX_THRESHOLD,
+        seed_topics=[topic.strip() for topic in Config.QUIZ_BANK_TOPICS.split(",") if topic.strip()],
+        ivf_min_size=Config.TOPIC_INDEX_IVF_MIN_SIZE,
+        nprobe=Config.TOPIC_INDEX_NPROBE,
+    )
+
+
+topic_resolver = _create_resolver()
+
+
+def resolve_topic(topic):
+    """The canonical topic for `topic` (itself when nothing close enough is indexed)."""
+    return topic_resolver.resolve(topic) if topic_resolver is not None and topic else topic
+
+
+def register_topic(topic):
+    if topic_resolver is not None and topic:
+        topic_resolver.register(topic)
@@ -0,0 +1,65 @@
+import threading
+
+
+class _Batch:
+    def __init__(self):
+        self.entries = []
+        self.leader = False
+        self.full = threading.Event()
+        self.done = threading.Event()
+        self.results = None
+        self.error = None
+
+
+class WriteCoalescer:
+    """
+    Group commit for small writes arriving from many request threads.
+
+    The first caller to add to an open batch becomes its leader: it waits up
+    to `window` seconds (or until `max_batch` entries have queued up), then
+    calls `flush(entries)` once for everything collected and hands each
+    caller its slice of the results. `flush` must return one result per
+    entry, in order. A window of 0 flushes every call on its own.
+    """
+
+    def __init__(self, flush, window=0.005, max_batch=500):
+        self.flush = flush
+        self.window = window
+        self.max_batch = max_batch
+        self._lock = threading.Lock()
+        self._batch = _Batch()
+
+    def submit(self, entries):
+        entries = list(entries)
+        if not entries:
+            return []
+        if self.window <= 0 or len(entries) >= self.max_batch:
+            return self.flush(entries)
+
+        with self._lock:
+            batch = self._batch
+            start = len(batch.entries)
+            batch.entries.extend(entries)
+            leader = not batch.leader
+            batch.leader = True
+            if len(batch.entries) >= self.max_batch:
+                # Close the batch so later callers start a new one.
+                self._batch = _Batch()
+                batch.full.set()
+
+        if leader:
+            batch.full.wait(self.window)
+            with self._lock:
+                if self._batch is batch:
+                    self._batch = _Batch()
+            try:
+                batch.results = self.flush(batch.entries)
+            except Exception as e:
+                batch.error = e
+            batch.done.set()
+        else:
+            batch.done.wait()
+
+        if batch.error is not None:
+            raise batch.error
+        return batch.results[start:start + len(entries)]
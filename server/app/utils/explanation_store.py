@@ -0,0 +1,187 @@
+import logging
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+logger = logging.getLogger(__name__)
+
+# Common abbreviations students type instead of the full topic name.
+TOPIC_SYNONYMS = {
+    "ai": "artificial intelligence",
+    "ml": "machine learning",
+    "dl": "deep learning",
+    "nlp": "natural language processing",
+    "js": "javascript",
+    "ts": "typescript",
+    "db": "database",
+    "dbms": "database management system",
+    "oop": "object oriented programming",
+    "dsa": "data structure and algorithm",
+    "os": "operating system",
+}
+
+# Words ending in "s" that are not plurals.
+_SINGULAR_S_ENDINGS = ("ss", "us", "is", "ics")
+
+
+def _singularize(word):
+    if len(word) <= 3 or word.endswith(_SINGULAR_S_ENDINGS):
+        return word
+    if word.endswith("ies"):
+        return word[:-3] + "y"
+    if word.endswith(("sses", "shes", "ches", "xes")):
+        return word[:-2]
+    if word.endswith("s"):
+        return word[:-1]
+    return word
+
+
+def normalize_topic(topic):
+    """
+    Folds a free-text topic into a lookup key:
+    case, punctuation and whitespace are ignored, simple plurals are
+    singularized and known abbreviations are expanded.
+    "Neural Networks", "neural  network" and "neural-networks" share one key.
+    """
+    text = str(topic).lower().replace("&", " and ")
+    text = re.sub(r"[^\w\s]", " ", text)
+    words = []
+    for word in text.split():
+        words.extend(TOPIC_SYNONYMS.get(word, word).split())
+    return " ".join(_singularize(w) for w in words)
+
+
+def normalize_level(level):
+    return re.sub(r"\s+", " ", str(level or "")).strip().lower()
+
+
+class ExplanationStore:
+    """
+    Read-through store for topic explanations shared across users.
+
+    Lookup order: the `explanation_cache` collection, then any user's saved
+    document in `explanations` for the same topic key and level, then the LLM.
+    Entries older than `stale_after` are still served, but a background
+    thread regenerates them so the next reader gets a fresh copy. With a
+    `topics` resolver, near-duplicate topics are stored under their
+    canonical topic and share one entry; a miss is still generated for the
+    topic that was asked for.
+    """
+
+    def __init__(self, generate, cache_collection=None, explanations_collection=None,
+                 stale_after=7 * 24 * 60 * 60, refresh_workers=2, topics=None):
+        self.generate = generate
+        self.topics = topics
+        self.cache = cache_collection
+        self.explanations = explanations_collection
+        self.stale_after = timedelta(seconds=stale_after)
+        self._refresh_pool = ThreadPoolExecutor(max_workers=refresh_workers,
+                                                thread_name_prefix="explain-refresh")
+        self._refreshing = set()
+        self._lock = threading.Lock()
+
+    def canonical(self, topic):
+        return self.topics.resolve(topic) if self.topics is not None else topic
+
+    def get(self, topic, level):
+        explanation = self.lookup(topic, level)
+        if explanation is None:
+            explanation = self.generate(topic, normalize_level(level))
+            self.put(topic, level, explanation)
+        return explanation
+
+    def lookup(self, topic, level):
+        """Returns a stored explanation or None, scheduling a refresh if it is stale."""
+        topic = self.canonical(topic)
+        topic_key = normalize_topic(topic)
+        level_key = normalize_level(level)
+
+        doc = self._lookup(topic, level, topic_key, level_key)
+        if doc is None:
+            return None
+
+        updated_at = doc.get("updated_at")
+        if updated_at is None or datetime.utcnow() - updated_at > self.stale_after:
+            self._schedule_refresh(topic, topic_key, level_key)
+        return doc["explanation"]
+
+    def put(self, topic, level, explanation):
+        topic = self.canonical(topic)
+        self._store(topic, normalize_topic(topic), normalize_level(level), explanation)
+        if self.topics is not None:
+            self.topics.register(topic)
+
+    # ==== Lookup ====
+    def _lookup(self, topic, level, topic_key, level_key):
+        if self.cache is None:
+            return None
+        try:
+            doc = self.cache.find_one({"_id": self._cache_id(topic_key, level_key)})
+            if doc:
+                return doc
+            return self._lookup_saved(topic, level, topic_key, level_key)
+        except Exception as e:
+            logger.warning("lookup failed: %s", e)
+            return None
+
+    def _lookup_saved(self, topic, level, topic_key, level_key):
+        """Reuses an explanation some user already saved for this topic and level."""
+        if self.explanations is None:
+            return None
+        doc = self.explanations.find_one(
+            {
+                "$or": [{"topic_key": topic_key}, {"topic": topic}],
+                "level": {"$in": list({level, level_key})},
+            },
+            {"explanation": 1, "topic": 1, "updated_at": 1},
+            sort=[("updated_at", -1)],
+        )
+        if not doc or not doc.get("explanation"):
+            return None
+        self._store(doc.get("topic", topic), topic_key, level_key, doc["explanation"],
+                    updated_at=doc.get("updated_at"))
+        return doc
+
+    # ==== Background refresh ====
+    def _schedule_refresh(self, topic, topic_key, level_key):
+        cache_id = self._cache_id(topic_key, level_key)
+        with self._lock:
+            if cache_id in self._refreshing:
+                return
+            self._refreshing.add(cache_id)
+        self._refresh_pool.submit(self._refresh, cache_id, topic, topic_key, level_key)
+
+    def _refresh(self, cache_id, topic, topic_key, level_key):
+        try:
+            explanation = self.generate(topic, level_key)
+            self._store(topic, topic_key, level_key, explanation)
+        except Exception as e:
+            logger.warning("refresh of %r failed: %s", cache_id, e)
+        finally:
+            with self._lock:
+                self._refreshing.discard(cache_id)
+
+    def _store(self, topic, topic_key, level_key, explanation, updated_at=None):
+        if self.cache is None:
+            return
+        try:
+            self.cache.update_one(
+                {"_id": self._cache_id(topic_key, level_key)},
+                {
+                    "$set": {
+                        "topic": topic,
+                        "topic_key": topic_key,
+                        "level": level_key,
+                        "explanation": explanation,
+                        "updated_at": updated_at or datetime.utcnow(),
+                    }
+                },
+                upsert=True,
+            )
+        except Exception as e:
+            logger.warning("write failed: %s", e)
+
+    @staticmethod
+    def _cache_id(topic_key, level_key):
+        return f"{level_key}|{topic_key}"
@@ -0,0 +1,193 @@
+import hashlib
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from app.utils.metrics import report_error, span
+from config import Config
+
+USER_AGENT = (
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+    "(KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
+)
+
+# Elements that never hold article text.
+_BOILERPLATE_TAGS = ("script", "style", "noscript", "nav", "header", "footer", "aside", "form")
+
+
+def _build_session():
+    session = requests.Session()
+    adapter = HTTPAdapter(
+        pool_connections=Config.FETCH_POOL_CONNECTIONS,
+        pool_maxsize=Config.FETCH_POOL_MAXSIZE,
+        max_retries=Retry(total=2, backoff_factor=0.3, status_forcelist=[502, 503, 504],
+                          allowed_methods=["GET"]),
+    )
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    session.headers["User-Agent"] = USER_AGENT
+    return session
+
+
+_session = None
+_session_pid = None
+_session_lock = threading.Lock()
+
+
+def get_session():
+    """
+    The process-wide pooled session, created on first use. Like the Mongo
+    client, one inherited across fork() is replaced, so workers never share
+    pooled sockets with the master.
+    """
+    global _session, _session_pid
+    if _session is None or _session_pid != os.getpid():
+        with _session_lock:
+            if _session is None or _session_pid != os.getpid():
+                _session = _build_session()
+                _session_pid = os.getpid()
+    return _session
+
+
+class ResponseCache:
+    """
+    On-disk cache of extracted page text plus the validators needed for a
+    conditional GET. One JSON file per URL, written atomically so several
+    gunicorn workers can share the directory.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, url):
+        return os.path.join(self.directory, hashlib.sha256(url.encode("utf-8")).hexdigest() + ".json")
+
+    def get(self, url):
+        try:
+            with open(self._path(url), encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def put(self, url, entry):
+        """Best effort: a full disk or read-only directory must not fail a fetch that succeeded."""
+        try:
+            self._write(url, entry)
+        except OSError as e:
+            report_error("fetch_cache", e)
+
+    def _write(self, url, entry):
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(entry, f)
+            os.replace(tmp, self._path(url))
+        except OSError:
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+            raise
+
+
+cache = ResponseCache(Config.FETCH_CACHE_DIR)
+
+
+def _max_age(headers):
+    cache_control = headers.get("Cache-Control", "")
+    if "no-store" in cache_control:
+        return None
+    match = re.search(r"max-age=(\d+)", cache_control)
+    if match:
+        return int(match.group(1))
+    return Config.FETCH_CACHE_FRESH_SECONDS
+
+
+def _download(response, max_bytes):
+    """Reads the body in blocks and stops at `max_bytes`; long pages are truncated."""
+    body = bytearray()
+    for block in response.iter_content(chunk_size=64 * 1024):
+        body.extend(block)
+        if len(body) >= max_bytes:
+            del body[max_bytes:]
+            break
+    response.close()
+    return bytes(body)
+
+
+def extract_text(html):
+    """Main-content extraction with trafilatura, falling back to a plain lxml walk."""
+    import lxml.html
+    import trafilatura
+    text = trafilatura.extract(html, include_comments=False, include_tables=True)
+    if text and len(text.strip()) >= 100:
+        return text
+
+    tree = lxml.html.fromstring(html)
+    # Materialized first: dropping elements while iterating skips their siblings
+    for element in list(tree.iter(*_BOILERPLATE_TAGS)):
+        element.drop_tree()
+    main = tree.find(".//main")
+    if main is None:
+        main = tree.find(".//article")
+    if main is None:
+        found = tree.xpath(
+            "//div[contains(concat(' ', normalize-space(@class), ' '), ' content ') "
+            "or contains(@class, 'main-content') or contains(@class, 'post-content')]"
+        )
+        main = found[0] if found else tree
+    lines = (line.strip() for line in main.text_content().splitlines())
+    return "\n".join(line for line in lines if line)
+
+
+def fetch_article_text(url):
+    """
+    Returns the readable text of `url`.
+    A fresh cache entry is served without touching the network; a stale one
+    is revalidated with If-None-Match / If-Modified-Since so an unchanged
+    page costs one 304 and no parsing.
+    """
+    entry = cache.get(url)
+    now = time.time()
+    if entry and now - entry["fetched_at"] < entry["max_age"]:
+        return entry["text"]
+
+    headers = {}
+    if entry:
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+
+    with span("http", "fetch"):
+        response = get_session().get(url, headers=headers, stream=True,
+                                     timeout=(Config.FETCH_CONNECT_TIMEOUT, Config.FETCH_READ_TIMEOUT))
+        if response.status_code == 304 and entry:
+            response.close()
+            entry["fetched_at"] = now
+            cache.put(url, entry)
+            return entry["text"]
+        response.raise_for_status()
+        body = _download(response, Config.FETCH_MAX_BYTES)
+    with span("http", "extract"):
+        text = extract_text(body)
+
+    max_age = _max_age(response.headers)
+    if max_age is not None:
+        cache.put(url, {
+            "url": url,
+            "etag": response.headers.get("ETag"),
+            "last_modified": response.headers.get("Last-Modified"),
+            "max_age": max_age,
+            "fetched_at": now,
+            "text": text,
+        })
+    return text
@@ -1,11 +1,57 @@
 import jwt
-from flask import request, jsonify
+import threading
+import time
+from collections import OrderedDict
+from flask import g, request, jsonify
 from functools import wraps
-import os
 from datetime import datetime, timedelta
+from config import Config
 
-# Secret key from .env or fallback
-SECRET_KEY = os.getenv("JWT_SECRET")
+# Same secret flask_jwt_extended signs access tokens with
+SECRET_KEY = Config.JWT_SECRET_KEY
+
+# Verified tokens without an exp claim are trusted this long (seconds)
+_NO_EXPIRY_TTL = 300
+
+
+class VerifiedTokenCache:
+    """
+    Bounded LRU of tokens whose signature has already been checked.
+    An entry lives until the token's `exp`, so a hit skips the HMAC and
+    claim validation but never outlives the token itself.
+    """
+
+    def __init__(self, max_entries=1024):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, token):
+        with self._lock:
+            entry = self._entries.get(token)
+            if entry is None:
+                return None
+            expires_at, claims = entry
+            if expires_at <= time.time():
+                del self._entries[token]
+                return None
+            self._entries.move_to_end(token)
+            return claims
+
+    def put(self, token, claims):
+        expires_at = claims.get("exp") or time.time() + _NO_EXPIRY_TTL
+        with self._lock:
+            self._entries[token] = (expires_at, claims)
+            self._entries.move_to_end(token)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+token_cache = VerifiedTokenCache(Config.AUTH_TOKEN_CACHE_SIZE)
 
 # Generate JWT
 def generate_jwt(payload, expires_in=24):
@@ -16,27 +62,66 @@ def generate_jwt(payload, expires_in=24):
 
 # Decode JWT
 def decode_jwt(token):
+    claims = token_cache.get(token)
+    if claims is not None:
+        return claims
     try:
         decoded = jwt.decode(token, SECRET_KEY, algorithms=["HS256"])
-        return decoded
     except jwt.ExpiredSignatureError:
         return {"error": "Token expired"}
     except jwt.InvalidTokenError:
         return {"error": "Invalid token"}
+    token_cache.put(token, decoded)
+    return decoded
+
+# ==== Per-request identity ====
+def _bearer_token():
+    scheme, _, token = request.headers.get("Authorization", "").partition(" ")
+    return token.strip() if scheme.lower() == "bearer" else None
+
+def load_identity():
+    """
+    Verifies the request's bearer token at most once and records the
+    outcome on flask.g: `user_id` and `jwt_claims`, or `auth_error`.
+    Returns the user id (None when unauthenticated).
+    """
+    if g.get("auth_checked"):
+        return g.user_id
+    g.auth_checked = True
+    g.user_id = g.jwt_claims = g.auth_error = None
+
+    token = _bearer_token()
+    if not token:
+        g.auth_error = "Missing token"
+        return None
+    decoded = decode_jwt(token)
+    if "error" in decoded:
+        g.auth_error = decoded["error"]
+        return None
+    if not decoded.get("sub"):
+        g.auth_error = "Invalid token"
+        return None
+    g.user_id = str(decoded["sub"])
+    g.jwt_claims = decoded
+    return g.user_id
+
+def current_user_id():
+    return load_identity()
+
+def auth_error_response():
+    return jsonify({"error": g.get("auth_error") or "Invalid token"}), 401
+
+def init_auth(app):
+    """Registers the middleware that authenticates every request up front."""
+    @app.before_request
+    def authenticate():
+        load_identity()
 
 # Flask decorator to protect routes
 def jwt_required(f):
     @wraps(f)
     def decorated(*args, **kwargs):
-        token = None
-        if "Authorization" in request.headers:
-            token = request.headers["Authorization"].split(" ")[1]  # "Bearer <token>"
-        if not token:
-            return jsonify({"error": "Missing token"}), 401
-
-        decoded = decode_jwt(token)
-        if "error" in decoded:
-            return jsonify(decoded), 401
-
-        return f(decoded, *args, **kwargs)  # Pass decoded payload to route
+        if not load_identity():
+            return auth_error_response()
+        return f(g.jwt_claims, *args, **kwargs)  # Pass decoded payload to route
     return decorated
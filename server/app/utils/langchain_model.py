@@ -1,9 +1,52 @@
-from app.utils.groq_client import get_groq_model
-def get_topic_explanation(topic, level):
-    prompt = f"""
+from app.services.llm_registry import get_chat_model
+from app.services.topic_index import topic_resolver
+from app.utils.explanation_store import ExplanationStore
+from app.utils.streaming import stream_tokens
+from config import Config
+
+
+def explanation_prompt(topic, level):
+    return f"""
     Explain the topic "{topic}" in a simple and clear way suitable for a student in {level}.
     Keep the explanation short, easy to understand, and focused.
     """
-    llm = get_groq_model()
-    response = llm.invoke(prompt)
-    return response
+
+
+def generate_topic_explanation(topic, level):
+    llm = get_chat_model("explain")
+    response = llm.invoke(explanation_prompt(topic, level))
+    return response.content
+
+
+def _collections():
+    from app.models.db import collection
+    return collection("explanation_cache"), collection("explanations")
+
+
+_cache_collection, _explanations_collection = _collections()
+explanation_store = ExplanationStore(
+    generate=generate_topic_explanation,
+    cache_collection=_cache_collection,
+    explanations_collection=_explanations_collection,
+    stale_after=Config.EXPLANATION_STALE_SECONDS,
+    refresh_workers=Config.EXPLANATION_REFRESH_WORKERS,
+    topics=topic_resolver,
+)
+
+
+def get_topic_explanation(topic, level):
+    """Returns the explanation text, reusing a stored one when available."""
+    return explanation_store.get(topic, level)
+
+
+def stream_topic_explanation(topic, level):
+    """Yields streaming events; a stored explanation is sent as a single token."""
+    explanation = explanation_store.lookup(topic, level)
+    if explanation is None:
+        llm = get_chat_model("explain")
+        explanation = yield from stream_tokens(llm.stream(explanation_prompt(topic, level)))
+        explanation_store.put(topic, level, explanation)
+        yield {"type": "done", "explanation": explanation, "cached": False}
+        return
+    yield {"type": "token", "content": explanation}
+    yield {"type": "done", "explanation": explanation, "cached": True}
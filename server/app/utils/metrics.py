@@ -0,0 +1,455 @@
+import bisect
+import contextvars
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+# Seconds; wide enough for both a Mongo lookup and a long summary.
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+# ==== Metric types ====
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names, values):
+    pairs = list(zip(names, values))
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        if not Config.METRICS_ENABLED:
+            return
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self._values)
+
+    @staticmethod
+    def merge(into, key, value):
+        into[key] = into.get(key, 0) + value
+
+    def samples(self, values):
+        for key, value in sorted(values.items()):
+            yield "_total", key, (), value
+
+
+class Histogram:
+    """Cumulative-bucket histogram; one bisect and one lock per observation."""
+
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        if not Config.METRICS_ENABLED:
+            return
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def snapshot(self):
+        with self._lock:
+            return {key: [list(counts), total] for key, (counts, total) in self._series.items()}
+
+    @staticmethod
+    def merge(into, key, value):
+        counts, total = value
+        series = into.get(key)
+        if series is None:
+            into[key] = [list(counts), total]
+            return
+        series[0] = [a + b for a, b in zip(series[0], counts)]
+        series[1] += total
+
+    def samples(self, series):
+        for key, (counts, total) in sorted(series.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                yield "_bucket", key, (("le", _format_value(float(bound))),), cumulative
+            yield "_sum", key, (), round(total, 6)
+            yield "_count", key, (), cumulative
+
+
+class MetricsRegistry:
+    """
+    Metrics in the Prometheus text format.
+
+    Each gunicorn worker keeps its own series. With a `directory`, every
+    worker writes them to `<directory>/<pid>.json` (every `flush_seconds`,
+    and before it answers a scrape) and /metrics merges the files of all
+    live workers, so any worker can answer for the whole server. Files of
+    workers that exited are deleted at the next scrape; Prometheus sees
+    that as a counter reset. Without a directory only the answering
+    worker's series are rendered.
+
+    With `worker_label` each sample keeps a `worker` label (the pid)
+    instead of being summed across workers.
+    """
+
+    def __init__(self, worker_label=True, directory="", flush_seconds=5):
+        self.worker_label = worker_label
+        self.directory = directory
+        self.flush_seconds = flush_seconds
+        self._metrics = {}
+        self._lock = threading.Lock()
+        self._flusher_pid = None
+
+    def _get(self, cls, name, documentation, labelnames, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, documentation, labelnames, **kwargs)
+            return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._get(Counter, name, documentation, labelnames)
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._get(Histogram, name, documentation, labelnames, buckets=buckets)
+
+    def _metric_list(self):
+        with self._lock:
+            return list(self._metrics.values())
+
+    # ==== Shared directory ====
+    def start_flusher(self):
+        """Starts this process's flush thread once (per pid, so it also runs in forked workers)."""
+        if not self.directory or self._flusher_pid == os.getpid():
+            return
+        with self._lock:
+            if self._flusher_pid == os.getpid():
+                return
+            self._flusher_pid = os.getpid()
+        threading.Thread(target=self._flush_loop, name="metrics-flush", daemon=True).start()
+
+    def _flush_loop(self):
+        while True:
+            time.sleep(self.flush_seconds)
+            self.flush()
+
+    def flush(self):
+        """Writes this worker's series to its file in the shared directory."""
+        data = {metric.name: [[list(key), value] for key, value in metric.snapshot().items()]
+                for metric in self._metric_list()}
+        path = os.path.join(self.directory, f"{os.getpid()}.json")
+        tmp = f"{path}.tmp"
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(data, f)
+            os.replace(tmp, path)
+        except OSError as e:
+            logger.warning("cannot write %s: %s", path, e)
+
+    def _worker_snapshots(self):
+        """(pid, {metric name: {key: value}}) for every live worker."""
+        if not self.directory:
+            yield os.getpid(), {metric.name: metric.snapshot() for metric in self._metric_list()}
+            return
+        self.flush()
+        try:
+            names = os.listdir(self.directory)
+        except OSError as e:
+            logger.warning("cannot read %s: %s", self.directory, e)
+            names = []
+        for name in names:
+            pid, ext = os.path.splitext(name)
+            if ext != ".json" or not pid.isdigit():
+                continue
+            path = os.path.join(self.directory, name)
+            if not _alive(int(pid)):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+                continue
+            try:
+                with open(path, encoding="utf-8") as f:
+                    data = json.load(f)
+            except (OSError, ValueError):
+                continue  # replaced or removed while we read it
+            yield int(pid), {metric: {tuple(key): value for key, value in series} for metric, series in data.items()}
+
+    def render(self):
+        metrics = self._metric_list()
+        merged = {metric.name: {} for metric in metrics}
+        for pid, snapshot in self._worker_snapshots():
+            extra = (str(pid),) if self.worker_label else ()
+            for metric in metrics:
+                for key, value in snapshot.get(metric.name, {}).items():
+                    metric.merge(merged[metric.name], key + extra, value)
+        lines = []
+        for metric in metrics:
+            labelnames = metric.labelnames + (("worker",) if self.worker_label else ())
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for suffix, key, labels, value in metric.samples(merged[metric.name]):
+                label_text = _format_labels(labelnames + tuple(name for name, _ in labels),
+                                            key + tuple(value for _, value in labels))
+                lines.append(f"{metric.name}{suffix}{label_text} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+def _alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+registry = MetricsRegistry(worker_label=Config.METRICS_WORKER_LABEL, directory=Config.METRICS_DIR,
+                           flush_seconds=Config.METRICS_FLUSH_SECONDS)
+
+REQUEST_SECONDS = registry.histogram(
+    "edugenie_http_request_duration_seconds", "Time to produce a response, by route template.",
+    ("method", "route", "status"))
+SPAN_SECONDS = registry.histogram(
+    "edugenie_span_duration_seconds", "Timed work inside requests: llm, mongo, pdf, http, bcrypt.",
+    ("kind", "name", "outcome"))
+LLM_SECONDS = registry.histogram(
+    "edugenie_llm_call_duration_seconds", "One attempt against one model (time to first chunk when streaming).",
+    ("route", "model", "outcome"))
+LLM_TOKENS = registry.counter(
+    "edugenie_llm_tokens", "Tokens reported by the provider.", ("route", "model", "direction"))
+LLM_RETRIES = registry.counter(
+    "edugenie_llm_retries", "Attempts retried after a transient error.", ("route", "model"))
+ERRORS = registry.counter(
+    "edugenie_errors", "Exceptions caught and reported by request handlers.", ("where", "type"))
+
+
+# ==== Per-request timings (Server-Timing) ====
+_timings = contextvars.ContextVar("server_timings", default=None)
+
+
+def begin_request():
+    """Starts collecting span times for the current request; returns a token for `end_request`."""
+    return _timings.set({})
+
+
+def end_request(token):
+    timings = _timings.get()
+    try:
+        _timings.reset(token)
+    except ValueError:
+        # Closed from another context (a server that finishes the body elsewhere);
+        # that context never saw the value.
+        pass
+    return timings or {}
+
+
+def add_timing(kind, seconds):
+    timings = _timings.get()
+    if timings is not None:
+        entry = timings.setdefault(kind, [0.0, 0])
+        entry[0] += seconds
+        entry[1] += 1
+
+
+def server_timing(timings, total=None):
+    """`Server-Timing` header value: one entry per span kind, summed over the request."""
+    parts = [f'{kind};dur={seconds * 1000:.1f};desc="{count}x"' for kind, (seconds, count) in sorted(timings.items())]
+    if total is not None:
+        parts.append(f"total;dur={total * 1000:.1f}")
+    return ", ".join(parts)
+
+
+# ==== Spans ====
+@contextmanager
+def span(kind, name=""):
+    """Times the block into SPAN_SECONDS and the request's Server-Timing."""
+    if not Config.METRICS_ENABLED:
+        yield
+        return
+    started = time.perf_counter()
+    outcome = "ok"
+    try:
+        yield
+    except BaseException:
+        outcome = "error"
+        raise
+    finally:
+        elapsed = time.perf_counter() - started
+        SPAN_SECONDS.observe(elapsed, kind=kind, name=name, outcome=outcome)
+        add_timing(kind, elapsed)
+
+
+def timed_iter(kind, name, iterable):
+    """
+    Yields from `iterable`, timing only the work done producing items (not
+    the consumer's), recorded as one span once the iterator is finished.
+    """
+    iterator = iter(iterable)
+    elapsed, outcome = 0.0, "ok"
+    try:
+        while True:
+            started = time.perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+            except BaseException:
+                outcome = "error"
+                raise
+            finally:
+                elapsed += time.perf_counter() - started
+            yield item
+    finally:
+        SPAN_SECONDS.observe(elapsed, kind=kind, name=name, outcome=outcome)
+        add_timing(kind, elapsed)
+
+
+def report_error(where, error):
+    """Counts an exception a handler caught (and turned into an error response) and logs it."""
+    ERRORS.inc(where=where, type=type(error).__name__)
+    logger.error("%s: %s: %s", where, type(error).__name__, error, exc_info=error)
+
+
+def record_llm_usage(route, model, message):
+    """Adds the token counts a chat reply or chunk reports to LLM_TOKENS."""
+    usage = getattr(message, "usage_metadata", None) or {}
+    if not usage:
+        token_usage = (getattr(message, "response_metadata", None) or {}).get("token_usage") or {}
+        usage = {"input_tokens": token_usage.get("prompt_tokens"), "output_tokens": token_usage.get("completion_tokens")}
+    for direction in ("input", "output"):
+        count = usage.get(f"{direction}_tokens")
+        if count:
+            LLM_TOKENS.inc(count, route=route, model=model, direction=direction)
+
+
+# ==== Request instrumentation ====
+def _finish_request(started, token, labels):
+    REQUEST_SECONDS.observe(time.perf_counter() - started, **labels)
+    end_request(token)
+
+
+def init_metrics(app):
+    """
+    Times every Flask request by route template and adds Server-Timing when
+    enabled. A streamed body (SSE, NDJSON) is sent after `after_request`, so
+    those requests are recorded when the server closes the response, i.e.
+    after the last byte, and spans inside the generator still count;
+    their Server-Timing header can only cover the time to headers.
+    """
+    from flask import g, request
+
+    @app.before_request
+    def start_request_timer():
+        registry.start_flusher()
+        g.metrics_started = time.perf_counter()
+        g.metrics_token = begin_request()
+
+    @app.after_request
+    def record_request(response):
+        started = g.pop("metrics_started", None)
+        token = g.pop("metrics_token", None)
+        if started is None:
+            return response
+        rule = request.url_rule.rule if request.url_rule is not None else "unmatched"
+        labels = {"method": request.method, "route": rule, "status": response.status_code}
+        if Config.METRICS_SERVER_TIMING:
+            response.headers["Server-Timing"] = server_timing(dict(_timings.get() or {}),
+                                                              time.perf_counter() - started)
+        if response.is_streamed:
+            response.call_on_close(lambda: _finish_request(started, token, labels))
+        else:
+            _finish_request(started, token, labels)
+        return response
+
+    @app.route("/metrics")
+    def metrics():
+        return app.response_class(registry.render(), mimetype=None, content_type=CONTENT_TYPE)
+
+
+class MetricsMiddleware:
+    """
+    ASGI counterpart of `init_metrics` for the native async routes. Requests
+    that fall through to the mounted Flask app are left to its own hooks.
+    Streaming responses are timed to their last byte.
+    """
+
+    def __init__(self, app, routes=()):
+        self.app = app
+        self.routes = list(routes)
+
+    def _route(self, scope):
+        from starlette.routing import Match
+        for route in self.routes:
+            if route.matches(scope)[0] == Match.FULL:
+                return route.path
+        return None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not Config.METRICS_ENABLED:
+            return await self.app(scope, receive, send)
+        route = self._route(scope)
+        if route is None:
+            return await self.app(scope, receive, send)
+        registry.start_flusher()
+
+        started = time.perf_counter()
+        token = begin_request()
+        status = [500]
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+                if Config.METRICS_SERVER_TIMING:
+                    timings = dict(_timings.get() or {})
+                    header = server_timing(timings, time.perf_counter() - started)
+                    message = dict(message, headers=list(message.get("headers", []))
+                                   + [(b"server-timing", header.encode("latin-1"))])
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            REQUEST_SECONDS.observe(time.perf_counter() - started, method=scope["method"], route=route,
+                                    status=status[0])
+            end_request(token)
@@ -0,0 +1,239 @@
+import hashlib
+import logging
+import os
+import re
+import threading
+from concurrent.futures import TimeoutError as RenderTimeout
+
+from fpdf import FPDF
+
+from app.utils.metrics import span
+from app.utils.summary_cache import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+# Bump when the layout changes so cached exports are rendered again.
+RENDERER_VERSION = "1"
+
+_MARKDOWN = re.compile(r"(\*\*|__|^#+\s*)", re.MULTILINE)
+
+
+def export_key(summary_text):
+    """Content hash of a summary as rendered; doubles as the export's ETag."""
+    raw = f"{RENDERER_VERSION}\x00{summary_text}"
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def _paragraphs(text):
+    """Blank-line separated blocks; lines inside a block are kept as line breaks."""
+    block = []
+    for line in _MARKDOWN.sub("", text).splitlines():
+        if line.strip():
+            block.append(line.rstrip())
+        elif block:
+            yield "\n".join(block)
+            block = []
+    if block:
+        yield "\n".join(block)
+
+
+class _LineWrapper:
+    """
+    Wraps paragraphs with word widths measured once and cached, then emits
+    one `cell` per line. fpdf2's multi_cell re-measures the line character
+    by character as it grows, which made a 20-page export take over a second.
+    """
+
+    def __init__(self, pdf):
+        self.pdf = pdf
+        self._widths = {}
+
+    def width(self, word):
+        key = (self.pdf.font_size_pt, word)
+        width = self._widths.get(key)
+        if width is None:
+            width = self._widths[key] = self.pdf.get_string_width(word)
+        return width
+
+    def write(self, paragraph, height):
+        pdf = self.pdf
+        space = self.width(" ")
+        for text_line in paragraph.split("\n"):
+            words, width = [], 0.0
+            for word in text_line.split(" "):
+                word_width = self.width(word)
+                if word_width > pdf.epw:
+                    # A URL or similar wider than the page: let fpdf2 break it.
+                    self._flush(words, height)
+                    pdf.multi_cell(0, height, word, new_x="LMARGIN", new_y="NEXT")
+                    words, width = [], 0.0
+                    continue
+                if words and width + space + word_width > pdf.epw:
+                    self._flush(words, height)
+                    words, width = [], 0.0
+                width += (space if words else 0) + word_width
+                words.append(word)
+            self._flush(words, height)
+
+    def _flush(self, words, height):
+        if words:
+            self.pdf.cell(0, height, " ".join(words), new_x="LMARGIN", new_y="NEXT")
+
+
+class MissingGlyphs(Exception):
+    """None of the export fonts can draw some characters of the summary."""
+
+
+def _covers(font, text):
+    cmap = getattr(font, "cmap", None)
+    return cmap is not None and all(ord(ch) in cmap for ch in set(text) if not ch.isspace())
+
+
+def render_summary_pdf(text, fonts=()):
+    """
+    Renders a summary to PDF bytes. `fonts` are TrueType paths: the first is
+    the body font and must exist, the rest are fallbacks for scripts it
+    lacks and are skipped when missing. Without any, the core font is used,
+    which only covers Latin-1. Raises MissingGlyphs rather than dropping
+    characters no font can draw.
+
+    Runs in a worker process for large summaries, so it only takes plain
+    arguments.
+    """
+    pdf = FPDF()
+    pdf.set_auto_page_break(auto=True, margin=15)
+    pdf.set_title("Summary")
+    if fonts and not os.path.exists(fonts[0]):
+        raise FileNotFoundError(f"PDF export body font {fonts[0]} not found")
+    fonts = [path for path in fonts if os.path.exists(path)]
+    if fonts:
+        for index, path in enumerate(fonts):
+            pdf.add_font(f"body{index}", fname=path)
+        covered = set().union(*(pdf.fonts[f"body{index}"].cmap for index in range(len(fonts))))
+        pdf.set_font("body0", size=12)
+        if len(fonts) > 1:
+            pdf.set_fallback_fonts([f"body{index}" for index in range(1, len(fonts))])
+        try:
+            pdf.set_text_shaping(True)  # needs uharfbuzz; required for e.g. Devanagari
+        except Exception:
+            pass
+    else:
+        covered = range(256)
+        pdf.set_font("Helvetica", size=12)
+    missing = sorted({ch for ch in text if not ch.isspace() and ord(ch) not in covered})
+    if missing:
+        raise MissingGlyphs(f"no export font covers {''.join(missing[:20])!r}; "
+                            f"add a TrueType font for this script to PDF_EXPORT_FONTS")
+
+    # Word widths come from the body font, so text that needs fallback
+    # glyphs or shaping is laid out by fpdf2 itself.
+    fast = not fonts or (_covers(pdf.current_font, text) and not pdf.text_shaping)
+    wrapper = _LineWrapper(pdf)
+
+    pdf.add_page()
+    for index, paragraph in enumerate(_paragraphs(text)):
+        size, height = (16, 9) if index == 0 else (12, 7)
+        pdf.set_font_size(size)
+        if fast:
+            wrapper.write(paragraph, height)
+        else:
+            pdf.multi_cell(0, height, paragraph, new_x="LMARGIN", new_y="NEXT")
+        pdf.ln(3)
+    return bytes(pdf.output())
+
+
+class PdfExportCache:
+    """
+    Rendered summary PDFs on disk, named by `export_key`, so they can be
+    served with send_file (ETag, Range, 304s) and shared by every worker on
+    the host. Concurrent requests for one summary render it once; summaries
+    longer than `inline_chars` are rendered on a process pool so the
+    request thread only waits on I/O. Only the `max_files` most recently
+    used are kept.
+    """
+
+    def __init__(self, directory, fonts=(), max_files=500, inline_chars=20000, pool=None, timeout=60):
+        self.directory = directory
+        self.fonts = list(fonts)
+        self.max_files = max_files
+        self.inline_chars = inline_chars
+        self.pool = pool
+        self.timeout = timeout
+        self.flights = SingleFlight()
+        self._prune_lock = threading.Lock()
+
+    def check_fonts(self):
+        """
+        Run once at start-up: raises when the body font is missing, so the
+        worker never reports ready, and logs fallback fonts that are missing.
+        """
+        if self.fonts and not os.path.exists(self.fonts[0]):
+            raise FileNotFoundError(f"PDF export body font {self.fonts[0]} not found (PDF_EXPORT_FONTS)")
+        for path in self.fonts[1:]:
+            if not os.path.exists(path):
+                logger.warning("font %s not found; summaries in scripts no other font covers will fail to export", path)
+
+    def path(self, key):
+        return os.path.join(self.directory, f"{key}.pdf")
+
+    def get_or_render(self, summary_text):
+        """Returns (key, path) of the rendered export."""
+        key = export_key(summary_text)
+        path = self.path(key)
+        if self.touch(key):
+            return key, path
+
+        flight, leader = self.flights.begin(key)
+        if not leader:
+            flight.wait()
+            return key, path
+        try:
+            with span("pdf", "render"):
+                data = self._render(summary_text)
+            self._write(path, data)
+        except Exception as e:
+            self.flights.end(key, error=e)
+            raise
+        self.flights.end(key, result=path)
+        self._prune()
+        return key, path
+
+    def touch(self, key):
+        """Marks a cached export as just used (pruning goes by mtime); False when it is not on disk."""
+        try:
+            os.utime(self.path(key))
+        except OSError:
+            return False
+        return True
+
+    def _render(self, text):
+        if self.pool is None or len(text) <= self.inline_chars:
+            return render_summary_pdf(text, self.fonts)
+        future = self.pool().submit(render_summary_pdf, text, self.fonts)
+        try:
+            return future.result(timeout=self.timeout)
+        except RenderTimeout:
+            future.cancel()
+            raise
+
+    def _write(self, path, data):
+        os.makedirs(self.directory, exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)  # readers never see a half-written file
+
+    def _prune(self):
+        with self._prune_lock:
+            try:
+                entries = [e for e in os.scandir(self.directory) if e.name.endswith(".pdf")]
+            except OSError:
+                return
+            if len(entries) <= self.max_files:
+                return
+            entries.sort(key=lambda e: e.stat().st_mtime)
+            for entry in entries[:len(entries) - self.max_files]:
+                try:
+                    os.remove(entry.path)
+                except OSError:
+                    pass
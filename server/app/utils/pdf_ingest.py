@@ -0,0 +1,173 @@
+import hashlib
+import io
+import multiprocessing
+import os
+import tempfile
+import threading
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import pdfplumber
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+
+COPY_BUFFER_SIZE = 1024 * 1024
+
+
+class SpooledPdf:
+    """
+    An uploaded PDF held in memory while small and in a temp file once it
+    grows past `threshold` bytes. The SHA-256 of the bytes is computed while
+    copying, so callers can key caches on it without a second read.
+    Use as a context manager; the temp file is removed on exit.
+    """
+
+    def __init__(self, stream, threshold):
+        self.path = None
+        self.size = 0
+        digest = hashlib.sha256()
+        buffer = io.BytesIO()
+
+        for block in iter(lambda: stream.read(COPY_BUFFER_SIZE), b""):
+            digest.update(block)
+            self.size += len(block)
+            if self.path is None and self.size > threshold:
+                spill = tempfile.NamedTemporaryFile(prefix="upload-", suffix=".pdf", delete=False)
+                spill.write(buffer.getvalue())
+                buffer = spill
+                self.path = spill.name
+            buffer.write(block)
+
+        self.sha256 = digest.hexdigest()
+        if self.path:
+            buffer.close()
+            buffer = None
+        self._buffer = buffer
+
+    @classmethod
+    def from_path(cls, path, sha256):
+        """Wraps a PDF that is already on disk, e.g. the upload of a queued job."""
+        spooled = cls.__new__(cls)
+        spooled.path = path
+        spooled.size = os.path.getsize(path)
+        spooled.sha256 = sha256
+        spooled._buffer = None
+        return spooled
+
+    def open(self):
+        """Returns something pdfplumber.open() accepts."""
+        if self.path:
+            return self.path
+        self._buffer.seek(0)
+        return self._buffer
+
+    def close(self):
+        if self.path and os.path.exists(self.path):
+            os.remove(self.path)
+        self._buffer = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _page_text(page):
+    text = page.extract_text() or ""
+    # Release the parsed layout objects; pdfplumber keeps them per page otherwise.
+    if hasattr(page, "close"):
+        page.close()
+    else:
+        page.flush_cache()
+    return text
+
+
+def extract_page_range(source, start, stop):
+    """Extracts pages [start, stop) as a list of strings. Runs in worker processes."""
+    with pdfplumber.open(source) as pdf:
+        return [_page_text(page) for page in pdf.pages[start:stop]]
+
+
+def count_pages(source):
+    with pdfplumber.open(source) as pdf:
+        return len(pdf.pages)
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool(workers):
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # spawn: forking a threaded gunicorn worker is not safe.
+            _pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+        return _pool
+
+
+def iter_pages(spooled, parallel_min_pages=40, workers=2, pages_per_task=10):
+    """
+    Yields page texts in order.
+    Large files that were spooled to disk are extracted in page ranges on a
+    process pool, with at most two ranges per worker in flight.
+    """
+    source = spooled.open()
+    if not spooled.path:
+        with pdfplumber.open(source) as pdf:
+            for page in pdf.pages:
+                yield _page_text(page)
+        return
+
+    page_count = count_pages(source)
+    if page_count < parallel_min_pages or workers < 2:
+        with pdfplumber.open(source) as pdf:
+            for page in pdf.pages:
+                yield _page_text(page)
+        return
+
+    pool = get_pool(workers)
+    ranges = iter(range(0, page_count, pages_per_task))
+    max_buffered = workers * 2
+    pending = {}
+    results = {}
+    next_range = 0
+
+    def fill():
+        # Finished-but-unyielded ranges count too, so a slow first range
+        # cannot make the others pile up in memory.
+        while len(pending) + len(results) < max_buffered:
+            start = next(ranges, None)
+            if start is None:
+                return
+            stop = min(start + pages_per_task, page_count)
+            pending[pool.submit(extract_page_range, spooled.path, start, stop)] = start
+
+    fill()
+    while pending:
+        done, _ = wait(list(pending), return_when=FIRST_COMPLETED)
+        for future in done:
+            results[pending.pop(future)] = future.result()
+        while next_range in results:
+            yield from results.pop(next_range)
+            next_range += pages_per_task
+        fill()
+
+
+def iter_chunks(pages, chunk_size=2000, chunk_overlap=100):
+    """
+    Splits a stream of page texts into chunks without joining the whole
+    document. Only a window of a few chunks is ever buffered: every split
+    keeps its last (possibly partial) chunk as the start of the next window.
+    """
+    splitter = RecursiveCharacterTextSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+    window = chunk_size * 4
+    buffer = ""
+    for text in pages:
+        buffer += text + "\n"
+        if len(buffer) < window:
+            continue
+        parts = splitter.split_text(buffer)
+        yield from parts[:-1]
+        buffer = parts[-1] if parts else ""
+    if buffer.strip():
+        yield from splitter.split_text(buffer)
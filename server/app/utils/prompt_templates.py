@@ -19,3 +19,13 @@ the correct answer indexing should be 0 based
   ]
 }}Please return the quiz in VALID JSON format, with all field names and strings enclosed in double quotes."""
 )
+
+quiz_repair_prompt = PromptTemplate.from_template(
+    """You are an expert quiz generator.
+Generate {num_questions} new multiple choice questions on the topic: "{topic}"
+for a student at the {level} level. Each question must have exactly {num_options} options
+and a 0-based "correctAnswer" index. Do not repeat any of these questions:
+{avoid}
+Return only VALID JSON, with all field names and strings enclosed in double quotes:
+{{"quiz": [{{"id": 1, "question": "...", "options": ["...", "...", "...", "..."], "correctAnswer": 0, "explanation": "..."}}]}}"""
+)
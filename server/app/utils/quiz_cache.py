@@ -0,0 +1,163 @@
+import hashlib
+import logging
+import random
+import re
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_topic(topic):
+    """Lower-cases the topic and collapses runs of whitespace."""
+    return re.sub(r"\s+", " ", str(topic)).strip().lower()
+
+
+def quiz_cache_key(topic, level, num_questions):
+    """
+    Content-addressed key for a quiz request.
+    Two requests that only differ in case/whitespace map to the same key.
+    """
+    raw = f"{normalize_topic(topic)}|{normalize_topic(level)}|{int(num_questions)}"
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class QuizCache:
+    """
+    Two-tier cache for generated quizzes.
+
+    Every key holds a pool of up to `variants` different quizzes. Until the
+    pool is full a lookup is reported as a miss so the caller generates a new
+    variant; once it is full a random variant is served.
+
+    The in-process tier is an LRU bounded by `max_entries`. The optional
+    shared tier lives in the `quiz_cache` collection so every gunicorn worker
+    sees the same pools; MongoDB expires it through a TTL index.
+    """
+
+    def __init__(self, ttl, max_entries, variants, collection=None):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.variants = max(1, variants)
+        self.collection = collection
+        self._local = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "local_hits": 0, "shared_hits": 0}
+
+    # ==== Lookup ====
+    def get(self, topic, level, num_questions):
+        key = quiz_cache_key(topic, level, num_questions)
+
+        pool = self._get_local(key)
+        source = "local_hits"
+        if pool is None or len(pool) < self.variants:
+            shared = self._get_shared(key)
+            if shared and len(shared) > len(pool or []):
+                pool = shared
+                source = "shared_hits"
+                self._put_local(key, pool)
+
+        if pool and len(pool) >= self.variants:
+            self._count("hits", source)
+            return random.choice(pool)
+
+        self._count("misses")
+        return None
+
+    def put(self, topic, level, num_questions, quiz):
+        key = quiz_cache_key(topic, level, num_questions)
+
+        with self._lock:
+            entry = self._local.get(key)
+            pool = list(entry[1]) if entry and entry[0] > time.time() else []
+        pool = (pool + [quiz])[-self.variants:]
+        self._put_local(key, pool)
+
+        if self.collection is None:
+            return
+        try:
+            self.collection.update_one(
+                {"_id": key},
+                {
+                    "$push": {"variants": {"$each": [quiz], "$slice": -self.variants}},
+                    "$set": {
+                        "topic": normalize_topic(topic),
+                        "level": normalize_topic(level),
+                        "num_questions": int(num_questions),
+                        "expires_at": datetime.utcnow() + timedelta(seconds=self.ttl),
+                    },
+                },
+                upsert=True,
+            )
+        except Exception as e:
+            logger.warning("shared write failed: %s", e)
+
+    def get_stats(self):
+        with self._lock:
+            stats = dict(self.stats)
+            stats["local_entries"] = len(self._local)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = round(stats["hits"] / lookups, 4) if lookups else 0
+        return stats
+
+    def clear(self):
+        with self._lock:
+            self._local.clear()
+
+    # ==== In-process tier ====
+    def _get_local(self, key):
+        with self._lock:
+            entry = self._local.get(key)
+            if entry is None:
+                return None
+            expires_at, pool = entry
+            if expires_at <= time.time():
+                del self._local[key]
+                return None
+            self._local.move_to_end(key)
+            return pool
+
+    def _put_local(self, key, pool):
+        with self._lock:
+            self._local[key] = (time.time() + self.ttl, pool)
+            self._local.move_to_end(key)
+            while len(self._local) > self.max_entries:
+                self._local.popitem(last=False)
+
+    # ==== Shared tier ====
+    def _get_shared(self, key):
+        if self.collection is None:
+            return None
+        try:
+            doc = self.collection.find_one(
+                {"_id": key, "expires_at": {"$gt": datetime.utcnow()}},
+                {"variants": 1},
+            )
+        except Exception as e:
+            logger.warning("shared lookup failed: %s", e)
+            return None
+        return doc.get("variants") if doc else None
+
+    def _count(self, *names):
+        with self._lock:
+            for name in names:
+                self.stats[name] += 1
+
+
+def _shared_collection():
+    if not Config.QUIZ_CACHE_SHARED:
+        return None
+    from app.models.db import collection
+    return collection("quiz_cache")
+
+
+quiz_cache = QuizCache(
+    ttl=Config.QUIZ_CACHE_TTL,
+    max_entries=Config.QUIZ_CACHE_MAX_ENTRIES,
+    variants=Config.QUIZ_CACHE_VARIANTS,
+    collection=_shared_collection(),
+)
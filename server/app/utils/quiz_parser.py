@@ -0,0 +1,233 @@
+import json
+import re
+
+from config import Config
+
+FENCE_START = re.compile(r"```(?:json)?\s*", re.IGNORECASE)
+
+
+# ==== JSON extraction ====
+def extract_json(content):
+    """
+    Returns the first balanced `{...}` in `content`, found in one pass that
+    skips braces inside strings. Starts inside a ```json fence when there is
+    one. A reply cut off mid-object yields everything from its `{` onwards.
+    """
+    if not content:
+        return None
+    fence = FENCE_START.search(content)
+    start = content.find("{", fence.end() if fence else 0)
+    if start < 0 and fence:
+        start = content.find("{")
+    if start < 0:
+        return None
+
+    depth = 0
+    quote = None
+    escape = False
+    for i in range(start, len(content)):
+        ch = content[i]
+        if quote:
+            if escape:
+                escape = False
+            elif ch == "\\":
+                escape = True
+            elif ch == quote:
+                quote = None
+        elif ch in "\"'":
+            quote = ch
+        elif ch == "{":
+            depth += 1
+        elif ch == "}":
+            depth -= 1
+            if depth == 0:
+                return content[start:i + 1]
+    return content[start:]
+
+
+def repair_json(text):
+    """
+    Single-pass cleanup of the mistakes models make in JSON: single-quoted
+    strings become double-quoted, and trailing commas before `}`/`]` are
+    dropped. Commas and quotes inside strings are left alone.
+    """
+    out = []
+    i, n = 0, len(text)
+    while i < n:
+        ch = text[i]
+        if ch in "\"'":
+            j = i + 1
+            buf = []
+            while j < n and text[j] != ch:
+                c = text[j]
+                if c == "\\" and j + 1 < n:
+                    # \' is not a JSON escape; keep every other escape as written.
+                    buf.append("'" if text[j + 1] == "'" else text[j:j + 2])
+                    j += 2
+                    continue
+                buf.append('\\"' if c == '"' else c)
+                j += 1
+            out.append('"' + "".join(buf) + '"')
+            i = j + 1
+        elif ch == ",":
+            j = i + 1
+            while j < n and text[j].isspace():
+                j += 1
+            if j < n and text[j] in "}]":
+                i = j
+                continue
+            out.append(ch)
+            i += 1
+        else:
+            out.append(ch)
+            i += 1
+    return "".join(out)
+
+
+def loads_lenient(text):
+    """json.loads, retried once on the repaired text (raw newlines in strings allowed)."""
+    try:
+        return json.loads(text)
+    except json.JSONDecodeError:
+        return json.loads(repair_json(text), strict=False)
+
+
+# ==== Incremental parsing ====
+class QuizStreamParser:
+    """
+    Incremental parser for the `{"quiz": [ {...}, {...} ]}` document the LLM
+    streams back. `feed()` returns every question object that was completed by
+    the new text, so callers can forward questions before generation ends.
+    """
+
+    def __init__(self):
+        self._buf = ""
+        self._pos = 0
+        self._in_array = False
+        self._done = False
+        self._depth = 0
+        self._start = None
+        self._in_string = False
+        self._escape = False
+
+    def feed(self, text):
+        self._buf += text
+        questions = []
+        while self._pos < len(self._buf) and not self._done:
+            ch = self._buf[self._pos]
+            if not self._in_array:
+                if ch == "[":
+                    self._in_array = True
+            elif self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+            elif ch == '"':
+                self._in_string = True
+            elif ch == "{":
+                if self._depth == 0:
+                    self._start = self._pos
+                self._depth += 1
+            elif ch == "}" and self._depth:
+                self._depth -= 1
+                if self._depth == 0:
+                    question = self._parse(self._buf[self._start:self._pos + 1])
+                    if question is not None:
+                        questions.append(question)
+                    self._start = None
+            elif ch == "]" and self._depth == 0:
+                self._done = True
+            self._pos += 1
+
+        self._compact()
+        return questions
+
+    def _parse(self, text):
+        try:
+            question = loads_lenient(text)
+        except json.JSONDecodeError:
+            return None
+        return question if isinstance(question, dict) else None
+
+    def _compact(self):
+        # Drop text that can no longer be part of a pending question.
+        keep_from = self._start if self._start is not None else self._pos
+        if keep_from:
+            self._buf = self._buf[keep_from:]
+            self._pos -= keep_from
+            if self._start is not None:
+                self._start = 0
+
+
+# ==== Schema ====
+def validate_question(question):
+    """Returns (question, error); the question is normalised when valid."""
+    if not isinstance(question, dict):
+        return None, "question is not an object"
+    text = question.get("question")
+    if not isinstance(text, str) or not text.strip():
+        return None, "question text is missing"
+
+    options = question.get("options")
+    if not isinstance(options, list) or len(options) != Config.QUIZ_OPTION_COUNT:
+        return None, f"expected {Config.QUIZ_OPTION_COUNT} options"
+    if not all(isinstance(option, (str, int, float)) and str(option).strip() for option in options):
+        return None, "options must be non-empty strings"
+    options = [str(option).strip() for option in options]
+    if len(set(options)) != len(options):
+        return None, "options must be distinct"
+
+    answer = question.get("correctAnswer")
+    if isinstance(answer, str):
+        stripped = answer.strip()
+        # Models sometimes answer with "2" or with the option text itself.
+        answer = int(stripped) if stripped.isdigit() else (options.index(stripped) if stripped in options else None)
+    if isinstance(answer, bool) or not isinstance(answer, int) or not 0 <= answer < len(options):
+        return None, "correctAnswer is not a valid option index"
+
+    explanation = question.get("explanation")
+    return {
+        "id": question.get("id"),
+        "question": text.strip(),
+        "options": options,
+        "correctAnswer": answer,
+        "explanation": explanation.strip() if isinstance(explanation, str) else "",
+    }, None
+
+
+def _quiz_items(content):
+    """Question objects in the reply, or None when no quiz could be read at all."""
+    json_str = extract_json(content)
+    if json_str is not None:
+        try:
+            data = loads_lenient(json_str)
+        except json.JSONDecodeError:
+            data = None
+        if isinstance(data, dict) and isinstance(data.get("quiz"), list):
+            return data["quiz"]
+
+    # The document as a whole is broken: salvage the questions that do parse.
+    items = QuizStreamParser().feed(content or "")
+    return items or None
+
+
+def parse_quiz(content, num_questions):
+    """
+    Returns `num_questions` slots: a validated question, or None where the
+    reply's question was broken or missing. Returns None when the reply holds
+    no quiz at all.
+    """
+    items = _quiz_items(content)
+    if items is None:
+        return None
+    slots = [validate_question(item)[0] for item in items[:num_questions]]
+    return slots + [None] * (num_questions - len(slots))
+
+
+def number_questions(questions):
+    for i, question in enumerate(questions, start=1):
+        question["id"] = i
+    return questions
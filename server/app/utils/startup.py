@@ -0,0 +1,148 @@
+import importlib
+import logging
+import os
+import sys
+import threading
+import time
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+# Handler modules behind the blueprints. Between them they pull in
+# LangChain, pdfplumber, fpdf, trafilatura and numpy, so in lazy mode
+# `import main` leaves them to the first request or the warm-up thread.
+ROUTE_MODULES = ("app.routes.quiz", "app.routes.explain", "app.routes.summarize")
+
+_import_lock = threading.RLock()
+_import_seconds = {}  # module -> seconds its import took in this process
+
+
+# ==== Lazy imports ====
+def load(name):
+    """
+    Imports `name` once per process. Request threads and the warm-up thread
+    import one module graph at a time, so two threads never initialize
+    LangChain concurrently.
+    """
+    if name not in _import_seconds:
+        with _import_lock:
+            if name not in _import_seconds:
+                started = time.perf_counter()
+                importlib.import_module(name)
+                _import_seconds[name] = time.perf_counter() - started
+    return sys.modules[name]
+
+
+def lazy(import_name):
+    """A view for "module:function" that imports the module on its first call."""
+    module_name, _, attr = import_name.partition(":")
+    target = []
+
+    def view(*args, **kwargs):
+        if not target:
+            target.append(getattr(load(module_name), attr))
+        return target[0](*args, **kwargs)
+
+    view.__name__ = view.__qualname__ = attr
+    return view
+
+
+def lazy_endpoint(import_name):
+    """Starlette counterpart of `lazy`; the first import runs on the threadpool, not the event loop."""
+    module_name, _, attr = import_name.partition(":")
+
+    async def endpoint(request):
+        if module_name not in _import_seconds:
+            from starlette.concurrency import run_in_threadpool
+            await run_in_threadpool(load, module_name)
+        return await getattr(sys.modules[module_name], attr)(request)
+
+    endpoint.__name__ = endpoint.__qualname__ = attr
+    return endpoint
+
+
+def import_route_modules(modules=ROUTE_MODULES):
+    for name in modules:
+        load(name)
+
+
+# ==== Warm-up ====
+_state = {"pid": None, "started": None, "finished": None, "error": None}
+_state_lock = threading.Lock()
+
+
+def start_warm_up(modules=ROUTE_MODULES):
+    """
+    Finishes start-up in a background thread, once per process: imports
+    `modules`, creates the Mongo indexes and resumes summary jobs a restart
+    interrupted. Runs in the worker (first request, ASGI lifespan), never
+    at import time, so nothing it starts is inherited across a fork.
+    """
+    with _state_lock:
+        if _state["pid"] == os.getpid():
+            return
+        _state.update(pid=os.getpid(), started=time.time(), finished=None, error=None)
+    threading.Thread(target=_warm_up, args=(tuple(modules),), name="warm-up", daemon=True).start()
+
+
+def _warm_up(modules):
+    try:
+        import_route_modules(modules)
+        _ensure_indexes()
+        summarize = load("app.routes.summarize")
+        summarize.planner.counter.exact  # loads SUMMARY_TOKENIZER, if set, outside any request
+        summarize.job_queue.recover()
+        topic_resolver = load("app.services.topic_index").topic_resolver
+        if topic_resolver is not None:
+            topic_resolver.index  # loads the embedding model and opens the index outside any request
+        summarize.pdf_exports.check_fonts()  # last: a missing body font fails readiness, not the steps above
+    except Exception as e:
+        _state["error"] = f"{type(e).__name__}: {e}"
+        logger.exception("warm-up failed: %s", _state["error"])
+    finally:
+        _state["finished"] = time.time()
+
+
+def _ensure_indexes():
+    from app.models.db import ensure_indexes, mongo_enabled
+    if mongo_enabled() and Config.MONGO_ENSURE_INDEXES:
+        try:
+            ensure_indexes()
+        except Exception as e:
+            logger.warning("index bootstrap skipped: %s", e)
+
+
+# ==== Health ====
+def readiness():
+    """
+    (ready, report). Ready once this process has finished its warm-up
+    without errors and, with READINESS_CHECK_MONGO, MongoDB answers a ping.
+    Liveness needs none of this: a worker that is still warming up is alive.
+    """
+    checks = {}
+    if _state["pid"] != os.getpid():
+        checks["warm_up"] = "not started"
+    elif _state["finished"] is None:
+        checks["warm_up"] = "running"
+    else:
+        checks["warm_up"] = _state["error"] or "ok"
+
+    from app.models.db import get_db, mongo_enabled
+    if Config.READINESS_CHECK_MONGO and mongo_enabled():
+        try:
+            get_db().command("ping")
+            checks["mongo"] = "ok"
+        except Exception as e:
+            checks["mongo"] = str(e)
+
+    ready = all(value == "ok" for value in checks.values())
+    report = {
+        "status": "ready" if ready else "starting" if checks["warm_up"] in ("not started", "running") else "unavailable",
+        "startup_mode": Config.STARTUP_MODE,
+        "checks": checks,
+        "imports_ms": {name: round(seconds * 1000, 1) for name, seconds in _import_seconds.items()},
+    }
+    if _state["pid"] == os.getpid() and _state["finished"] is not None:
+        report["warm_up_seconds"] = round(_state["finished"] - _state["started"], 3)
+    return ready, report
@@ -0,0 +1,72 @@
+import json
+
+from flask import Response, request, stream_with_context
+
+from app.utils.metrics import report_error
+
+STREAM_FORMATS = {
+    "sse": "text/event-stream",
+    "ndjson": "application/x-ndjson",
+}
+
+
+def get_stream_format():
+    """
+    Returns "sse", "ndjson" or None when the client did not opt in.
+    The flag may come as `?stream=`, a form field (PDF uploads) or a JSON key;
+    `true` means SSE.
+    """
+    value = request.args.get("stream") or request.form.get("stream")
+    if value is None:
+        body = request.get_json(silent=True) or {}
+        value = body.get("stream")
+    return parse_stream_format(value)
+
+
+def parse_stream_format(value):
+    if value is None or value is False:
+        return None
+    value = str(value).lower()
+    if value in ("true", "1", "yes"):
+        return "sse"
+    return value if value in STREAM_FORMATS else None
+
+
+def format_event(event, fmt):
+    payload = json.dumps(event, default=str)
+    if fmt == "sse":
+        return f"event: {event.get('type', 'message')}\ndata: {payload}\n\n"
+    return payload + "\n"
+
+
+def stream_events(events, fmt):
+    """
+    Wraps a generator of event dicts in a streaming response.
+    Errors raised while generating are sent as a final `error` event because
+    the status line has already gone out.
+    """
+    def generate():
+        try:
+            for event in events:
+                yield format_event(event, fmt)
+        except Exception as e:
+            report_error("stream", e)
+            yield format_event({"type": "error", "error": str(e)}, fmt)
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype=STREAM_FORMATS[fmt],
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+def stream_tokens(chunks):
+    """Turns LangChain message chunks into `token` events, returning the full text."""
+    parts = []
+    for chunk in chunks:
+        text = getattr(chunk, "content", chunk)
+        if not text:
+            continue
+        parts.append(text)
+        yield {"type": "token", "content": text}
+    return "".join(parts)
@@ -0,0 +1,290 @@
+import asyncio
+import hashlib
+import logging
+import re
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from pymongo.errors import DuplicateKeyError
+
+logger = logging.getLogger(__name__)
+
+_YOUTUBE_ID = re.compile(
+    r"(?:youtube(?:-nocookie)?\.com/(?:watch\?(?:.*&)?v=|embed/|shorts/|live/|v/)|youtu\.be/)"
+    r"([A-Za-z0-9_-]{11})"
+)
+
+# Query parameters that only track where a click came from.
+_TRACKING_PARAMS = ("utm_", "fbclid", "gclid", "mc_cid", "mc_eid", "ref_src")
+
+
+def youtube_video_id(url):
+    """Extracts the 11-character video ID from any common YouTube URL form."""
+    match = _YOUTUBE_ID.search(url)
+    return match.group(1) if match else None
+
+
+def normalize_url(url):
+    """Lower-cases scheme/host, drops fragments, default ports and tracking params, sorts the query."""
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower() or "http"
+    host = (parts.hostname or "").lower()
+    if parts.port and parts.port not in (80, 443):
+        host = f"{host}:{parts.port}"
+    query = sorted(
+        (k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+        if not k.lower().startswith(_TRACKING_PARAMS)
+    )
+    path = parts.path.rstrip("/") or "/"
+    return urlunsplit((scheme, host, path, urlencode(query), ""))
+
+
+def url_source(url):
+    video_id = youtube_video_id(url)
+    if video_id:
+        return f"youtube:{video_id}"
+    return f"url:{normalize_url(url)}"
+
+
+def pdf_source(sha256):
+    return f"pdf:{sha256}"
+
+
+class _Flight:
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+    def wait(self):
+        self.event.wait()
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+
+class SingleFlight:
+    """
+    Collapses concurrent calls for the same key inside one process:
+    the first caller becomes the leader, the others block until it finishes
+    and share its result (or its exception).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._flights = {}
+
+    def begin(self, key):
+        with self._lock:
+            flight = self._flights.get(key)
+            if flight is not None:
+                return flight, False
+            flight = self._flights[key] = _Flight()
+            return flight, True
+
+    def end(self, key, result=None, error=None):
+        with self._lock:
+            flight = self._flights.pop(key)
+        flight.result = result
+        flight.error = error
+        flight.event.set()
+
+
+class AsyncSingleFlight:
+    """SingleFlight for coroutines on one event loop: followers await the leader's future."""
+
+    def __init__(self):
+        self._flights = {}
+
+    def begin(self, key):
+        future = self._flights.get(key)
+        if future is not None:
+            return future, False
+        future = self._flights[key] = asyncio.get_running_loop().create_future()
+        # Mark a failure as retrieved even when nobody was waiting for it.
+        future.add_done_callback(lambda f: f.cancelled() or f.exception())
+        return future, True
+
+    def end(self, key, result=None, error=None):
+        future = self._flights.pop(key)
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+
+
+class SummaryCache:
+    """
+    Finished summaries keyed by canonical source, language and prompt
+    version. An in-process LRU sits in front of the `summaries` collection.
+
+    `get_or_compute` de-duplicates work twice: SingleFlight inside the
+    worker, and a lease document in MongoDB across workers, so a burst of
+    requests for one lecture runs a single LLM job. The leader renews the
+    lease while it computes, so a long map-reduce keeps it.
+    """
+
+    POLL_INTERVAL = 0.5
+
+    def __init__(self, prompt_version, collection=None, max_entries=256, lease_seconds=300):
+        self.prompt_version = prompt_version
+        self.collection = collection
+        self.max_entries = max_entries
+        self.lease_seconds = lease_seconds
+        self.flights = SingleFlight()
+        self.async_flights = AsyncSingleFlight()
+        self._local = OrderedDict()
+        self._lock = threading.Lock()
+
+    def key(self, source, language):
+        raw = f"{self.prompt_version}|{source}|{str(language).strip().lower()}"
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def get(self, key):
+        with self._lock:
+            if key in self._local:
+                self._local.move_to_end(key)
+                return self._local[key]
+        doc = self._find(key)
+        if doc and doc.get("status") == "done":
+            self._put_local(key, doc["summary"])
+            return doc["summary"]
+        return None
+
+    def put(self, key, source, language, summary):
+        self._put_local(key, summary)
+        if self.collection is None:
+            return
+        try:
+            self.collection.update_one(
+                {"_id": key},
+                {
+                    "$set": {
+                        "source": source,
+                        "language": language,
+                        "prompt_version": self.prompt_version,
+                        "summary": summary,
+                        "status": "done",
+                        "updated_at": datetime.utcnow(),
+                    },
+                    "$unset": {"lease_expires": ""},
+                    "$setOnInsert": {"created_at": datetime.utcnow()},
+                },
+                upsert=True,
+            )
+        except Exception as e:
+            logger.warning("write failed: %s", e)
+
+    def get_or_compute(self, source, language, compute):
+        """Returns (summary_id, summary, cached)."""
+        key = self.key(source, language)
+        summary = self.get(key)
+        if summary is not None:
+            return key, summary, True
+
+        flight, leader = self.flights.begin(key)
+        if not leader:
+            return key, flight.wait(), True
+
+        try:
+            summary = self.acquire_lease(key)
+            cached = summary is not None
+            if not cached:
+                with self.holding_lease(key):
+                    summary = compute()
+                self.put(key, source, language, summary)
+        except Exception as e:
+            self.release_lease(key)
+            self.flights.end(key, error=e)
+            raise
+        self.flights.end(key, result=summary)
+        return key, summary, cached
+
+    # ==== Cross-worker lease ====
+    def acquire_lease(self, key):
+        """
+        Takes the lease for `key`, or waits for the worker holding it.
+        Returns that worker's summary, or None once we own the lease.
+        """
+        if self.collection is None:
+            return None
+        try:
+            return self._poll_lease(key)
+        except Exception as e:
+            # Without MongoDB we can still serve the request, just not de-duplicate it.
+            logger.warning("lease failed: %s", e)
+            return None
+
+    def _poll_lease(self, key):
+        while True:
+            now = datetime.utcnow()
+            lease = {"status": "pending", "lease_expires": now + timedelta(seconds=self.lease_seconds)}
+            try:
+                self.collection.insert_one({"_id": key, **lease})
+                return None
+            except DuplicateKeyError:
+                pass
+            # Take over a lease whose holder died without releasing it.
+            taken = self.collection.update_one(
+                {"_id": key, "status": "pending", "lease_expires": {"$lt": now}},
+                {"$set": lease},
+            )
+            if taken.modified_count:
+                return None
+            doc = self._find(key)
+            if doc and doc.get("status") == "done":
+                self._put_local(key, doc["summary"])
+                return doc["summary"]
+            time.sleep(self.POLL_INTERVAL)
+
+    @contextmanager
+    def holding_lease(self, key):
+        """Extends the lease on `key` every third of its length until the block exits."""
+        if self.collection is None:
+            yield
+            return
+        stop = threading.Event()
+        renewer = threading.Thread(target=self._renew_lease, args=(key, stop), name="summary-lease", daemon=True)
+        renewer.start()
+        try:
+            yield
+        finally:
+            stop.set()
+
+    def _renew_lease(self, key, stop):
+        while not stop.wait(self.lease_seconds / 3):
+            try:
+                self.collection.update_one(
+                    {"_id": key, "status": "pending"},
+                    {"$set": {"lease_expires": datetime.utcnow() + timedelta(seconds=self.lease_seconds)}},
+                )
+            except Exception as e:
+                logger.warning("lease renewal failed: %s", e)
+
+    def release_lease(self, key):
+        if self.collection is None:
+            return
+        try:
+            self.collection.delete_one({"_id": key, "status": "pending"})
+        except Exception as e:
+            logger.warning("lease release failed: %s", e)
+
+    def _find(self, key):
+        if self.collection is None:
+            return None
+        try:
+            return self.collection.find_one({"_id": key})
+        except Exception as e:
+            logger.warning("lookup failed: %s", e)
+            return None
+
+    def _put_local(self, key, summary):
+        with self._lock:
+            self._local[key] = summary
+            self._local.move_to_end(key)
+            while len(self._local) > self.max_entries:
+                self._local.popitem(last=False)
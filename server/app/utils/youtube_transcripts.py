@@ -0,0 +1,312 @@
+import logging
+import threading
+import time
+import zlib
+from collections import OrderedDict, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from pymongo.errors import PyMongoError
+
+from app.utils.metrics import span
+from app.utils.summary_cache import SingleFlight
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+OEMBED_URL = "https://www.youtube.com/oembed"
+
+# One way of getting a transcript: the language it ends up in, the track it
+# comes from, and a callable doing the (network) fetch.
+Candidate = namedtuple("Candidate", "language source_language fetch")
+
+
+class TranscriptUnavailable(Exception):
+    """The video has no transcript we can use (disabled, none in any language, or the video is gone)."""
+
+
+# ==== Sources ====
+class YouTubeTranscriptSource:
+    """Transcripts through youtube-transcript-api; title and channel through YouTube's oEmbed endpoint."""
+
+    def candidates(self, video_id, languages, translate_to):
+        """
+        Every usable track in order of preference: manually created before
+        generated within each preferred language, then any other track.
+        Tracks in another language are translated to `translate_to` when
+        YouTube can translate them. Costs one request (the watch page).
+        """
+        from youtube_transcript_api import (
+            NoTranscriptAvailable, NoTranscriptFound, TranscriptsDisabled, VideoUnavailable, YouTubeTranscriptApi,
+        )
+        try:
+            listing = YouTubeTranscriptApi.list_transcripts(video_id)
+        except (TranscriptsDisabled, NoTranscriptAvailable, NoTranscriptFound, VideoUnavailable) as e:
+            raise TranscriptUnavailable(str(e).strip().splitlines()[0]) from e
+
+        tracks = list(listing)
+        ranked = [t for code in languages for generated in (False, True)
+                  for t in tracks if t.language_code == code and t.is_generated == generated]
+        ranked += [t for t in tracks if t not in ranked]
+        candidates = []
+        for track in ranked:
+            if track.language_code != translate_to and translate_to in {
+                lang["language_code"] for lang in track.translation_languages
+            }:
+                candidates.append(Candidate(translate_to, track.language_code,
+                                            lambda t=track: _join(t.translate(translate_to).fetch())))
+            else:
+                candidates.append(Candidate(track.language_code, track.language_code, lambda t=track: _join(t.fetch())))
+        if not candidates:
+            raise TranscriptUnavailable(f"no transcripts for video {video_id}")
+        return candidates
+
+    def metadata(self, video_id):
+        from app.utils.http_fetch import get_session
+        response = get_session().get(
+            OEMBED_URL,
+            params={"url": f"https://www.youtube.com/watch?v={video_id}", "format": "json"},
+            timeout=(Config.FETCH_CONNECT_TIMEOUT, Config.FETCH_READ_TIMEOUT),
+        )
+        response.raise_for_status()
+        info = response.json()
+        return {"source": video_id, "title": info.get("title"), "author": info.get("author_name"),
+                "thumbnail_url": info.get("thumbnail_url")}
+
+
+class FakeTranscriptSource:
+    """
+    Offline stand-in for tests and benchmarks: every video has an English
+    transcript built from its ID, except the `unavailable` ones. `latency`
+    seconds are spent on each of the listing, fetch and metadata calls.
+    """
+
+    def __init__(self, latency=0.0, unavailable=(), segments=400):
+        self.latency = latency
+        self.unavailable = set(unavailable)
+        self.segments = segments
+        self.calls = {"candidates": 0, "fetch": 0, "metadata": 0}
+
+    def candidates(self, video_id, languages, translate_to):
+        self._call("candidates")
+        if video_id in self.unavailable:
+            raise TranscriptUnavailable(f"transcripts are disabled for video {video_id}")
+        return [Candidate(translate_to, "en", lambda: self._transcript(video_id))]
+
+    def _transcript(self, video_id):
+        self._call("fetch")
+        return " ".join(f"In part {i} of lecture {video_id} we cover idea number {i % 37}."
+                        for i in range(self.segments))
+
+    def metadata(self, video_id):
+        self._call("metadata")
+        return {"source": video_id, "title": f"Lecture {video_id}", "author": "Fake Channel", "thumbnail_url": None}
+
+    def _call(self, name):
+        self.calls[name] += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+
+def _join(segments):
+    return " ".join(segment["text"].replace("\n", " ") for segment in segments if segment.get("text"))
+
+
+# ==== Store ====
+class TranscriptStore:
+    """
+    Transcripts keyed by video ID and language, kept zlib-compressed with
+    their metadata in the `youtube_transcripts` collection for `ttl`
+    seconds (a TTL index removes expired documents), and in a small
+    per-process LRU in front of it. Videos without a transcript are
+    remembered for `negative_ttl` so they fail fast.
+
+    On a miss the metadata request runs alongside the transcript listing,
+    and the `parallel` most preferred tracks are fetched at once; the best
+    one that succeeds wins. Concurrent misses for one video are fetched once.
+    When the winner could not be translated, the entry carries the language
+    it is really in, and is stored under that language as well as under
+    the one requested.
+    """
+
+    def __init__(self, source, collection=None, languages=("en",), translate_to="en", ttl=30 * 24 * 60 * 60,
+                 negative_ttl=60 * 60, local_entries=64, parallel=2, workers=8):
+        self.source = source
+        self.collection = collection
+        self.languages = list(languages)
+        self.translate_to = translate_to
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.local_entries = local_entries
+        self.parallel = max(1, parallel)
+        self.flights = SingleFlight()
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="youtube-fetch")
+        self._local = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"local_hits": 0, "shared_hits": 0, "fetches": 0, "unavailable": 0}
+
+    def get(self, video_id, language=None):
+        """
+        Returns {"text", "metadata", "language", "source_language", "cached"}.
+        Raises TranscriptUnavailable for videos without a usable transcript.
+        """
+        language = language or self.translate_to
+        key = f"{video_id}|{language}"
+        entry = self._get_local(key)
+        if entry is not None:
+            self._count("local_hits")
+        else:
+            entry = self._get_shared(key)
+            if entry is not None:
+                self._count("shared_hits")
+                self._put_local(key, entry)
+        if entry is not None:
+            return self._unpack(entry, cached=True)
+
+        flight, leader = self.flights.begin(key)
+        if not leader:
+            return self._unpack(flight.wait(), cached=True)
+        try:
+            entry = self._fetch(video_id, language)
+        except Exception as e:
+            self.flights.end(key, error=e)
+            raise
+        self.flights.end(key, result=entry)
+        return self._unpack(entry, cached=False)
+
+    # ==== Fetching ====
+    def _fetch(self, video_id, language):
+        key = f"{video_id}|{language}"
+        self._count("fetches")
+        with span("http", "youtube_transcript"):
+            metadata = self._pool.submit(self.source.metadata, video_id)
+            try:
+                text, candidate = self._fetch_transcript(video_id, language)
+            except TranscriptUnavailable as e:
+                self._count("unavailable")
+                self._remember(key, {"error": str(e)}, self.negative_ttl)
+                raise
+            try:
+                info = metadata.result(timeout=Config.FETCH_CONNECT_TIMEOUT + Config.FETCH_READ_TIMEOUT)
+            except Exception as e:
+                logger.warning("metadata for %s unavailable: %s", video_id, e)
+                info = {"source": video_id}
+
+        entry = {
+            "video_id": video_id,
+            "language": candidate.language,
+            "source_language": candidate.source_language,
+            "metadata": info,
+            "transcript": zlib.compress(text.encode("utf-8"), 6),
+            "chars": len(text),
+        }
+        self._remember(key, entry, self.ttl)
+        if candidate.language != language:
+            self._remember(f"{video_id}|{candidate.language}", entry, self.ttl)
+        return entry
+
+    def _fetch_transcript(self, video_id, language):
+        candidates = self.source.candidates(video_id, self.languages, language)
+        errors = []
+        for start in range(0, len(candidates), self.parallel):
+            wave = candidates[start:start + self.parallel]
+            futures = [self._pool.submit(candidate.fetch) for candidate in wave[1:]]
+            results = [self._attempt(wave[0].fetch)] + [self._attempt(future.result) for future in futures]
+            for candidate, (text, error) in zip(wave, results):
+                if text and text.strip():
+                    return text, candidate
+                if error is not None:
+                    errors.append(error)
+        if errors:
+            raise errors[0]  # a failed request, not a missing transcript: not remembered
+        raise TranscriptUnavailable(f"every transcript of video {video_id} is empty")
+
+    @staticmethod
+    def _attempt(fetch):
+        try:
+            return fetch(), None
+        except Exception as e:
+            return None, e
+
+    # ==== Storage ====
+    def _unpack(self, entry, cached):
+        if "error" in entry:
+            raise TranscriptUnavailable(entry["error"])
+        return {
+            "text": zlib.decompress(entry["transcript"]).decode("utf-8"),
+            "metadata": entry.get("metadata") or {},
+            "language": entry["language"],
+            "source_language": entry.get("source_language"),
+            "cached": cached,
+        }
+
+    def _remember(self, key, entry, ttl):
+        entry = dict(entry, expires_at=datetime.utcnow() + timedelta(seconds=ttl))
+        self._put_local(key, entry)
+        if self.collection is None:
+            return
+        try:
+            self.collection.replace_one({"_id": key}, dict(entry, fetched_at=datetime.utcnow()), upsert=True)
+        except PyMongoError as e:
+            logger.warning("write failed: %s", e)
+
+    def _get_shared(self, key):
+        if self.collection is None:
+            return None
+        try:
+            doc = self.collection.find_one({"_id": key, "expires_at": {"$gt": datetime.utcnow()}})
+        except PyMongoError as e:
+            logger.warning("read failed: %s", e)
+            return None
+        if doc and "transcript" in doc:
+            doc["transcript"] = bytes(doc["transcript"])
+        return doc
+
+    def _get_local(self, key):
+        with self._lock:
+            entry = self._local.get(key)
+            if entry is None:
+                return None
+            if entry["expires_at"] <= datetime.utcnow():
+                del self._local[key]
+                return None
+            self._local.move_to_end(key)
+            return entry
+
+    def _put_local(self, key, entry):
+        with self._lock:
+            self._local[key] = entry
+            self._local.move_to_end(key)
+            while len(self._local) > self.local_entries:
+                self._local.popitem(last=False)
+
+    def get_stats(self):
+        with self._lock:
+            stats = dict(self.stats)
+            stats["local_entries"] = len(self._local)
+        return stats
+
+    def _count(self, name):
+        with self._lock:
+            self.stats[name] += 1
+
+
+def _create_store():
+    from app.models.db import collection
+    if Config.YOUTUBE_TRANSCRIPT_SOURCE == "fake":
+        source = FakeTranscriptSource(latency=Config.YOUTUBE_FAKE_LATENCY_MS / 1000)
+    else:
+        source = YouTubeTranscriptSource()
+    return TranscriptStore(
+        source,
+        collection=collection("youtube_transcripts"),
+        languages=[code.strip() for code in Config.YOUTUBE_TRANSCRIPT_LANGUAGES.split(",") if code.strip()],
+        translate_to=Config.YOUTUBE_TRANSCRIPT_TRANSLATE_TO,
+        ttl=Config.YOUTUBE_TRANSCRIPT_TTL,
+        negative_ttl=Config.YOUTUBE_TRANSCRIPT_NEGATIVE_TTL,
+        local_entries=Config.YOUTUBE_TRANSCRIPT_LOCAL_ENTRIES,
+        parallel=Config.YOUTUBE_TRANSCRIPT_PARALLEL,
+    )
+
+
+transcript_store = _create_store()
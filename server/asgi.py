@@ -0,0 +1,53 @@
+"""
+ASGI entry point:  uvicorn asgi:app --workers 2
+
+/ai/quiz, /ai/explain and /summarize/url run as coroutines that await the
+model, so one process keeps hundreds of LLM calls in flight. Every other
+route (auth, dashboard, PDF uploads, jobs) is the unchanged Flask app,
+served through a WSGI adapter on a thread pool. `gunicorn main:app` keeps
+serving everything synchronously, as before.
+"""
+from contextlib import asynccontextmanager
+
+from a2wsgi import WSGIMiddleware
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.routing import Mount, Route
+
+from app.utils.metrics import MetricsMiddleware
+from app.utils.startup import ROUTE_MODULES, import_route_modules, lazy_endpoint, start_warm_up
+from config import Config
+from main import app as flask_app
+
+# Handlers in app.routes.async_routes, imported with the other route modules
+ASYNC_ROUTES = "app.routes.async_routes"
+
+# The Flask app answers CORS for everything else; these routes do their own.
+_cors = [Middleware(CORSMiddleware, allow_origins=["*"], allow_methods=["*"], allow_headers=["*"])]
+
+routes = [
+    Route("/ai/quiz", lazy_endpoint(f"{ASYNC_ROUTES}:quiz"), methods=["POST", "OPTIONS"], middleware=_cors),
+    Route("/ai/explain", lazy_endpoint(f"{ASYNC_ROUTES}:explain"), methods=["POST", "OPTIONS"], middleware=_cors),
+    Route("/summarize/url", lazy_endpoint(f"{ASYNC_ROUTES}:summarize_url"), methods=["POST", "OPTIONS"],
+          middleware=_cors),
+]
+
+if Config.STARTUP_MODE == "eager":
+    import_route_modules([ASYNC_ROUTES])
+
+
+@asynccontextmanager
+async def lifespan(app):
+    # Each uvicorn worker warms up as soon as it starts, before the first request.
+    start_warm_up(ROUTE_MODULES + (ASYNC_ROUTES,))
+    yield
+
+
+app = Starlette(
+    routes=routes + [
+        Mount("/", app=WSGIMiddleware(flask_app, workers=Config.ASGI_WSGI_THREADS)),
+    ],
+    middleware=[Middleware(MetricsMiddleware, routes=routes)],
+    lifespan=lifespan,
+)
@@ -0,0 +1,134 @@
+"""
+Cold-start profile: how long a fresh worker takes to import the app, to
+answer /health/live, to report ready on /health/ready and to serve its
+first /ai/quiz, in each STARTUP_MODE.
+
+Every sample is a new interpreter (mongomock, fake LLM). One extra run per
+mode under `python -X importtime` lists the modules that dominate
+`import main` and which heavy packages it loaded.
+
+    python benchmarks/cold_start.py --runs 5 --top 15
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+SERVER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY_PACKAGES = ("langchain_core", "langchain", "langsmith", "pdfplumber", "fpdf", "numpy", "trafilatura", "lxml",
+                  "transformers", "torch")
+
+# Runs in the child interpreter; prints one JSON line.
+PROBE = """
+import json, os, sys, time
+started = time.perf_counter()
+from main import app
+imported = time.perf_counter()
+heavy = [name for name in %(heavy)r if name in sys.modules]
+rss_import = int(open("/proc/self/statm").read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+client = app.test_client()
+client.get("/health/live")
+live = time.perf_counter()
+while client.get("/health/ready").status_code != 200:
+    time.sleep(0.005)
+ready = time.perf_counter()
+client.post("/ai/quiz", json={"topic": "Volcanoes", "level": "easy", "num_questions": 3})
+first_quiz = time.perf_counter()
+rss_ready = int(open("/proc/self/statm").read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+print(json.dumps({
+    "import_s": imported - started, "live_s": live - started, "ready_s": ready - started,
+    "first_quiz_s": first_quiz - started, "rss_import_mb": rss_import / 2 ** 20, "rss_ready_mb": rss_ready / 2 ** 20,
+    "heavy_at_import": heavy,
+}))
+""" % {"heavy": HEAVY_PACKAGES}
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5, help="fresh interpreters per mode")
+    parser.add_argument("--modes", default="lazy,eager", help="STARTUP_MODE values to compare")
+    parser.add_argument("--top", type=int, default=15, help="modules listed from the import-time profile")
+    parser.add_argument("--output", default="", help="also write the report as JSON")
+    return parser.parse_args()
+
+
+def child_env(mode):
+    env = dict(os.environ)
+    env.update({
+        "STARTUP_MODE": mode,
+        "MONGO_MOCK": "true",
+        "LLM_BACKEND": "fake",
+        "GROQ_RPM": "0",
+        "TOPIC_INDEX_ENABLED": "false",
+        "QUIZ_BANK_REFILL_INTERVAL": "0",
+        "JWT_SECRET": os.getenv("JWT_SECRET", "benchmark-secret-benchmark-secret"),
+    })
+    return env
+
+
+def run_probe(mode, importtime=False):
+    command = [sys.executable] + (["-X", "importtime"] if importtime else []) + ["-c", PROBE]
+    result = subprocess.run(command, cwd=SERVER_DIR, env=child_env(mode), capture_output=True, text=True)
+    lines = [line for line in result.stdout.splitlines() if line.startswith("{")]
+    if result.returncode or not lines:
+        raise RuntimeError(f"{mode} probe failed:\n{result.stderr[-2000:]}")
+    return json.loads(lines[-1]), result.stderr
+
+
+def import_profile(stderr, top):
+    """Modules imported directly by `main`, by cumulative import time (ms), from -X importtime output."""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or line.count("|") != 2:
+            continue
+        _, cumulative, name = line.split("|")
+        if not cumulative.strip().isdigit():
+            continue  # header line
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        rows.append((depth, name.strip(), int(cumulative) / 1000))
+    # Entries are printed after their children, so main's block ends at `main`
+    # and starts after the previous top-level entry.
+    for end in range(len(rows) - 1, -1, -1):
+        if rows[end][:2] == (0, "main"):
+            break
+    else:
+        return []
+    start = end
+    while start > 0 and rows[start - 1][0] > 0:
+        start -= 1
+    children = [(name, ms) for depth, name, ms in rows[start:end] if depth == 1]
+    return sorted(children, key=lambda row: row[1], reverse=True)[:top]
+
+
+def main():
+    args = parse_args()
+    report = {}
+    for mode in [m.strip() for m in args.modes.split(",") if m.strip()]:
+        samples = [run_probe(mode)[0] for _ in range(args.runs)]
+        profiled, stderr = run_probe(mode, importtime=True)
+        report[mode] = {
+            **{key: round(statistics.median(s[key] for s in samples), 3)
+               for key in ("import_s", "live_s", "ready_s", "first_quiz_s", "rss_import_mb", "rss_ready_mb")},
+            "heavy_at_import": profiled["heavy_at_import"],
+            "import_profile_ms": [[name, round(ms, 1)] for name, ms in import_profile(stderr, args.top)],
+        }
+
+    print(f"median of {args.runs} fresh interpreters per mode (seconds from the start of `import main`)")
+    print(f"{'mode':<8} {'import':>8} {'live':>8} {'ready':>8} {'1st quiz':>9} {'rss@import':>11} {'rss@ready':>10}")
+    for mode, row in report.items():
+        print(f"{mode:<8} {row['import_s']:>8.3f} {row['live_s']:>8.3f} {row['ready_s']:>8.3f} "
+              f"{row['first_quiz_s']:>9.3f} {row['rss_import_mb']:>9.1f}MB {row['rss_ready_mb']:>8.1f}MB")
+    for mode, row in report.items():
+        print(f"\n{mode}: heavy packages loaded by `import main`: {', '.join(row['heavy_at_import']) or 'none'}")
+        print(f"{mode}: slowest imports under main (cumulative ms)")
+        for name, ms in row["import_profile_ms"]:
+            print(f"  {ms:>9.1f}  {name}")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
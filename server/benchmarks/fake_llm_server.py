@@ -0,0 +1,92 @@
+"""
+Local stand-in for the Groq chat completions API.
+
+Answers /openai/v1/chat/completions after a fixed delay (streaming or not),
+so load tests exercise real sockets without spending tokens. Point the app
+at it with GROQ_API_BASE=http://127.0.0.1:<port>.
+
+    python benchmarks/fake_llm_server.py --port 8765 --latency 1.0
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+import uuid
+
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, StreamingResponse
+from starlette.routing import Route
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from app.services.fake_llm import fake_reply
+
+LATENCY = 1.0
+STREAM_CHUNKS = 20
+
+
+def _completion(content, model):
+    return {
+        "id": f"chatcmpl-{uuid.uuid4().hex}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+        "usage": {"prompt_tokens": 100, "completion_tokens": len(content) // 4, "total_tokens": 100 + len(content) // 4},
+    }
+
+
+def _chunk(content, model, finish=None):
+    return {
+        "id": "chatcmpl-stream",
+        "object": "chat.completion.chunk",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [{"index": 0, "delta": {"content": content} if content else {}, "finish_reason": finish}],
+    }
+
+
+async def chat_completions(request: Request):
+    body = await request.json()
+    model = body.get("model", "fake")
+    prompt = "\n".join(str(m.get("content", "")) for m in body.get("messages", []))
+    content = fake_reply(prompt)
+
+    if not body.get("stream"):
+        await asyncio.sleep(LATENCY)
+        return JSONResponse(_completion(content, model))
+
+    async def events():
+        size = max(1, len(content) // STREAM_CHUNKS)
+        pieces = [content[i:i + size] for i in range(0, len(content), size)]
+        for piece in pieces:
+            await asyncio.sleep(LATENCY / len(pieces))
+            yield f"data: {json.dumps(_chunk(piece, model))}\n\n"
+        yield f"data: {json.dumps(_chunk(None, model, finish='stop'))}\n\n"
+        yield "data: [DONE]\n\n"
+
+    return StreamingResponse(events(), media_type="text/event-stream")
+
+
+app = Starlette(routes=[
+    Route("/openai/v1/chat/completions", chat_completions, methods=["POST"]),
+])
+
+
+def main():
+    global LATENCY
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=1.0, help="seconds per completion")
+    args = parser.parse_args()
+    LATENCY = args.latency
+
+    import uvicorn
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+"""
+Fixture documents for the offline benchmarks: lecture-like PDFs, article
+HTML pages and YouTube transcripts in small / medium / large sizes.
+
+Everything is generated from a fixed seed, so two runs (and two commits)
+summarize exactly the same input. PDFs are written once to the fixture
+directory and reused; HTML pages are served from a local HTTP server so
+the real fetch -> extract -> summarize path runs without the internet.
+"""
+import os
+import random
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Pages for PDFs (large is above PDF_PARALLEL_MIN_PAGES, so it goes through
+# the extraction pool), paragraphs for HTML, segments for transcripts.
+SIZES = {
+    "small": {"pdf_pages": 2, "html_paragraphs": 8, "transcript_segments": 150},
+    "medium": {"pdf_pages": 12, "html_paragraphs": 60, "transcript_segments": 1200},
+    "large": {"pdf_pages": 48, "html_paragraphs": 240, "transcript_segments": 6000},
+}
+
+_SUBJECTS = ["photosynthesis", "the water cycle", "plate tectonics", "cell division", "supply and demand",
+             "the French Revolution", "electric circuits", "natural selection", "the immune system",
+             "linear equations", "chemical bonding", "the solar system", "climate zones", "probability"]
+_VERBS = ["explains", "depends on", "is driven by", "changes", "limits", "produces", "balances", "describes"]
+_OBJECTS = ["energy transfer", "a closed system", "the rate of change", "long-term patterns", "small variations",
+            "an equilibrium", "the observed results", "every later step", "the measured values", "the whole model"]
+
+
+def paragraphs(count, seed=0):
+    """`count` paragraphs of plausible lecture prose, the same for the same seed."""
+    rng = random.Random(seed)
+    out = []
+    for _ in range(count):
+        sentences = []
+        for _ in range(rng.randint(4, 7)):
+            sentences.append(f"{rng.choice(_SUBJECTS).capitalize()} {rng.choice(_VERBS)} {rng.choice(_OBJECTS)}"
+                             f" because {rng.choice(_SUBJECTS)} {rng.choice(_VERBS)} {rng.choice(_OBJECTS)}.")
+        out.append(" ".join(sentences))
+    return out
+
+
+# ==== PDFs ====
+def pdf_path(size, directory):
+    """Path of the `size` fixture PDF, generated on first use."""
+    path = os.path.join(directory, f"lecture-{size}.pdf")
+    if not os.path.exists(path):
+        os.makedirs(directory, exist_ok=True)
+        _write_pdf(path, SIZES[size]["pdf_pages"], seed=list(SIZES).index(size))
+    return path
+
+
+def _write_pdf(path, pages, seed):
+    from fpdf import FPDF
+    pdf = FPDF()
+    pdf.set_font("Helvetica", size=11)
+    text = paragraphs(pages * 6, seed)
+    for page in range(pages):
+        pdf.add_page()
+        pdf.multi_cell(0, 5, f"Lecture notes, page {page + 1}", new_x="LMARGIN", new_y="NEXT")
+        pdf.multi_cell(0, 5, "\n\n".join(text[page * 6:(page + 1) * 6]), new_x="LMARGIN", new_y="NEXT")
+    tmp = path + ".tmp"
+    pdf.output(tmp)
+    os.replace(tmp, path)
+
+
+def unique_pdf(data, n):
+    """
+    The same document with different bytes: a comment after %%EOF changes
+    the file's hash (and so every cache key) but not what is extracted.
+    """
+    return data + f"\n% benchmark copy {n}\n".encode("ascii")
+
+
+# ==== HTML pages ====
+def html_page(size):
+    title = f"Lecture article ({size})"
+    text = paragraphs(SIZES[size]["html_paragraphs"], seed=100 + list(SIZES).index(size))
+    body = "\n".join(f"<p>{p}</p>" for p in text)
+    return (f"<!doctype html><html><head><title>{title}</title></head><body>"
+            f"<nav><a href='/'>Home</a> <a href='/courses'>Courses</a></nav>"
+            f"<main><article><h1>{title}</h1>\n{body}\n</article></main>"
+            f"<footer>Copyright Benchmark University</footer></body></html>").encode("utf-8")
+
+
+class FixtureServer:
+    """
+    Serves /<size>.html on 127.0.0.1 from a background thread. Responses
+    are `no-store`, so every request goes through fetch and extraction
+    unless the benchmark itself repeats a URL.
+    """
+
+    def __init__(self):
+        pages = {f"/{size}.html": html_page(size) for size in SIZES}
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                body = pages.get(self.path.split("?", 1)[0])
+                if body is None:
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", "text/html; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.send_header("Cache-Control", "no-store")
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.server.daemon_threads = True
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def url(self, size, n=None):
+        host, port = self.server.server_address
+        return f"http://{host}:{port}/{size}.html" + (f"?copy={n}" if n is not None else "")
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+# ==== Transcripts ====
+def video_id(run, n):
+    """A valid 11-character YouTube video ID, unique per `run` (a 16-bit salt) and `n`."""
+    return f"{run % 0x10000:04x}{n:07d}"
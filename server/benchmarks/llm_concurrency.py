@@ -0,0 +1,139 @@
+"""
+Concurrency load test for the LLM-bound endpoints, sync vs async serving.
+
+Starts the fake LLM server, then for each mode starts the app, fires
+--requests requests at --concurrency, and reports throughput and latency:
+
+    sync   gunicorn main:app  --workers W --threads 1   (one LLM wait per worker)
+    async  uvicorn  asgi:app  --workers 1               (awaits many LLM calls)
+
+Every request uses a fresh topic so the caches never answer for the model.
+MongoDB is mongomock inside each server process.
+
+    python benchmarks/llm_concurrency.py --latency 1.0 --requests 200 --concurrency 100
+"""
+import argparse
+import asyncio
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+
+import httpx
+
+SERVER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PAYLOADS = {
+    "/ai/explain": lambda n: {"topic": f"load test topic {n}", "level": "beginner"},
+    "/ai/quiz": lambda n: {"topic": f"load test topic {n}", "level": "easy", "num_questions": 3},
+}
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _wait_for_port(port, timeout=60):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=0.5):
+                return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f"server on port {port} did not start")
+
+
+def _start(cmd, env, port):
+    process = subprocess.Popen(cmd, cwd=SERVER_DIR, env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        _wait_for_port(port)
+    except RuntimeError:
+        process.kill()
+        raise
+    return process
+
+
+async def _fire(base_url, path, total, concurrency):
+    latencies, errors = [], 0
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=600, limits=limits) as client:
+        async def one(n):
+            nonlocal errors
+            async with semaphore:
+                start = time.perf_counter()
+                try:
+                    response = await client.post(path, json=PAYLOADS[path](n))
+                    ok = response.status_code == 200
+                except httpx.HTTPError:
+                    ok = False
+                if ok:
+                    latencies.append(time.perf_counter() - start)
+                else:
+                    errors += 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(one(n) for n in range(total)))
+        return time.perf_counter() - started, sorted(latencies), errors
+
+
+def _report(mode, path, wall, latencies, errors, total):
+    ok = len(latencies)
+    line = f"{mode:5} {path:12} {ok}/{total} ok  {wall:7.2f}s  {ok / wall:7.1f} req/s"
+    if latencies:
+        p95 = latencies[min(ok - 1, int(ok * 0.95))]
+        line += f"  p50={statistics.median(latencies):.2f}s p95={p95:.2f}s"
+    if errors:
+        line += f"  errors={errors}"
+    print(line, flush=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--latency", type=float, default=1.0, help="fake LLM seconds per call")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--sync-workers", type=int, default=2, help="gunicorn sync workers")
+    parser.add_argument("--path", choices=sorted(PAYLOADS), default="/ai/explain")
+    parser.add_argument("--modes", default="sync,async")
+    args = parser.parse_args()
+
+    llm_port = _free_port()
+    llm = _start([sys.executable, "benchmarks/fake_llm_server.py", "--port", str(llm_port),
+                  "--latency", str(args.latency)], dict(os.environ), llm_port)
+
+    env = dict(os.environ,
+               MONGO_MOCK="true",
+               QUIZ_CACHE_SHARED="false",
+               GROQ_API_BASE=f"http://127.0.0.1:{llm_port}",
+               GROQ_API_KEY="fake-key",
+               JWT_SECRET=os.getenv("JWT_SECRET", "benchmark-secret-benchmark-secret"))
+    try:
+        for mode in args.modes.split(","):
+            port = _free_port()
+            if mode == "sync":
+                cmd = [sys.executable, "-m", "gunicorn", "main:app", "--bind", f"127.0.0.1:{port}",
+                       "--workers", str(args.sync_workers), "--threads", "1", "--timeout", "600"]
+            else:
+                cmd = [sys.executable, "-m", "uvicorn", "asgi:app", "--host", "127.0.0.1",
+                       "--port", str(port), "--workers", "1", "--log-level", "warning"]
+            server = _start(cmd, env, port)
+            try:
+                wall, latencies, errors = asyncio.run(
+                    _fire(f"http://127.0.0.1:{port}", args.path, args.requests, args.concurrency))
+                _report(mode, args.path, wall, latencies, errors, args.requests)
+            finally:
+                server.terminate()
+                server.wait(timeout=30)
+    finally:
+        llm.terminate()
+
+
+if __name__ == "__main__":
+    main()
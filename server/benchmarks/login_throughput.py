@@ -0,0 +1,89 @@
+"""
+Login throughput benchmark for sizing the bcrypt pool.
+
+Runs the real /auth/login route against mongomock with N concurrent
+clients and reports logins/s, latency percentiles and how many requests
+were shed with 503.
+
+    python benchmarks/login_throughput.py --rounds 12 --workers 2 --clients 16 --logins 200
+"""
+import argparse
+import os
+import statistics
+import sys
+import threading
+import time
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rounds", type=int, default=12, help="bcrypt work factor")
+    parser.add_argument("--workers", type=int, default=2, help="hashing processes (0 = inline)")
+    parser.add_argument("--max-pending", type=int, default=8, help="queued + running hash operations")
+    parser.add_argument("--clients", type=int, default=16, help="concurrent login clients")
+    parser.add_argument("--logins", type=int, default=200, help="total login attempts")
+    parser.add_argument("--users", type=int, default=20, help="distinct accounts")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    # Config is read at import time, so settings go in first.
+    os.environ.update({
+        "MONGO_MOCK": "true",
+        "JWT_SECRET": os.getenv("JWT_SECRET", "benchmark-secret-benchmark-secret"),
+        "BCRYPT_ROUNDS": str(args.rounds),
+        "BCRYPT_WORKERS": str(args.workers),
+        "BCRYPT_MAX_PENDING": str(args.max_pending),
+    })
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from main import app
+
+    client = app.test_client()
+    while client.get("/health/ready").status_code != 200:
+        time.sleep(0.05)  # background warm-up, not part of the measurement
+    accounts = [(f"user{i}@bench.local", f"password-{i}") for i in range(args.users)]
+    for email, password in accounts:
+        client.post("/auth/signup", json={"email": email, "password": password, "name": email})
+
+    latencies, statuses = [], {}
+    lock = threading.Lock()
+    remaining = iter(range(args.logins))
+
+    def run():
+        local = app.test_client()
+        while True:
+            with lock:
+                n = next(remaining, None)
+            if n is None:
+                return
+            email, password = accounts[n % len(accounts)]
+            start = time.perf_counter()
+            status = local.post("/auth/login", json={"email": email, "password": password}).status_code
+            elapsed = time.perf_counter() - start
+            with lock:
+                statuses[status] = statuses.get(status, 0) + 1
+                if status == 200:
+                    latencies.append(elapsed)
+
+    threads = [threading.Thread(target=run) for _ in range(args.clients)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - started
+
+    latencies.sort()
+    ok = statuses.get(200, 0)
+    print(f"rounds={args.rounds} workers={args.workers} max_pending={args.max_pending} clients={args.clients}")
+    print(f"logins: {ok}/{args.logins} ok in {wall:.2f}s -> {ok / wall:.1f} logins/s")
+    print(f"status codes: {dict(sorted(statuses.items()))}")
+    if latencies:
+        p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+        print(f"latency ms: p50={statistics.median(latencies) * 1000:.1f} "
+              f"p95={p95 * 1000:.1f} max={latencies[-1] * 1000:.1f}")
+
+
+if __name__ == "__main__":
+    main()
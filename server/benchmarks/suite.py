@@ -0,0 +1,400 @@
+"""
+Offline benchmark suite for the main API routes.
+
+Runs the real Flask app in-process with the fake chat model
+(LLM_BACKEND=fake, with a configurable time to first token and token
+rate), mongomock or a throwaway database on a local mongod, the fake
+YouTube transcript source and fixture PDFs / HTML pages (see fixtures.py),
+so nothing leaves the machine and two runs see exactly the same input.
+
+Each scenario sends --requests requests from --concurrency client threads
+and reports throughput, p50/p90/p99 latency, errors and this process's
+peak RSS. Results are written as JSON (by default to
+.cache/benchmarks/<commit>.json) so two commits can be compared:
+
+    python benchmarks/suite.py --requests 100 --concurrency 8
+    python benchmarks/suite.py --scenarios summarize_pdf,dashboard --baseline .cache/benchmarks/abc1234.json
+    python benchmarks/suite.py --diff .cache/benchmarks/abc1234.json .cache/benchmarks/def5678.json
+
+"Cold" scenarios use a different input on every request (new topic, new
+PDF bytes, new URL or video), so nothing is served from a cache; "warm"
+ones repeat one input after a warm-up request.
+
+Install the server with `pip install -r requirements-dev.txt` (adds mongomock).
+"""
+import argparse
+import io
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import zlib
+from datetime import datetime, timezone
+from urllib.parse import quote
+
+SERVER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenarios", default="", help="comma-separated scenario name prefixes (default: all)")
+    parser.add_argument("--requests", type=int, default=50, help="requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=8, help="client threads")
+    parser.add_argument("--llm-latency-ms", type=int, default=300, help="fake model time to first token")
+    parser.add_argument("--llm-tokens-per-second", type=float, default=400, help="fake model output rate (0 = instant)")
+    parser.add_argument("--bcrypt-rounds", type=int, default=10, help="work factor of the benchmark accounts")
+    parser.add_argument("--users", type=int, default=16, help="accounts used by the auth and dashboard scenarios")
+    parser.add_argument("--history", type=int, default=200, help="saved results per account before dashboard runs")
+    parser.add_argument("--mongo-uri", default="", help="use a throwaway database on this server instead of mongomock")
+    parser.add_argument("--output", default="", help="results file (default .cache/benchmarks/<commit>.json)")
+    parser.add_argument("--baseline", default="", help="results file to compare this run against")
+    parser.add_argument("--diff", nargs=2, metavar=("BASE", "NEW"), help="only compare two results files")
+    parser.add_argument("--list", action="store_true", help="list the scenarios and exit")
+    return parser.parse_args()
+
+
+def configure(args, workdir, run):
+    """Config is read at import time, so every setting goes into the environment first."""
+    os.environ.update({
+        "LLM_BACKEND": "fake",
+        "LLM_FAKE_LATENCY_MS": str(args.llm_latency_ms),
+        "LLM_FAKE_TOKENS_PER_SECOND": str(args.llm_tokens_per_second),
+        "GROQ_RPM": "0",
+        "GROQ_TPM": "1000000000",
+        "YOUTUBE_TRANSCRIPT_SOURCE": "fake",
+        "TOPIC_INDEX_ENABLED": "false",  # needs torch and the sentence model
+        "QUIZ_BANK_REFILL_INTERVAL": "0",  # no background sweep competing with the requests
+        "METRICS_SERVER_TIMING": "false",
+        "BCRYPT_ROUNDS": str(args.bcrypt_rounds),
+        "JWT_SECRET": os.getenv("JWT_SECRET", "benchmark-secret-benchmark-secret"),
+        "FETCH_CACHE_DIR": os.path.join(workdir, "fetch"),
+        "PDF_EXPORT_CACHE_DIR": os.path.join(workdir, "pdf_export"),
+        "JOB_SPOOL_DIR": os.path.join(workdir, "jobs"),
+        "TOPIC_INDEX_DIR": os.path.join(workdir, "topic_index"),
+    })
+    if args.mongo_uri:
+        os.environ.update({"MONGO_MOCK": "false", "MONGO_URI": args.mongo_uri,
+                           "MONGO_DB_NAME": f"edugenie_benchmark_{run:04x}"})
+    else:
+        os.environ["MONGO_MOCK"] = "true"
+    sys.path.insert(0, SERVER_DIR)
+
+
+# ==== Measurement ====
+def current_rss():
+    """Resident set size of this process in bytes."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024  # high-water mark only
+
+
+class RssSampler:
+    """Polls the RSS every `interval` seconds in a daemon thread and keeps the peak since `reset`."""
+
+    def __init__(self, interval=0.005):
+        self.interval = interval
+        self.peak = current_rss()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="rss-sampler", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.peak = max(self.peak, current_rss())
+
+    def reset(self):
+        self.peak = current_rss()
+        return self.peak
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+
+def percentile(ordered, q):
+    if not ordered:
+        return None
+    return ordered[min(len(ordered) - 1, max(0, round(q * len(ordered)) - 1))]
+
+
+def summarize(latencies, statuses, wall, rss_start, rss_peak):
+    ordered = sorted(latencies)
+    ms = lambda seconds: None if seconds is None else round(seconds * 1000, 2)
+    total = sum(statuses.values())
+    return {
+        "requests": total,
+        "errors": total - len(ordered),
+        "status_codes": {str(code): count for code, count in sorted(statuses.items())},
+        "seconds": round(wall, 3),
+        "throughput_rps": round(len(ordered) / wall, 2) if wall else None,
+        "latency_ms": {
+            "mean": ms(sum(ordered) / len(ordered)) if ordered else None,
+            "p50": ms(percentile(ordered, 0.5)),
+            "p90": ms(percentile(ordered, 0.9)),
+            "p99": ms(percentile(ordered, 0.99)),
+            "max": ms(ordered[-1] if ordered else None),
+        },
+        "rss_start_mb": round(rss_start / 2 ** 20, 1),
+        "rss_peak_mb": round(rss_peak / 2 ** 20, 1),
+    }
+
+
+# ==== Scenarios ====
+class Scenario:
+    """
+    `send(client, n)` makes request number `n`; `warmup` requests (n < 0)
+    run untimed first. Slow scenarios send only `share` of --requests.
+    """
+
+    def __init__(self, name, send, warmup=0, before=None, share=1.0):
+        self.name = name
+        self.send = send
+        self.warmup = warmup
+        self.before = before
+        self.share = share
+
+
+def build_scenarios(app, args, run, fixture_server, pdf_dir):
+    from fixtures import SIZES, pdf_path, unique_pdf, video_id
+    from app.utils.youtube_transcripts import FakeTranscriptSource, transcript_store
+
+    client = app.test_client()
+    accounts = [{"email": f"bench{i}@bench.local", "password": f"password-{i}"} for i in range(args.users)]
+    tokens = []
+
+    def seed_accounts():
+        if tokens:
+            return
+        for i, account in enumerate(accounts):
+            client.post("/auth/signup", json={**account, "name": f"Bench {i}"})
+            tokens.append(client.post("/auth/login", json=account).get_json()["access_token"])
+            history = [{"type": "quiz", "topic": f"Topic {k}", "score": k % 6, "totalQuestions": 5, "level": "medium"}
+                       if k % 2 == 0 else
+                       {"type": "explanation", "topic": f"Topic {k}", "level": "medium", "explanation": "Text. " * 40}
+                       for k in range(args.history)]
+            for start in range(0, len(history), 100):
+                client.post("/dashboard/save/batch", json={"results": history[start:start + 100]},
+                            headers=auth(i))
+
+    def auth(n):
+        return {"Authorization": f"Bearer {tokens[n % len(tokens)]}"}
+
+    def salt(name):
+        return zlib.crc32(f"{run}:{name}".encode()) & 0xFFFF
+
+    def quiz(topic):
+        return lambda c, n: c.post("/ai/quiz", json={"topic": topic(n), "level": "medium", "num_questions": 5})
+
+    def explain(topic):
+        return lambda c, n: c.post("/ai/explain", json={"topic": topic(n), "level": "high school"})
+
+    def pdf(size):
+        data = open(pdf_path(size, pdf_dir), "rb").read()
+        return lambda c, n: c.post("/summarize/pdf", content_type="multipart/form-data", data={
+            "file": (io.BytesIO(unique_pdf(data, f"{run}-{n}")), f"lecture-{size}.pdf"), "language": "English"})
+
+    def html(size):
+        return lambda c, n: c.post("/summarize/url", json={"url": fixture_server.url(size, f"{run}-{n}")})
+
+    def youtube(size):
+        prefix = salt(f"youtube-{size}")
+        return lambda c, n: c.post("/summarize/url", json={
+            "url": f"https://www.youtube.com/watch?v={video_id(prefix, n + 1000)}"})
+
+    def use_transcripts(size):
+        def before():
+            transcript_store.source = FakeTranscriptSource(segments=SIZES[size]["transcript_segments"])
+        return before
+
+    scenarios = [
+        Scenario("auth_login", lambda c, n: c.post("/auth/login", json=accounts[n % len(accounts)]),
+                 before=seed_accounts),
+        Scenario("ai_quiz_cold", quiz(lambda n: f"Benchmark topic {run} {n}")),
+        Scenario("ai_quiz_warm", quiz(lambda n: "Photosynthesis"), warmup=1),
+        Scenario("ai_explain_cold", explain(lambda n: f"Benchmark concept {run} {n}")),
+        Scenario("ai_explain_warm", explain(lambda n: "The water cycle"), warmup=1),
+    ]
+    scenarios += [Scenario(f"summarize_pdf_{size}", pdf(size), share=1 if size == "small" else 0.2)
+                  for size in SIZES]
+    scenarios += [Scenario(f"summarize_url_html_{size}", html(size)) for size in SIZES]
+    scenarios += [Scenario(f"summarize_url_youtube_{size}", youtube(size), before=use_transcripts(size),
+                           share=0.2 if size == "large" else 1)
+                  for size in SIZES]
+    scenarios += [
+        Scenario("dashboard_overview", lambda c, n: c.get("/dashboard/", headers=auth(n)), before=seed_accounts),
+        Scenario("dashboard_progress", lambda c, n: c.get("/dashboard/progress?limit=20", headers=auth(n)),
+                 before=seed_accounts),
+        Scenario("dashboard_quiz_result",
+                 lambda c, n: c.get(f"/dashboard/quiz-result/{quote('Topic ' + str(n % args.history // 2 * 2))}",
+                                    headers=auth(n)),
+                 before=seed_accounts),
+        Scenario("dashboard_save_quiz",
+                 lambda c, n: c.post("/dashboard/save/quiz", headers=auth(n), json={
+                     "topic": f"Saved topic {n % 50}", "score": n % 6, "totalQuestions": 5, "level": "medium"}),
+                 before=seed_accounts),
+    ]
+    return scenarios
+
+
+def run_scenario(app, scenario, args, sampler):
+    if scenario.before:
+        scenario.before()
+    client = app.test_client()
+    for n in range(scenario.warmup):
+        scenario.send(client, -1 - n)
+
+    latencies, statuses = [], {}
+    lock = threading.Lock()
+    remaining = iter(range(max(1, round(args.requests * scenario.share))))
+
+    def worker():
+        local = app.test_client()
+        while True:
+            with lock:
+                n = next(remaining, None)
+            if n is None:
+                return
+            start = time.perf_counter()
+            try:
+                status = scenario.send(local, n).status_code
+            except Exception as e:
+                print(f"  {scenario.name} request {n}: {type(e).__name__}: {e}")
+                status = 0
+            elapsed = time.perf_counter() - start
+            with lock:
+                statuses[status] = statuses.get(status, 0) + 1
+                if 200 <= status < 400:
+                    latencies.append(elapsed)
+
+    rss_start = sampler.reset()
+    threads = [threading.Thread(target=worker) for _ in range(max(1, args.concurrency))]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - started
+    return summarize(latencies, statuses, wall, rss_start, max(sampler.peak, current_rss()))
+
+
+def wait_until_ready(app, timeout=120):
+    """Lets the worker finish its background warm-up so it is not timed as part of the first scenario."""
+    client = app.test_client()
+    deadline = time.monotonic() + timeout
+    while client.get("/health/ready").status_code != 200:
+        if time.monotonic() > deadline:
+            raise RuntimeError(f"app not ready after {timeout}s: {client.get('/health/ready').get_json()}")
+        time.sleep(0.05)
+
+
+# ==== Results ====
+def git_commit():
+    try:
+        sha = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=SERVER_DIR, capture_output=True,
+                             text=True, check=True).stdout.strip()
+        dirty = bool(subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=SERVER_DIR,
+                                    capture_output=True, text=True).stdout.strip())
+        return sha, dirty
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown", False
+
+
+def format_row(name, result):
+    latency = result["latency_ms"]
+    return (f"{name:<30} {result['throughput_rps'] or 0:>8.1f}/s  p50 {latency['p50'] or 0:>8.1f}  "
+            f"p99 {latency['p99'] or 0:>8.1f} ms  errors {result['errors']:>3}  peak {result['rss_peak_mb']:>7.1f} MiB")
+
+
+def compare(base, new):
+    """Prints throughput, p50, p99 and peak RSS changes for the scenarios both files have."""
+    def change(old, value):
+        if not old or value is None:
+            return "     n/a"
+        return f"{(value - old) / old * 100:+7.1f}%"
+
+    print(f"{'scenario':<30} {'throughput':>10} {'p50':>9} {'p99':>9} {'peak rss':>9}")
+    for name, result in new["results"].items():
+        old = base["results"].get(name)
+        if old is None:
+            continue
+        print(f"{name:<30} {change(old['throughput_rps'], result['throughput_rps']):>10} "
+              f"{change(old['latency_ms']['p50'], result['latency_ms']['p50']):>9} "
+              f"{change(old['latency_ms']['p99'], result['latency_ms']['p99']):>9} "
+              f"{change(old['rss_peak_mb'], result['rss_peak_mb']):>9}")
+
+
+def load(path):
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def main():
+    args = parse_args()
+    if args.diff:
+        compare(load(args.diff[0]), load(args.diff[1]))
+        return
+
+    run = random.SystemRandom().getrandbits(16)
+    workdir = tempfile.mkdtemp(prefix="edugenie-bench-")
+    configure(args, workdir, run)
+    from fixtures import SIZES, FixtureServer
+    from main import app
+
+    pdf_dir = os.path.join(SERVER_DIR, ".cache", "benchmarks", "fixtures")
+    wanted = [prefix.strip() for prefix in args.scenarios.split(",") if prefix.strip()]
+    sha, dirty = git_commit()
+    results = {}
+    with FixtureServer() as fixture_server:
+        scenarios = [s for s in build_scenarios(app, args, run, fixture_server, pdf_dir)
+                     if not wanted or any(s.name.startswith(prefix) for prefix in wanted)]
+        if args.list:
+            print("\n".join(s.name for s in scenarios))
+            return
+        print(f"commit {sha}{' (dirty)' if dirty else ''}: {args.requests} requests x {args.concurrency} clients, "
+              f"fake LLM {args.llm_latency_ms} ms + {args.llm_tokens_per_second:g} tok/s, "
+              f"{'mongod' if args.mongo_uri else 'mongomock'}")
+        wait_until_ready(app)
+        sampler = RssSampler()
+        try:
+            for scenario in scenarios:
+                results[scenario.name] = run_scenario(app, scenario, args, sampler)
+                print(format_row(scenario.name, results[scenario.name]), flush=True)
+        finally:
+            sampler.stop()
+            if args.mongo_uri:
+                from app.models.db import get_client
+                get_client().drop_database(os.environ["MONGO_DB_NAME"])
+
+    report = {
+        "meta": {
+            "commit": sha,
+            "dirty": dirty,
+            "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "settings": {key: value for key, value in vars(args).items()
+                         if key not in ("output", "baseline", "diff", "list")},
+            "fixtures": SIZES,
+        },
+        "results": results,
+    }
+    output = args.output or os.path.join(SERVER_DIR, ".cache", "benchmarks", f"{sha}{'-dirty' if dirty else ''}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"results written to {output}")
+    if args.baseline:
+        compare(load(args.baseline), report)
+
+
+if __name__ == "__main__":
+    main()
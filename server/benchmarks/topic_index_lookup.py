@@ -0,0 +1,127 @@
+"""
+Topic index lookup benchmark.
+
+Fills a TopicIndex in a temporary directory with N synthetic topic vectors
+(clustered unit vectors shaped like MiniLM embeddings), reopens it from
+disk through the memory map, and reports single-query and batched lookup
+latency for the exact search and for the IVF index, plus the IVF's recall
+against the exact answer. With --model, the time to embed one topic with
+the real sentence model is reported as well.
+
+    python benchmarks/topic_index_lookup.py --topics 100000 --queries 1000
+"""
+import argparse
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--topics", type=int, default=100000, help="canonical topics in the index")
+    parser.add_argument("--dim", type=int, default=384, help="embedding size (384 = all-MiniLM-L6-v2)")
+    parser.add_argument("--queries", type=int, default=1000, help="lookups to time")
+    parser.add_argument("--batch", type=int, default=64, help="queries per batched search")
+    parser.add_argument("--nprobe", type=int, default=8, help="IVF cells searched per query")
+    parser.add_argument("--insert-batch", type=int, default=10000, help="topics per add() while filling")
+    parser.add_argument("--model", default="", help="also time embedding with this sentence model")
+    return parser.parse_args()
+
+
+def synthetic_vectors(rng, count, dim, centers):
+    """Unit vectors scattered around random topic 'themes', like real topic embeddings."""
+    themes = centers[rng.integers(0, len(centers), count)]
+    vectors = themes + rng.normal(scale=0.6 / np.sqrt(dim), size=(count, dim)).astype(np.float32)
+    return (vectors / np.linalg.norm(vectors, axis=1, keepdims=True)).astype(np.float32)
+
+
+def percentiles(samples):
+    samples = sorted(samples)
+    return {
+        "p50_ms": round(statistics.median(samples) * 1000, 3),
+        "p95_ms": round(samples[int(len(samples) * 0.95) - 1] * 1000, 3),
+        "p99_ms": round(samples[int(len(samples) * 0.99) - 1] * 1000, 3),
+    }
+
+
+def time_lookups(index, queries, batch):
+    single = []
+    for query in queries:
+        start = time.perf_counter()
+        index.search(query)
+        single.append(time.perf_counter() - start)
+    start = time.perf_counter()
+    for offset in range(0, len(queries), batch):
+        index.search(queries[offset:offset + batch])
+    batched = time.perf_counter() - start
+    return {**percentiles(single), "batched_per_query_ms": round(batched / len(queries) * 1000, 4)}
+
+
+def main():
+    args = parse_args()
+    os.environ.setdefault("MONGO_MOCK", "true")
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from app.services.topic_index import SentenceEmbedder, TopicIndex
+
+    rng = np.random.default_rng(0)
+    centers = rng.normal(size=(max(1, args.topics // 50), args.dim)).astype(np.float32)
+    centers /= np.linalg.norm(centers, axis=1, keepdims=True)
+    directory = tempfile.mkdtemp(prefix="topic-index-")
+    try:
+        # No background build: the benchmark times exact and IVF search separately.
+        index = TopicIndex(directory, args.dim, ivf_min_size=args.topics + 1, nprobe=args.nprobe)
+        start = time.perf_counter()
+        for offset in range(0, args.topics, args.insert_batch):
+            count = min(args.insert_batch, args.topics - offset)
+            index.add([f"topic {offset + i}" for i in range(count)], synthetic_vectors(rng, count, args.dim, centers))
+        fill_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        index = TopicIndex(directory, args.dim, ivf_min_size=args.topics + 1, nprobe=args.nprobe)
+        load_seconds = time.perf_counter() - start
+
+        queries = synthetic_vectors(rng, args.queries, args.dim, centers)
+        exact = time_lookups(index, queries, args.batch)
+        expected, _ = index.search(queries)
+
+        start = time.perf_counter()
+        index.build_ivf()
+        build_seconds = time.perf_counter() - start
+        approximate = time_lookups(index, queries, args.batch)
+        found, _ = index.search(queries)
+        approximate["recall_at_1"] = round(float(np.mean(found[:, 0] == expected[:, 0])), 4)
+
+        start = time.perf_counter()
+        index.add(["one more topic"], synthetic_vectors(rng, 1, args.dim, centers))
+        insert_ms = (time.perf_counter() - start) * 1000
+
+        print(f"topics:           {len(index)} x {args.dim} float32 "
+              f"({os.path.getsize(os.path.join(directory, 'vectors.f32')) / 2 ** 20:.0f} MiB mapped)")
+        print(f"fill:             {fill_seconds:.2f}s ({args.topics / fill_seconds:.0f} topics/s)")
+        print(f"reopen (mmap):    {load_seconds * 1000:.1f} ms")
+        print(f"exact search:     {exact}")
+        print(f"ivf build:        {build_seconds:.2f}s, {index.get_stats()['ivf_cells']} cells")
+        print(f"ivf search:       {approximate}")
+        print(f"single insert:    {insert_ms:.2f} ms")
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+    if args.model:
+        embedder = SentenceEmbedder(args.model, cache_size=0)
+        if embedder.available:
+            embedder.encode(["warm up"])
+            samples = []
+            for i in range(50):
+                start = time.perf_counter()
+                embedder.encode([f"how plants make food {i}"])
+                samples.append(time.perf_counter() - start)
+            print(f"embed one topic:  {percentiles(samples)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -4,3 +4,171 @@ load_dotenv()
 class Config:
     MONGO_URI = os.getenv("MONGO_URI")
     JWT_SECRET_KEY = os.getenv("JWT_SECRET")
+
+    # MongoDB client (one pool per worker process)
+    MONGO_DB_NAME = os.getenv("MONGO_DB_NAME", "edugenie")
+    MONGO_MOCK = os.getenv("MONGO_MOCK", "false").lower() == "true"
+    MONGO_MAX_POOL_SIZE = int(os.getenv("MONGO_MAX_POOL_SIZE", 50))
+    MONGO_MIN_POOL_SIZE = int(os.getenv("MONGO_MIN_POOL_SIZE", 0))
+    MONGO_MAX_IDLE_TIME_MS = int(os.getenv("MONGO_MAX_IDLE_TIME_MS", 5 * 60 * 1000))
+    MONGO_WAIT_QUEUE_TIMEOUT_MS = int(os.getenv("MONGO_WAIT_QUEUE_TIMEOUT_MS", 5000))
+    MONGO_SERVER_SELECTION_TIMEOUT_MS = int(os.getenv("MONGO_SERVER_SELECTION_TIMEOUT_MS", 5000))
+    MONGO_CONNECT_TIMEOUT_MS = int(os.getenv("MONGO_CONNECT_TIMEOUT_MS", 5000))
+    MONGO_SOCKET_TIMEOUT_MS = int(os.getenv("MONGO_SOCKET_TIMEOUT_MS", 30000))
+    MONGO_READ_PREFERENCE = os.getenv("MONGO_READ_PREFERENCE", "primaryPreferred")
+    MONGO_SLOW_QUERY_MS = int(os.getenv("MONGO_SLOW_QUERY_MS", 200))
+    MONGO_ENSURE_INDEXES = os.getenv("MONGO_ENSURE_INDEXES", "true").lower() == "true"
+
+    # Auth
+    AUTH_TOKEN_CACHE_SIZE = int(os.getenv("AUTH_TOKEN_CACHE_SIZE", 1024))
+    USER_PROFILE_CACHE_SIZE = int(os.getenv("USER_PROFILE_CACHE_SIZE", 1024))
+    USER_PROFILE_CACHE_TTL = int(os.getenv("USER_PROFILE_CACHE_TTL", 300))
+
+    # Password hashing (bcrypt on a process pool, per worker process)
+    BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", 12))
+    BCRYPT_WORKERS = int(os.getenv("BCRYPT_WORKERS", 2))
+    BCRYPT_MAX_PENDING = int(os.getenv("BCRYPT_MAX_PENDING", 8))
+    BCRYPT_ACQUIRE_TIMEOUT = float(os.getenv("BCRYPT_ACQUIRE_TIMEOUT", 2))
+
+    # Progress writes
+    PROGRESS_WRITE_WINDOW_MS = float(os.getenv("PROGRESS_WRITE_WINDOW_MS", 5))
+    PROGRESS_WRITE_MAX_BATCH = int(os.getenv("PROGRESS_WRITE_MAX_BATCH", 500))
+    PROGRESS_BATCH_MAX_ITEMS = int(os.getenv("PROGRESS_BATCH_MAX_ITEMS", 500))
+
+    # ASGI mode (uvicorn asgi:app): threads serving the mounted Flask routes
+    ASGI_WSGI_THREADS = int(os.getenv("ASGI_WSGI_THREADS", 10))
+
+    # Startup: "lazy" imports the LLM/PDF route modules on first use or in the background
+    # after the worker starts; "eager" imports them at boot (share them with gunicorn --preload)
+    STARTUP_MODE = os.getenv("STARTUP_MODE", "lazy").lower()
+    READINESS_CHECK_MONGO = os.getenv("READINESS_CHECK_MONGO", "true").lower() == "true"
+
+    # Quiz generation: broken questions are regenerated individually
+    QUIZ_OPTION_COUNT = int(os.getenv("QUIZ_OPTION_COUNT", 4))
+    QUIZ_REPAIR_ATTEMPTS = int(os.getenv("QUIZ_REPAIR_ATTEMPTS", 1))
+
+    # Quiz bank: stocked questions per topic/level, refilled in the background
+    QUIZ_BANK_ENABLED = os.getenv("QUIZ_BANK_ENABLED", "true").lower() == "true"
+    QUIZ_BANK_TOPICS = os.getenv(
+        "QUIZ_BANK_TOPICS",
+        "JavaScript,React,Python,Data Science,Machine Learning,Web Development,Algorithms,Databases",
+    )
+    QUIZ_BANK_LEVELS = os.getenv("QUIZ_BANK_LEVELS", "easy,medium,hard")
+    QUIZ_BANK_LOW_WATER = int(os.getenv("QUIZ_BANK_LOW_WATER", 40))
+    QUIZ_BANK_TARGET = int(os.getenv("QUIZ_BANK_TARGET", 100))
+    QUIZ_BANK_BATCH_SIZE = int(os.getenv("QUIZ_BANK_BATCH_SIZE", 10))
+    QUIZ_BANK_SNAPSHOT_SECONDS = int(os.getenv("QUIZ_BANK_SNAPSHOT_SECONDS", 60))
+    QUIZ_BANK_REFILL_INTERVAL = int(os.getenv("QUIZ_BANK_REFILL_INTERVAL", 600))  # 0 = refill on demand only
+    QUIZ_BANK_SWEEP_MAX_CALLS = int(os.getenv("QUIZ_BANK_SWEEP_MAX_CALLS", 20))  # model calls per sweep, 0 = no cap
+
+    # Quiz cache
+    QUIZ_CACHE_TTL = int(os.getenv("QUIZ_CACHE_TTL", 24 * 60 * 60))
+    QUIZ_CACHE_MAX_ENTRIES = int(os.getenv("QUIZ_CACHE_MAX_ENTRIES", 512))
+    QUIZ_CACHE_VARIANTS = int(os.getenv("QUIZ_CACHE_VARIANTS", 3))
+    QUIZ_CACHE_SHARED = os.getenv("QUIZ_CACHE_SHARED", "true").lower() == "true"
+
+    # Explanation store
+    EXPLANATION_STALE_SECONDS = int(os.getenv("EXPLANATION_STALE_SECONDS", 7 * 24 * 60 * 60))
+    EXPLANATION_REFRESH_WORKERS = int(os.getenv("EXPLANATION_REFRESH_WORKERS", 2))
+
+    # Topic index: near-duplicate topics share explanations and quiz banks. Off by default: it
+    # needs torch and transformers installed, and the model is fetched by each worker's warm-up.
+    TOPIC_INDEX_ENABLED = os.getenv("TOPIC_INDEX_ENABLED", "false").lower() == "true"
+    TOPIC_INDEX_MODEL = os.getenv("TOPIC_INDEX_MODEL", "sentence-transformers/all-MiniLM-L6-v2")
+    TOPIC_INDEX_THRESHOLD = float(os.getenv("TOPIC_INDEX_THRESHOLD", 0.8))  # cosine similarity
+    TOPIC_INDEX_DIR = os.getenv("TOPIC_INDEX_DIR", os.path.join(os.path.dirname(__file__), ".cache", "topic_index"))
+    TOPIC_INDEX_IVF_MIN_SIZE = int(os.getenv("TOPIC_INDEX_IVF_MIN_SIZE", 50000))  # approximate search from here on
+    TOPIC_INDEX_NPROBE = int(os.getenv("TOPIC_INDEX_NPROBE", 8))
+
+    # LLM models: one long-lived client per model, per-route primary + fallbacks
+    LLM_BACKEND = os.getenv("LLM_BACKEND", "groq")  # groq | fake
+    LLM_DEFAULT_MODEL = os.getenv("LLM_DEFAULT_MODEL", "gemma2-9b-it")
+    LLM_FALLBACK_MODELS = os.getenv("LLM_FALLBACK_MODELS", "llama-3.1-8b-instant")
+    LLM_ROUTE_MODELS = os.getenv("LLM_ROUTE_MODELS", "")  # e.g. "quiz=llama-3.3-70b-versatile"
+    LLM_ROUTE_SLO_MS = os.getenv("LLM_ROUTE_SLO_MS", "quiz=15000,explain=8000,summarize=30000")
+    LLM_SLO_COOLDOWN_SECONDS = int(os.getenv("LLM_SLO_COOLDOWN_SECONDS", 60))
+    LLM_TIMEOUT_SECONDS = float(os.getenv("LLM_TIMEOUT_SECONDS", 60))
+    LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", 2))
+    LLM_RETRY_BASE_SECONDS = float(os.getenv("LLM_RETRY_BASE_SECONDS", 0.5))
+    LLM_RETRY_MAX_SECONDS = float(os.getenv("LLM_RETRY_MAX_SECONDS", 8))
+    LLM_BREAKER_FAILURES = int(os.getenv("LLM_BREAKER_FAILURES", 5))
+    LLM_BREAKER_RESET_SECONDS = int(os.getenv("LLM_BREAKER_RESET_SECONDS", 30))
+    LLM_FAKE_LATENCY_MS = int(os.getenv("LLM_FAKE_LATENCY_MS", 0))
+    LLM_FAKE_TOKENS_PER_SECOND = float(os.getenv("LLM_FAKE_TOKENS_PER_SECOND", 0))  # 0 = whole reply at once
+
+    # Summarization engine (limits are per worker process)
+    SUMMARY_MAP_CONCURRENCY = int(os.getenv("SUMMARY_MAP_CONCURRENCY", 4))
+    SUMMARY_REDUCE_MAX_TOKENS = int(os.getenv("SUMMARY_REDUCE_MAX_TOKENS", 0))  # 0 = planner's input budget
+    SUMMARY_CHUNK_CACHE_SIZE = int(os.getenv("SUMMARY_CHUNK_CACHE_SIZE", 2048))
+    GROQ_RPM = int(os.getenv("GROQ_RPM", 30))
+    GROQ_TPM = int(os.getenv("GROQ_TPM", 15000))
+    BACKGROUND_QUOTA_SHARE = float(os.getenv("BACKGROUND_QUOTA_SHARE", 0.1))  # of GROQ_RPM/TPM, for quiz bank refills
+
+    # Summary planning: stuff / refine / map_reduce sized to the model's context
+    LLM_CONTEXT_TOKENS = int(os.getenv("LLM_CONTEXT_TOKENS", 8192))
+    # "" = estimate ~4 chars/token; otherwise a local tokenizer directory (or cached Hub name) matching the model
+    SUMMARY_TOKENIZER = os.getenv("SUMMARY_TOKENIZER", "")
+    SUMMARY_OUTPUT_TOKENS = int(os.getenv("SUMMARY_OUTPUT_TOKENS", 1024))
+    SUMMARY_CHUNK_OVERLAP_TOKENS = int(os.getenv("SUMMARY_CHUNK_OVERLAP_TOKENS", 50))
+    SUMMARY_REFINE_MAX_CHUNKS = int(os.getenv("SUMMARY_REFINE_MAX_CHUNKS", 3))
+
+    # PDF ingestion
+    PDF_SPOOL_THRESHOLD = int(os.getenv("PDF_SPOOL_THRESHOLD", 8 * 1024 * 1024))
+    PDF_PARALLEL_MIN_PAGES = int(os.getenv("PDF_PARALLEL_MIN_PAGES", 40))
+    PDF_EXTRACT_WORKERS = int(os.getenv("PDF_EXTRACT_WORKERS", 2))
+    PDF_PAGES_PER_TASK = int(os.getenv("PDF_PAGES_PER_TASK", 10))
+
+    # PDF export of summaries (TrueType fonts: body font first, then fallbacks). The body font,
+    # DejaVu Sans (Latin, Greek, Cyrillic, typographic punctuation), ships in app/assets/fonts;
+    # a missing body font keeps the worker from reporting ready. Fallbacks are optional system
+    # fonts (Noto Sans Devanagari: fonts-noto-core) and are logged at start-up when missing.
+    # Without a font for a summary's script its export fails with a 500 instead of losing text.
+    PDF_EXPORT_FONTS = os.getenv(
+        "PDF_EXPORT_FONTS",
+        os.path.join(os.path.dirname(__file__), "app", "assets", "fonts", "DejaVuSans.ttf") + ","
+        "/usr/share/fonts/truetype/noto/NotoSansDevanagari-Regular.ttf",
+    )
+    PDF_EXPORT_CACHE_DIR = os.getenv("PDF_EXPORT_CACHE_DIR", os.path.join(os.path.dirname(__file__), ".cache", "pdf_exports"))
+    PDF_EXPORT_CACHE_MAX_FILES = int(os.getenv("PDF_EXPORT_CACHE_MAX_FILES", 500))
+    PDF_EXPORT_INLINE_CHARS = int(os.getenv("PDF_EXPORT_INLINE_CHARS", 20000))  # longer ones render on the process pool
+    PDF_EXPORT_MAX_AGE = int(os.getenv("PDF_EXPORT_MAX_AGE", 24 * 60 * 60))
+
+    # URL fetching
+    FETCH_POOL_CONNECTIONS = int(os.getenv("FETCH_POOL_CONNECTIONS", 10))
+    FETCH_POOL_MAXSIZE = int(os.getenv("FETCH_POOL_MAXSIZE", 20))
+    FETCH_CONNECT_TIMEOUT = float(os.getenv("FETCH_CONNECT_TIMEOUT", 5))
+    FETCH_READ_TIMEOUT = float(os.getenv("FETCH_READ_TIMEOUT", 15))
+    FETCH_MAX_BYTES = int(os.getenv("FETCH_MAX_BYTES", 5 * 1024 * 1024))
+    FETCH_CACHE_DIR = os.getenv("FETCH_CACHE_DIR", os.path.join(os.path.dirname(__file__), ".cache", "fetch"))
+    FETCH_CACHE_FRESH_SECONDS = int(os.getenv("FETCH_CACHE_FRESH_SECONDS", 10 * 60))
+
+    # YouTube transcripts: shared store keyed by video ID and language
+    YOUTUBE_TRANSCRIPT_SOURCE = os.getenv("YOUTUBE_TRANSCRIPT_SOURCE", "youtube")  # youtube | fake
+    YOUTUBE_TRANSCRIPT_LANGUAGES = os.getenv("YOUTUBE_TRANSCRIPT_LANGUAGES", "en,es,fr,de,hi")  # in order of preference
+    YOUTUBE_TRANSCRIPT_TRANSLATE_TO = os.getenv("YOUTUBE_TRANSCRIPT_TRANSLATE_TO", "en")
+    YOUTUBE_TRANSCRIPT_TTL = int(os.getenv("YOUTUBE_TRANSCRIPT_TTL", 30 * 24 * 60 * 60))
+    YOUTUBE_TRANSCRIPT_NEGATIVE_TTL = int(os.getenv("YOUTUBE_TRANSCRIPT_NEGATIVE_TTL", 60 * 60))  # videos without one
+    YOUTUBE_TRANSCRIPT_LOCAL_ENTRIES = int(os.getenv("YOUTUBE_TRANSCRIPT_LOCAL_ENTRIES", 64))
+    YOUTUBE_TRANSCRIPT_PARALLEL = int(os.getenv("YOUTUBE_TRANSCRIPT_PARALLEL", 2))  # tracks fetched at once
+    YOUTUBE_FAKE_LATENCY_MS = int(os.getenv("YOUTUBE_FAKE_LATENCY_MS", 0))
+
+    # Metrics: /metrics (Prometheus text format). Workers share series through
+    # METRICS_DIR, which must be local to the host (files are named by pid);
+    # leave it empty to render only the answering worker.
+    METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+    METRICS_SERVER_TIMING = os.getenv("METRICS_SERVER_TIMING", "false").lower() == "true"  # Server-Timing header
+    METRICS_WORKER_LABEL = os.getenv("METRICS_WORKER_LABEL", "true").lower() == "true"
+    METRICS_DIR = os.getenv("METRICS_DIR", os.path.join(os.path.dirname(__file__), ".cache", "metrics"))
+    METRICS_FLUSH_SECONDS = float(os.getenv("METRICS_FLUSH_SECONDS", 5))
+
+    # Logging
+    LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+
+    # Summary cache
+    SUMMARY_CACHE_SIZE = int(os.getenv("SUMMARY_CACHE_SIZE", 256))
+
+    # Background jobs
+    JOB_EXECUTOR = os.getenv("JOB_EXECUTOR", "thread")
+    JOB_WORKERS = int(os.getenv("JOB_WORKERS", 2))
+    JOB_LEASE_SECONDS = int(os.getenv("JOB_LEASE_SECONDS", 600))
+    JOB_SPOOL_DIR = os.getenv("JOB_SPOOL_DIR", os.path.join(os.path.dirname(__file__), ".cache", "jobs"))
@@ -1,17 +1,37 @@
+import logging
+
 from flask import Flask
 from flask_cors import CORS
 from flask_jwt_extended import JWTManager
-from pymongo import MongoClient
+from app.models.db import db, ensure_indexes, get_db, query_timings
+from app.utils.startup import import_route_modules, readiness, start_warm_up
 from config import Config
 
+logging.basicConfig(level=Config.LOG_LEVEL, format="%(asctime)s %(process)d %(levelname)s %(name)s: %(message)s")
+logging.getLogger("httpx").setLevel(logging.WARNING)  # one INFO line per LLM call otherwise
+logging.getLogger("fontTools").setLevel(logging.WARNING)  # several INFO lines per PDF export otherwise
+
 app = Flask(__name__)
 app.config.from_object(Config)
 CORS(app)
 
-# JWT and mongo setup
+# Request timings and /metrics (registered first so auth time is included)
+from app.utils.metrics import init_metrics
+init_metrics(app)
+
+# JWT setup: flask_jwt_extended issues tokens, the auth middleware verifies them
 jwt = JWTManager(app)
-mongo = MongoClient(app.config["MONGO_URI"])
-db = mongo["edugenie"]
+from app.utils.jwt_utils import init_auth
+init_auth(app)
+
+# Start-up work (route module imports, Mongo indexes, interrupted summary
+# jobs) runs in the background in each worker, never before a fork.
+@app.before_request
+def warm_up_worker():
+    start_warm_up()
+
+if Config.STARTUP_MODE == "eager":
+    import_route_modules()
 
 # Register Route
 from app.routes.auth_routes import auth_bp
@@ -26,6 +46,52 @@ app.register_blueprint(summarizer_bp, url_prefix="/summarize")
 from app.routes.dashboard_routes import dashboard_bp
 app.register_blueprint(dashboard_bp, url_prefix="/dashboard")
 
+# Maintenance commands
+import click
+from app.models.user_stats_model import backfill_user_stats
+
+@app.cli.command("backfill-user-stats")
+@click.option("--user-id", default=None, help="Rebuild a single user instead of everyone.")
+def backfill_user_stats_command(user_id):
+    """Rebuild user_stats from quiz_result and explanations."""
+    count = backfill_user_stats(db, user_id)
+    click.echo(f"Rebuilt stats for {count} user(s)")
+
+@app.cli.command("ensure-indexes")
+def ensure_indexes_command():
+    """Create (or confirm) every MongoDB index the app relies on."""
+    for name, result in ensure_indexes().items():
+        click.echo(f"{name}: {result}")
+
+@app.cli.command("refill-quiz-bank")
+def refill_quiz_bank_command():
+    """Top up every catalogue quiz bucket that is under the low-water mark."""
+    from app.services.quiz_bank import quiz_bank
+    if quiz_bank is None:
+        click.echo("Quiz bank is disabled")
+        return
+    for bucket, added in quiz_bank.sweep().items():
+        click.echo(f"{bucket}: +{added}")
+
+# Liveness: the process answers. Readiness: warmed up and MongoDB reachable.
+@app.route("/health/live")
+def liveness():
+    return {"status": "ok"}
+
+@app.route("/health/ready")
+def ready():
+    is_ready, report = readiness()
+    return report, 200 if is_ready else 503
+
+# MongoDB health and per-collection query timings for this worker
+@app.route("/health/db")
+def db_health():
+    try:
+        get_db().command("ping")
+    except Exception as e:
+        return {"status": "unavailable", "error": str(e), "timings": query_timings()}, 503
+    return {"status": "ok", "timings": query_timings()}
+
 # Root route
 @app.route("/")
 def home():
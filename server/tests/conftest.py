@@ -0,0 +1,18 @@
+"""
+Runs from server/:
+
+    pip install -r requirements-dev.txt
+    python -m pytest -q tests
+
+Tests run offline: mongomock, the fake LLM, no topic index or background refills.
+"""
+import os
+import sys
+
+os.environ.setdefault("MONGO_MOCK", "true")
+os.environ.setdefault("LLM_BACKEND", "fake")
+os.environ.setdefault("TOPIC_INDEX_ENABLED", "false")
+os.environ.setdefault("QUIZ_BANK_REFILL_INTERVAL", "0")
+os.environ.setdefault("JWT_SECRET", "test-secret-test-secret-test-secret")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,39 @@
+from app.models.db import db
+from app.models.progress_model import QUIZ, save_results
+from app.models.user_stats_model import rebuild_user_stats
+
+
+def _quiz(topic, score, total=10, level="easy"):
+    return {"topic": topic, "quiz_score": score, "total_questions": total, "level": level,
+            "questions": [], "time_spent": None}
+
+
+def _nonzero(doc):
+    """Drops zero counters: a retake at another level leaves the old level's at zero, a rebuild never writes them."""
+    pruned = {}
+    for key, value in doc.items():
+        if isinstance(value, dict):
+            value = _nonzero(value)
+        if value not in (0, {}):
+            pruned[key] = value
+    return pruned
+
+
+def _stats(user_id):
+    return _nonzero({k: v for k, v in db.user_stats.find_one({"_id": user_id}).items() if k != "_id"})
+
+
+def test_rebuild_matches_incremental_stats_after_lower_retake():
+    user_id = "stats-retake-user"
+    db.quiz_result.delete_many({"user_id": user_id})
+    db.user_stats.delete_many({"_id": user_id})
+
+    assert save_results([(user_id, QUIZ, _quiz("Gravity", 9))]) == [None]
+    assert save_results([(user_id, QUIZ, _quiz("Gravity", 5, level="hard"))]) == [None]
+    incremental = _stats(user_id)
+
+    rebuild_user_stats(db, user_id)
+    rebuilt = _stats(user_id)
+
+    assert incremental["topics"]["gravity"]["best_percent"] == 90
+    assert rebuilt == incremental
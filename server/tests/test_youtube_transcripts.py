@@ -0,0 +1,38 @@
+from youtube_transcript_api import YouTubeTranscriptApi
+
+from app.utils.youtube_transcripts import YouTubeTranscriptSource
+
+
+class FakeTrack:
+    def __init__(self, language_code, is_generated, translation_languages=()):
+        self.language_code = language_code
+        self.is_generated = is_generated
+        self.translation_languages = [{"language_code": code} for code in translation_languages]
+
+    def fetch(self):
+        kind = "generated" if self.is_generated else "manual"
+        return [{"text": f"{self.language_code} {kind}"}]
+
+
+def _ranked(monkeypatch, tracks, languages):
+    monkeypatch.setattr(YouTubeTranscriptApi, "list_transcripts", lambda video_id: tracks)
+    candidates = YouTubeTranscriptSource().candidates("abcdefghijk", languages, translate_to="xx")
+    return [candidate.fetch() for candidate in candidates]
+
+
+def test_candidates_rank_by_language_then_manual_before_generated(monkeypatch):
+    tracks = [
+        FakeTrack("de", is_generated=False),
+        FakeTrack("es", is_generated=False),
+        FakeTrack("en", is_generated=True),
+        FakeTrack("es", is_generated=True),
+        FakeTrack("en", is_generated=False),
+    ]
+    assert _ranked(monkeypatch, tracks, ["en", "es"]) == [
+        "en manual", "en generated", "es manual", "es generated", "de manual",
+    ]
+
+
+def test_generated_track_in_first_language_beats_manual_in_second(monkeypatch):
+    tracks = [FakeTrack("es", is_generated=False), FakeTrack("en", is_generated=True)]
+    assert _ranked(monkeypatch, tracks, ["en", "es"]) == ["en generated", "es manual"]